@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Asyncio Uploader for K-Beauty Product Data
+
+Uploads the same normalized catalog to several MongoDB targets (databases,
+collections or clusters) concurrently on one event loop, using PyMongo's
+native async API (AsyncMongoClient). Batched inserts, index builds and
+verification reads for every target share a single concurrency limit.
+
+Usage:
+    python scripts/async_upload.py [csv_path] \\
+        --target kbeauty_platform.products --target kbeauty_staging.products \\
+        --concurrency 8 --batch-size 100 [--no-shopify] [--allow-drift]
+
+Targets default to ASYNC_UPLOAD_TARGETS. Records are prepared once with the
+regular uploader stages; each target keeps its own ingredient dictionary.
+The first target is the primary one: generated productIds come from its
+productId registry (as in upload_kbeauty_data.py), and new registry entries
+are saved there once the products have been written. Shopify variant IDs are
+resolved once, through the primary target's variant cache, before uploading.
+Columns are checked for drift against the primary target's previous upload
+(nothing is written unless --allow-drift is given); once the primary target
+has the products, a catalog generation and its column sketches are recorded
+there.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from pymongo import AsyncMongoClient, MongoClient
+
+from upload_kbeauty_data import (
+    MONGO_URI, DATABASE_NAME, COLLECTION_NAME, INGREDIENTS_COLLECTION_NAME, PRODUCT_IDS_COLLECTION_NAME,
+    KEEP_INGREDIENT_STRINGS, SCRIPT_DIR, CSV_FILE_PATH, EXIT_OK, EXIT_FAILED,
+    prepare_products, check_duplicate_product_ids, confirm_upload, resolve_shopify_variants, check_column_drift, save_column_sketch,
+    record_catalog_generation,
+)
+from ingredient_dictionary import IngredientDictionary
+from product_ids import ProductIdRegistry
+
+# Each target: MongoDB URI, database and collection name
+ASYNC_UPLOAD_TARGETS = [
+    {'uri': MONGO_URI, 'database': DATABASE_NAME, 'collection': COLLECTION_NAME},
+]
+DEFAULT_CONCURRENCY = 8   # Max in-flight operations across all targets
+DEFAULT_BATCH_SIZE = 100  # Documents per insert_many call
+
+
+class AsyncUploader:
+    """Uploads prepared records to several targets with a shared concurrency limit."""
+
+    def __init__(self, targets, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE):
+        self.targets = targets
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.clients = {}  # One client (connection pool) per URI
+
+    def _client(self, uri):
+        if uri not in self.clients:
+            self.clients[uri] = AsyncMongoClient(uri)
+        return self.clients[uri]
+
+    async def _limited(self, operation):
+        """Run an awaitable under the shared concurrency limit."""
+        async with self.semaphore:
+            return await operation
+
+    async def upload_target(self, target, records):
+        """Replace the products of one target and verify the written count."""
+        label = f"{target['database']}.{target['collection']}"
+        started = time.perf_counter()
+        db = self._client(target['uri'])[target['database']]
+        collection = db[target['collection']]
+        ingredients = db[INGREDIENTS_COLLECTION_NAME]
+
+        # Each target database has its own ingredient IDs, so intern on a copy
+        entries = await self._limited(ingredients.find({}, {'_id': 1, 'name': 1}).to_list(None))
+        dictionary = IngredientDictionary(entries)
+        documents = [dict(record) for record in records]
+        dictionary.intern_records(documents, keep_strings=KEEP_INGREDIENT_STRINGS)
+
+        await self._limited(collection.delete_many({}))
+        batches = [documents[i:i + self.batch_size] for i in range(0, len(documents), self.batch_size)]
+        writes = [self._limited(collection.insert_many(batch, ordered=False)) for batch in batches]
+        dictionary_operations = dictionary.to_operations()
+        if dictionary_operations:
+            writes.append(self._limited(ingredients.bulk_write(dictionary_operations, ordered=False)))
+        await asyncio.gather(*writes)
+        await asyncio.gather(
+            self._limited(collection.create_index('productId')),
+            self._limited(collection.create_index('category')),
+            self._limited(ingredients.create_index('name', unique=True)),
+        )
+
+        written = await self._limited(collection.count_documents({}))
+        elapsed = time.perf_counter() - started
+        if written != len(documents):
+            raise RuntimeError(f"{label}: expected {len(documents)} documents, found {written}")
+        print(f"   ✅ {label}: {written} products in {len(batches)} batches ({elapsed:.2f}s)")
+        return written
+
+    async def upload(self, records):
+        """Upload to every target concurrently; returns {label: count or exception}."""
+        try:
+            results = await asyncio.gather(
+                *(self.upload_target(target, records) for target in self.targets),
+                return_exceptions=True,
+            )
+        finally:
+            for client in self.clients.values():
+                await client.close()
+        return {
+            f"{target['database']}.{target['collection']}": result
+            for target, result in zip(self.targets, results)
+        }
+
+
+def parse_target(spec):
+    """Parse 'database.collection' into a target on MONGO_URI."""
+    database, _, collection = spec.partition('.')
+    if not database or not collection:
+        raise argparse.ArgumentTypeError(f"Target must look like 'database.collection', got '{spec}'")
+    return {'uri': MONGO_URI, 'database': database, 'collection': collection}
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Upload K-Beauty product data to several MongoDB targets concurrently.")
+    parser.add_argument('csv_path', nargs='?', default=None,
+                        help="CSV file path, relative to this script (default: 4-12-25 DB.csv)")
+    parser.add_argument('--target', action='append', type=parse_target, dest='targets',
+                        help="Target 'database.collection' (repeatable, default: ASYNC_UPLOAD_TARGETS)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Max in-flight operations across all targets (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Documents per insert batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--allow-unknown-columns', action='store_true',
+                        help="Skip CSV columns that are not in the product schema instead of aborting")
+    parser.add_argument('--no-shopify', dest='resolve_variants', action='store_false',
+                        help="Do not resolve or embed Shopify variant IDs")
+    parser.add_argument('--allow-drift', action='store_true',
+                        help="Upload even if columns drift from the previous upload's sketches")
+    args = parser.parse_args(argv)
+
+    csv_path = os.path.join(SCRIPT_DIR, args.csv_path) if args.csv_path else CSV_FILE_PATH
+    targets = args.targets or ASYNC_UPLOAD_TARGETS
+    primary = targets[0]
+    print(f"🔌 Connecting to {primary['database']} (primary target)...")
+    client = MongoClient(primary['uri'])
+    try:
+        db = client[primary['database']]
+        product_ids = ProductIdRegistry.load(db[PRODUCT_IDS_COLLECTION_NAME])
+        try:
+            _, records, errors = prepare_products(csv_path, product_ids=product_ids,
+                                                  allow_unknown_columns=args.allow_unknown_columns)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ Error: {e}")
+            return EXIT_FAILED
+        if not check_duplicate_product_ids(records) or not confirm_upload(errors):
+            return EXIT_FAILED
+        if args.resolve_variants:
+            resolve_shopify_variants(db, records)
+        sketch, ok = check_column_drift(db, records, allow_drift=args.allow_drift)
+        if not ok:
+            return EXIT_FAILED
+
+        print(f"\n📤 Uploading {len(records)} products to {len(targets)} target(s) "
+              f"(concurrency {args.concurrency}, batches of {args.batch_size})...")
+        uploader = AsyncUploader(targets, concurrency=args.concurrency, batch_size=args.batch_size)
+        results = asyncio.run(uploader.upload(records))
+
+        failed = {label: result for label, result in results.items() if isinstance(result, Exception)}
+        for label, error in failed.items():
+            print(f"   ❌ {label}: {error}")
+        if len(failed) < len(results):
+            # The generated productIds are live in at least one target now
+            registered = product_ids.save(db[PRODUCT_IDS_COLLECTION_NAME])
+            print(f"   ✅ Registered {registered} new productIds ({len(product_ids)} in registry)")
+        primary_label = f"{primary['database']}.{primary['collection']}"
+        if primary_label not in failed:
+            generation = record_catalog_generation(db, records)
+            save_column_sketch(db, sketch, generation)
+        if failed:
+            print(f"\n--- ⚠️  UPLOAD FINISHED WITH {len(failed)} FAILED TARGET(S) ---")
+            return EXIT_FAILED
+        print(f"\n--- ✅ UPLOAD COMPLETE ---")
+        return EXIT_OK
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Catalog Bundle Export for K-Beauty Product Data Upload
+
+The catalog only changes when the uploader runs, so every upload also emits a
+static, precompiled bundle that the Next.js server loads once at cold start
+(see src/lib/catalogBundle.js) instead of querying MongoDB on every request.
+
+Bundle layout (gzip-compressed JSON):
+
+    {
+      "version": 1,
+      "hash": "<sha256 of the category partitions>",
+      "productCount": 192,
+      "categories": { "cleanser": [ {...product...}, ... ], ... }
+    }
+
+Products are already normalized by the uploader, are partitioned by category
+and sorted by productId. The file name contains the content hash
+(catalog-<hash>.json.gz), and catalog-manifest.json points at the current one.
+MongoDB documents only hold packed ingredient IDs; the bundle carries the
+ingredient names, resolved through the ingredient dictionary, so the server
+does not need the dictionary at cold start.
+The facet index of the same products (facet_index.py) is written next to it
+and named in the same manifest, so both are replaced together.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from bson.objectid import ObjectId
+
+from facet_index import FACET_FILE_PATTERN, build_facet_index, content_hash as facet_content_hash, to_json
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE_NAME = 'catalog-manifest.json'
+BUNDLE_FILE_PATTERN = 'catalog-{}.json.gz'
+BUNDLES_TO_KEEP = 3  # Older bundles are pruned so the directory does not grow forever
+
+
+def bundle_product(record, ingredients=None):
+    """
+    Strip fields the web server cannot use (Mongo _id, packed binary ingredient IDs).
+
+    With an IngredientDictionary, packed ingredient IDs are resolved to name arrays first.
+    """
+    if ingredients is not None:
+        record = ingredients.resolve_record(record)
+    # Binary is a bytes subclass; documents read back from MongoDB hold plain bytes
+    return {
+        field: value for field, value in record.items()
+        if not isinstance(value, (bytes, ObjectId)) and field != '_id'
+    }
+
+
+def build_catalog_bundle(records, ingredients=None):
+    """Build the category-partitioned bundle dict and its content hash."""
+    categories = {}
+    for record in records:
+        categories.setdefault(record.get('category', 'other'), []).append(bundle_product(record, ingredients))
+    for products in categories.values():
+        products.sort(key=lambda product: str(product.get('productId', '')))
+    categories = dict(sorted(categories.items()))
+
+    canonical = json.dumps(categories, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    content_hash = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    bundle = {
+        'version': BUNDLE_FORMAT_VERSION,
+        'hash': content_hash,
+        'productCount': sum(len(products) for products in categories.values()),
+        'categories': categories,
+    }
+    return bundle, content_hash
+
+
+def _prune_old_bundles(output_dir, current_file, prefix='catalog-'):
+    """Delete all but the newest BUNDLES_TO_KEEP bundle (or facet index) files."""
+    bundle_files = [
+        os.path.join(output_dir, name) for name in os.listdir(output_dir)
+        if name.startswith(prefix) and name.endswith('.json.gz')
+    ]
+    bundle_files.sort(key=os.path.getmtime, reverse=True)
+    removed = 0
+    for path in bundle_files[BUNDLES_TO_KEEP:]:
+        if os.path.basename(path) != current_file:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def _write_once(path, compressed):
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(compressed)
+
+
+def write_catalog_bundle(records, output_dir, generation=None, ingredients=None):
+    """
+    Write a content-addressed catalog bundle and facet index and update the manifest.
+
+    Args:
+        records: Encoded product documents (as inserted into MongoDB)
+        output_dir: Directory the Next.js server reads bundles from
+        generation: Catalog generation ID recorded in the manifest (see catalog_history.py)
+        ingredients: IngredientDictionary that resolves packed ingredient IDs to names
+
+    Returns:
+        The manifest dict that was written, plus 'pruned' (old files removed) and
+        'facets' (the facet index, with bitsets as bytes)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    bundle, content_hash = build_catalog_bundle(records, ingredients)
+    file_name = BUNDLE_FILE_PATTERN.format(content_hash[:16])
+    bundle_path = os.path.join(output_dir, file_name)
+
+    payload = json.dumps(bundle, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    # mtime=0 keeps the compressed bytes identical for identical catalogs
+    compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+    _write_once(bundle_path, compressed)
+
+    facets = build_facet_index(records, generation=generation, catalog_hash=content_hash)
+    facet_payload = to_json(facets)
+    facet_file = FACET_FILE_PATTERN.format(facet_content_hash(facet_payload)[:16])
+    _write_once(os.path.join(output_dir, facet_file), gzip.compress(facet_payload, compresslevel=9, mtime=0))
+
+    manifest = {
+        'version': BUNDLE_FORMAT_VERSION,
+        'file': file_name,
+        'hash': content_hash,
+        'generation': generation,
+        'generatedAt': datetime.now(timezone.utc).isoformat(),
+        'productCount': bundle['productCount'],
+        'categoryCounts': {category: len(products) for category, products in bundle['categories'].items()},
+        'uncompressedBytes': len(payload),
+        'compressedBytes': len(compressed),
+        'facetIndex': facet_file,
+        'facetIndexBytes': len(facet_payload),
+    }
+    # Write the manifest atomically so the server never reads a half-written file
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+    manifest['pruned'] = (_prune_old_bundles(output_dir, file_name)
+                          + _prune_old_bundles(output_dir, facet_file, prefix='facets-'))
+    manifest['facets'] = facets
+    return manifest
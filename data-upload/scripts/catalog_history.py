@@ -0,0 +1,241 @@
+"""
+Catalog Generation History for K-Beauty Product Data Upload
+
+Every upload replaces the live products collection, so the history of the
+catalog is kept separately as per-product deltas. Each upload that changes the
+catalog becomes a numbered generation:
+
+    catalog_generations: { _id: 3, parent: 2, createdAt, catalogHash,
+                           productCount, added, updated, removed }
+    catalog_deltas:      { generation: 3, productId: "...", op: "update",
+                           delta: <zlib-compressed JSON> }
+
+A delta holds only what changed for one product against the previous
+generation: the full product for 'add', the changed fields (`set`) and
+dropped fields (`unset`) for 'update', nothing for 'remove'. Unchanged
+products write nothing, so storage grows with the size of the changes.
+
+Every CHECKPOINT_INTERVAL generations the full catalog is also stored as a
+checkpoint, and the generation document is marked with `checkpoint: true`:
+
+    catalog_checkpoints: { generation: 10, productId: "...",
+                           product: <zlib-compressed JSON> }
+
+A generation is rebuilt from the newest checkpoint at or before it plus the
+deltas after that checkpoint, either for the whole catalog or for one
+productId (all served by indexes), so neither an upload nor a lookup replays
+more than CHECKPOINT_INTERVAL generations of deltas. The generation document
+is written last and acts as the commit marker: deltas and checkpoints of a
+run that died before writing it are ignored and cleaned up by the next run.
+"""
+
+import hashlib
+import json
+import zlib
+from datetime import datetime, timezone
+
+from bson.binary import Binary
+
+from catalog_bundle import bundle_product
+
+DELTA_COMPRESSION_LEVEL = 9
+# Generations between full-catalog checkpoints (bounds the deltas replayed per rebuild)
+CHECKPOINT_INTERVAL = 10
+
+
+def _canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def compress_delta(payload):
+    """Compress a delta payload dict into a BSON binary value."""
+    return Binary(zlib.compress(_canonical_json(payload).encode('utf-8'), DELTA_COMPRESSION_LEVEL))
+
+
+def decompress_delta(data):
+    """Inverse of compress_delta()."""
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def diff_product(old, new):
+    """Fields to set and to unset to turn product `old` into `new` (None if unchanged)."""
+    changed = {field: value for field, value in new.items() if old.get(field) != value or field not in old}
+    removed = sorted(field for field in old if field not in new)
+    if not changed and not removed:
+        return None
+    return {'set': changed, 'unset': removed}
+
+
+def apply_delta(product, op, payload):
+    """Apply one delta to a product dict (None if absent). Returns the new product or None."""
+    if op == 'remove':
+        return None
+    if op == 'add':
+        return dict(payload)
+    product = dict(product or {})
+    product.update(payload['set'])
+    for field in payload['unset']:
+        product.pop(field, None)
+    return product
+
+
+def catalog_snapshot(records, id_field='productId', ingredients=None):
+    """
+    Key encoded records by productId, as stored in the history.
+
+    Pass the IngredientDictionary when the records are interned, so the
+    history keeps the ingredient names rather than dropping the packed IDs.
+
+    Returns:
+        {productId: product}
+
+    Raises:
+        ValueError: If two records share a productId (uploads reject these rows
+            during validation, see find_duplicate_product_ids())
+    """
+    snapshot = {}
+    for record in records:
+        product_id = record.get(id_field)
+        if product_id is None:
+            continue
+        product_id = str(product_id)
+        if product_id in snapshot:
+            raise ValueError(f"productId '{product_id}' is used by more than one product")
+        # Round-trip through JSON so comparisons match what reconstruction returns
+        snapshot[product_id] = json.loads(_canonical_json(bundle_product(record, ingredients)))
+    return snapshot
+
+
+class CatalogHistory:
+    """Generation log, per-product delta store and checkpoints in three MongoDB collections."""
+
+    def __init__(self, generations, deltas, checkpoints):
+        self.generations = generations
+        self.deltas = deltas
+        self.checkpoints = checkpoints
+
+    def ensure_indexes(self):
+        self.deltas.create_index([('generation', 1), ('productId', 1)], unique=True)
+        self.deltas.create_index([('productId', 1), ('generation', 1)])
+        self.checkpoints.create_index([('generation', 1), ('productId', 1)], unique=True)
+        self.checkpoints.create_index([('productId', 1), ('generation', 1)])
+
+    def latest_generation(self):
+        """The newest committed generation document, or None."""
+        return self.generations.find_one(sort=[('_id', -1)])
+
+    def _resolve_generation(self, generation_id):
+        if generation_id is not None:
+            return generation_id
+        latest = self.latest_generation()
+        return latest['_id'] if latest else 0
+
+    def _checkpoint_before(self, generation_id):
+        """ID of the newest checkpointed generation at or before `generation_id` (0 if none)."""
+        checkpoint = self.generations.find_one(
+            {'_id': {'$lte': generation_id}, 'checkpoint': True}, sort=[('_id', -1)]
+        )
+        return checkpoint['_id'] if checkpoint else 0
+
+    def reconstruct(self, generation_id=None):
+        """Rebuild the catalog {productId: product} as of a generation (default: latest)."""
+        generation_id = self._resolve_generation(generation_id)
+        base = self._checkpoint_before(generation_id)
+        catalog = {
+            checkpoint['productId']: decompress_delta(checkpoint['product'])
+            for checkpoint in self.checkpoints.find({'generation': base})
+        } if base else {}
+        cursor = self.deltas.find(
+            {'generation': {'$gt': base, '$lte': generation_id}}
+        ).sort([('generation', 1)])
+        for delta in cursor:
+            product = apply_delta(catalog.get(delta['productId']), delta['op'],
+                                  decompress_delta(delta['delta']))
+            if product is None:
+                catalog.pop(delta['productId'], None)
+            else:
+                catalog[delta['productId']] = product
+        return catalog
+
+    def reconstruct_product(self, product_id, generation_id=None):
+        """Rebuild one product as of a generation; None if it did not exist then."""
+        generation_id = self._resolve_generation(generation_id)
+        base = self._checkpoint_before(generation_id)
+        checkpoint = self.checkpoints.find_one({'generation': base, 'productId': product_id}) if base else None
+        product = decompress_delta(checkpoint['product']) if checkpoint else None
+        cursor = self.deltas.find(
+            {'productId': product_id, 'generation': {'$gt': base, '$lte': generation_id}}
+        ).sort([('generation', 1)])
+        for delta in cursor:
+            product = apply_delta(product, delta['op'], decompress_delta(delta['delta']))
+        return product
+
+    def record(self, records, ingredients=None):
+        """
+        Store the uploaded catalog as a new generation of deltas against the latest one.
+
+        Args:
+            records: Encoded product documents (as inserted into MongoDB)
+            ingredients: IngredientDictionary that resolves packed ingredient IDs to names
+
+        Returns:
+            The generation document (the latest existing one if nothing changed), with
+            'unchanged' added
+
+        Raises:
+            ValueError: If two records share a productId (nothing is written)
+        """
+        current = catalog_snapshot(records, ingredients=ingredients)
+        self.ensure_indexes()
+        latest = self.latest_generation()
+        parent_id = latest['_id'] if latest else 0
+        # Deltas and checkpoints above the latest committed generation belong to an interrupted run
+        self.deltas.delete_many({'generation': {'$gt': parent_id}})
+        self.checkpoints.delete_many({'generation': {'$gt': parent_id}})
+
+        previous = self.reconstruct(parent_id) if latest else {}
+        generation_id = parent_id + 1
+
+        deltas = []
+        counts = {'add': 0, 'update': 0, 'remove': 0}
+        for product_id, product in current.items():
+            if product_id not in previous:
+                op, payload = 'add', product
+            else:
+                payload = diff_product(previous[product_id], product)
+                if payload is None:
+                    continue
+                op = 'update'
+            counts[op] += 1
+            deltas.append({'generation': generation_id, 'productId': product_id,
+                           'op': op, 'delta': compress_delta(payload)})
+        for product_id in sorted(previous.keys() - current.keys()):
+            counts['remove'] += 1
+            deltas.append({'generation': generation_id, 'productId': product_id,
+                           'op': 'remove', 'delta': compress_delta({})})
+
+        if not deltas and latest:
+            return dict(latest, unchanged=True)
+
+        if deltas:
+            self.deltas.insert_many(deltas, ordered=False)
+        checkpoint = generation_id - self._checkpoint_before(parent_id) >= CHECKPOINT_INTERVAL
+        if checkpoint and current:
+            self.checkpoints.insert_many([
+                {'generation': generation_id, 'productId': product_id, 'product': compress_delta(product)}
+                for product_id, product in current.items()
+            ], ordered=False)
+        generation = {
+            '_id': generation_id,
+            'parent': parent_id,
+            'createdAt': datetime.now(timezone.utc),
+            'catalogHash': hashlib.sha256(_canonical_json(current).encode('utf-8')).hexdigest(),
+            'productCount': len(current),
+            'added': counts['add'],
+            'updated': counts['update'],
+            'removed': counts['remove'],
+            'deltaBytes': sum(len(delta['delta']) for delta in deltas),
+            'checkpoint': checkpoint,
+        }
+        self.generations.insert_one(generation)
+        return dict(generation, unchanged=False)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Multi-Source Catalog Merge for K-Beauty Product Data Upload
+
+Combines several catalog sheets and supplier feeds into one CSV for the
+uploader. Sources are joined on productId with a streaming sort-merge join
+instead of DataFrame merges:
+
+1. Each source is scanned row by row (csv_scan, no pandas) and sorted by
+   join key in runs of MERGE_RUN_ROWS rows; full runs are spilled to
+   temporary files, so memory is bounded by the run size, not the file.
+2. The runs of a source are combined with heapq.merge into one sorted
+   stream, and the streams of all sources with another heapq.merge.
+3. Consecutive rows with the same key form one product. Every field is
+   taken from the first source in its priority order that has a value.
+
+The join key is the row's PRODUCTID or, for rows without one, the productId
+the registry would generate from brand + name (product_ids.py), so a sheet
+exported with productIds still lines up with a supplier feed without them.
+Generated keys are only used for joining; the output keeps PRODUCTID empty
+for those rows, and the uploader assigns their IDs from the registry.
+
+By default sources are ranked in the order given. Per-field rules put other
+sources first for some columns:
+
+    --prefer MRP,INSTOCK=feed_a --prefer KEYINGREDIENTS,FULLINGREDIENTLIST=sheet_b
+
+Whenever two sources have different values for a field, one conflict line is
+written to the NDJSON conflict report:
+
+    {"key": "...", "name": "...", "field": "MRP", "chosen": "feed_a",
+     "values": {"feed_a": "1,650", "sheet_b": "1,500"}}
+
+Usage:
+    python scripts/catalog_merge.py sheet_b="4-12-25 DB.csv" feed_a=prices.csv --prefer MRP=feed_a
+    python scripts/catalog_merge.py sheet.csv feed.csv --output merged_catalog.csv --upload
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import pickle
+import sys
+import tempfile
+from collections import Counter
+from operator import itemgetter
+
+from csv_scan import CatalogScan, canonical_column
+from product_ids import identity_key, product_id_for_key
+
+MERGE_RUN_ROWS = 50_000  # Rows sorted in memory per run before spilling to disk
+OUTPUT_FILE = "merged_catalog.csv"
+CONFLICTS_FILE = "merge_conflicts.ndjson"
+# Leading output columns, in the order of the catalog sheet; other columns follow in source order
+LEADING_COLUMNS = ['PRODUCTID', 'CATEGORY', 'BRAND', 'NAME']
+
+
+class MergeSource:
+    """One input file and the name priority rules refer to it by."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.rows = 0
+        self.unkeyed = 0      # Rows without PRODUCTID, NAME or BRAND
+        self.duplicates = 0   # Rows whose key already appeared earlier in the same source
+
+    @classmethod
+    def parse(cls, spec):
+        """'name=path' or just 'path' (named after the file)."""
+        name, separator, path = spec.partition('=')
+        if not separator or not name or os.sep in name:
+            path = spec
+            name = os.path.splitext(os.path.basename(spec))[0]
+        return cls(name, path)
+
+
+def join_key(row):
+    """PRODUCTID, or the ID generated from brand + name (None if the row has neither)."""
+    product_id = (row.get('PRODUCTID') or '').strip()
+    if product_id:
+        return product_id
+    if row.get('NAME') is None and row.get('BRAND') is None:
+        return None
+    return product_id_for_key(identity_key(row.get('NAME'), row.get('BRAND')))
+
+
+def _canonical_row(row):
+    """Key a scanned row by canonical column names (the first non-missing value wins)."""
+    canonical = {}
+    for column, value in row.items():
+        name = canonical_column(column)
+        if canonical.get(name) is None:
+            canonical[name] = value
+    return canonical
+
+
+def _spill(run, directory):
+    """Write one sorted run to a temporary file; returns its path."""
+    handle, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(handle, 'wb') as f:
+        for item in run:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def sorted_source_rows(source, columns, spill_dir, run_rows=MERGE_RUN_ROWS):
+    """
+    Yield (key, row number, canonical row) of one source in key order (external sort).
+
+    Canonical column names are appended to `columns` in the order first seen.
+    """
+    scan = CatalogScan(source.path)
+    for column in scan.columns:
+        name = canonical_column(column)
+        if name not in columns:
+            columns.append(name)
+
+    runs, run = [], []
+    for row_number, row in scan:
+        source.rows += 1
+        row = _canonical_row(row)
+        key = join_key(row)
+        if key is None:
+            source.unkeyed += 1
+            continue
+        run.append((key, row_number, row))
+        if len(run) >= run_rows:
+            run.sort(key=itemgetter(0, 1))
+            runs.append(_read_run(_spill(run, spill_dir)))
+            run = []
+    run.sort(key=itemgetter(0, 1))
+    runs.append(iter(run))
+    yield from heapq.merge(*runs, key=itemgetter(0, 1))
+
+
+def _tagged(index, rows):
+    """(key, source index, row number, row): ties on a key are broken by source order."""
+    for key, row_number, row in rows:
+        yield key, index, row_number, row
+
+
+def field_priorities(sources, rules):
+    """
+    Source order per field: the sources named in a rule first, then the rest in source order.
+
+    Args:
+        rules: {canonical field: [source names]}
+    """
+    names = [source.name for source in sources]
+    priorities = {}
+    for field, preferred in rules.items():
+        unknown = [name for name in preferred if name not in names]
+        if unknown:
+            raise ValueError(f"--prefer {field}: unknown source(s) {', '.join(unknown)} "
+                             f"(sources: {', '.join(names)})")
+        priorities[field] = [names.index(name) for name in preferred] + [
+            index for index, name in enumerate(names) if name not in preferred
+        ]
+    return priorities
+
+
+def parse_rules(specs):
+    """['MRP,INSTOCK=feed_a,sheet_b', ...] -> {'MRP': ['feed_a', 'sheet_b'], 'INSTOCK': [...]}"""
+    rules = {}
+    for spec in specs or []:
+        fields, separator, names = spec.partition('=')
+        if not separator or not fields or not names:
+            raise ValueError(f"--prefer expects FIELD[,FIELD...]=SOURCE[,SOURCE...], got '{spec}'")
+        for field in fields.split(','):
+            rules[canonical_column(field)] = [name.strip() for name in names.split(',') if name.strip()]
+    return rules
+
+
+def _comparable(value):
+    """Values that differ only in case or whitespace are not conflicts."""
+    return ' '.join(value.split()).casefold()
+
+
+def merge_sources(sources, output_path, conflicts_path, rules=None, run_rows=MERGE_RUN_ROWS):
+    """
+    Sort-merge join the sources on productId and write the merged CSV.
+
+    Returns:
+        Stats dict: 'products', 'multiSource' (products found in more than one
+        source), 'conflicts' (Counter per field) and 'columns'
+    """
+    priorities = field_priorities(sources, rules or {})
+    default_order = list(range(len(sources)))
+    columns = []
+    stats = {'products': 0, 'multiSource': 0, 'conflicts': Counter(), 'columns': columns}
+
+    with tempfile.TemporaryDirectory(prefix='catalog-merge-') as spill_dir:
+        streams = [
+            _tagged(index, sorted_source_rows(source, columns, spill_dir, run_rows))
+            for index, source in enumerate(sources)
+        ]
+        # Opening every stream reads the headers, so `columns` is complete before the first row
+        merged = heapq.merge(*streams, key=itemgetter(0, 1, 2))
+        first = next(merged, None)
+        output_columns = [column for column in LEADING_COLUMNS if column in columns] + [
+            column for column in columns if column not in LEADING_COLUMNS
+        ]
+        stats['columns'] = output_columns
+        items = itertools.chain([first], merged) if first is not None else iter(())
+
+        with open(output_path, 'w', encoding='utf-8', newline='') as out, \
+                open(conflicts_path, 'w', encoding='utf-8') as conflicts:
+            writer = csv.writer(out)
+            writer.writerow(output_columns)
+            for key, group in itertools.groupby(items, key=itemgetter(0)):
+                rows = {}
+                for _, index, _, row in group:
+                    if index in rows:
+                        sources[index].duplicates += 1  # Keep the first row of a source
+                    else:
+                        rows[index] = row
+                stats['products'] += 1
+                if len(rows) > 1:
+                    stats['multiSource'] += 1
+
+                merged_row = {}
+                for field in output_columns:
+                    candidates = [
+                        (index, rows[index][field]) for index in priorities.get(field, default_order)
+                        if index in rows and rows[index].get(field) is not None
+                    ]
+                    if not candidates:
+                        continue
+                    merged_row[field] = candidates[0][1]
+                    if len({_comparable(value) for _, value in candidates}) > 1:
+                        stats['conflicts'][field] += 1
+                        conflicts.write(json.dumps({
+                            'key': key,
+                            'name': merged_row.get('NAME'),
+                            'field': field,
+                            'chosen': sources[candidates[0][0]].name,
+                            'values': {sources[index].name: value for index, value in candidates},
+                        }, ensure_ascii=False) + '\n')
+                writer.writerow([merged_row.get(column, '') for column in output_columns])
+    return stats
+
+
+def print_merge_report(sources, stats, output_path, conflicts_path):
+    for source in sources:
+        notes = []
+        if source.unkeyed:
+            notes.append(f"{source.unkeyed} without PRODUCTID/NAME skipped")
+        if source.duplicates:
+            notes.append(f"{source.duplicates} repeated key(s), first row kept")
+        print(f"   ✅ {source.name}: {source.rows} rows" + (f" ({'; '.join(notes)})" if notes else ''))
+    print(f"   ✅ Wrote {stats['products']} products ({stats['multiSource']} found in more than one source, "
+          f"{len(stats['columns'])} columns) to '{output_path}'")
+    total = sum(stats['conflicts'].values())
+    if not total:
+        print("   ✅ No conflicting fields")
+        return
+    print(f"   ⚠️  {total} conflicting field value(s) → '{conflicts_path}':")
+    for field, count in stats['conflicts'].most_common():
+        print(f"      - {field}: {count}")
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Merge catalog sources on productId into one CSV.")
+    parser.add_argument('sources', nargs='+', metavar='[NAME=]PATH',
+                        help="Source CSV files, highest default priority first")
+    parser.add_argument('--prefer', action='append', metavar='FIELD[,FIELD]=SOURCE[,SOURCE]',
+                        help="Take these fields from these sources first (repeatable)")
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f"Merged CSV (default: {OUTPUT_FILE})")
+    parser.add_argument('--conflicts', default=CONFLICTS_FILE,
+                        help=f"NDJSON conflict report (default: {CONFLICTS_FILE})")
+    parser.add_argument('--upload', action='store_true',
+                        help="Upload the merged CSV with upload_kbeauty_data.py afterwards")
+    args = parser.parse_args(argv)
+
+    sources = [MergeSource.parse(spec) for spec in args.sources]
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        parser.error(f"source names must be unique: {', '.join(names)}")
+    missing = [source.path for source in sources if not os.path.exists(source.path)]
+    if missing:
+        print(f"❌ Error: File(s) not found: {', '.join(missing)}")
+        return 1
+    try:
+        rules = parse_rules(args.prefer)
+        print(f"🔄 Merging {len(sources)} source(s): {', '.join(names)}...")
+        stats = merge_sources(sources, args.output, args.conflicts, rules=rules)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    print_merge_report(sources, stats, args.output, args.conflicts)
+
+    if args.upload:
+        from upload_kbeauty_data import upload_data
+        return upload_data(os.path.abspath(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
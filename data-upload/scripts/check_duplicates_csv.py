@@ -4,10 +4,18 @@ Check for duplicate ingredient lists - CSV version
 Run this after exporting your Excel file to CSV format
 """
 
+import argparse
 import pandas as pd
 from collections import defaultdict
 import sys
 
+from csv_loader import load_catalog_csv, format_memory_report, format_encoding_report
+from product_identity import find_duplicate_clusters
+from profiling import add_profile_argument, enable_profiling, profile_stage, report_profile
+
+# Only these columns are parsed; ingredient columns are located by name below
+DUPLICATE_CHECK_COLUMNS = ['NAME', 'BRAND', 'CATEGORY', 'KEYINGREDIENTS', 'FULLINGREDIENTLIST']
+
 def check_duplicates_csv():
     csv_file = "4-12-25 DB.csv"
     
@@ -19,8 +27,9 @@ def check_duplicates_csv():
     try:
         # Read CSV
         print(f"Reading: {csv_file}")
-        df = pd.read_csv(csv_file, encoding='utf-8', errors='ignore')
-        print(f"✓ Loaded {len(df)} products\n")
+        with profile_stage('load'):
+            df = load_catalog_csv(csv_file, columns=DUPLICATE_CHECK_COLUMNS)
+        print(f"✓ Loaded {len(df)} products ({format_memory_report(df)}; {format_encoding_report(df)})\n")
         
         # Find ingredient columns
         full_ing_col = None
@@ -55,15 +64,16 @@ def check_duplicates_csv():
             print()
             
             groups = defaultdict(list)
-            for idx, row in df.iterrows():
-                ing = str(row.get(full_ing_col, '')).strip() if pd.notna(row.get(full_ing_col)) else ""
-                if ing:  # Only check non-empty
-                    groups[ing].append({
-                        'row': idx + 2,
-                        'name': str(row.get('NAME', 'N/A')),
-                        'brand': str(row.get('BRAND', 'N/A')),
-                        'category': str(row.get('CATEGORY', 'N/A'))
-                    })
+            with profile_stage('full ingredients'):
+                for idx, row in df.iterrows():
+                    ing = str(row.get(full_ing_col, '')).strip() if pd.notna(row.get(full_ing_col)) else ""
+                    if ing:  # Only check non-empty
+                        groups[ing].append({
+                            'row': idx + 2,
+                            'name': str(row.get('NAME', 'N/A')),
+                            'brand': str(row.get('BRAND', 'N/A')),
+                            'category': str(row.get('CATEGORY', 'N/A'))
+                        })
             
             duplicates = {k: v for k, v in groups.items() if len(v) > 1}
             
@@ -97,15 +107,16 @@ def check_duplicates_csv():
             print()
             
             groups = defaultdict(list)
-            for idx, row in df.iterrows():
-                ing = str(row.get(key_ing_col, '')).strip() if pd.notna(row.get(key_ing_col)) else ""
-                if ing:  # Only check non-empty
-                    groups[ing].append({
-                        'row': idx + 2,
-                        'name': str(row.get('NAME', 'N/A')),
-                        'brand': str(row.get('BRAND', 'N/A')),
-                        'category': str(row.get('CATEGORY', 'N/A'))
-                    })
+            with profile_stage('key ingredients'):
+                for idx, row in df.iterrows():
+                    ing = str(row.get(key_ing_col, '')).strip() if pd.notna(row.get(key_ing_col)) else ""
+                    if ing:  # Only check non-empty
+                        groups[ing].append({
+                            'row': idx + 2,
+                            'name': str(row.get('NAME', 'N/A')),
+                            'brand': str(row.get('BRAND', 'N/A')),
+                            'category': str(row.get('CATEGORY', 'N/A'))
+                        })
             
             duplicates = {k: v for k, v in groups.items() if len(v) > 1}
             
@@ -130,6 +141,37 @@ def check_duplicates_csv():
             else:
                 print("✓ No duplicates found in KEYINGREDIENTS\n")
         
+        # Check product identity (same brand, near-identical names)
+        if 'NAME' in df.columns and 'BRAND' in df.columns:
+            print("=" * 80)
+            print("CHECKING PRODUCT NAMES FOR NEAR-DUPLICATES (same brand)")
+            print("=" * 80)
+            print()
+            
+            with profile_stage('identity'):
+                clusters = find_duplicate_clusters(df, name_column='NAME', brand_column='BRAND')
+            
+            if clusters:
+                duplicates_found = True
+                print(f"⚠️  FOUND {len(clusters)} POSSIBLE DUPLICATE PRODUCTS:\n")
+                
+                for idx, cluster in enumerate(clusters, 1):
+                    print(f"{'='*80}")
+                    print(f"DUPLICATE SET #{idx} - {len(cluster['positions'])} products, "
+                          f"name similarity {cluster['similarity']:.2f}:")
+                    print(f"{'='*80}")
+                    
+                    for position in cluster['positions']:
+                        row = df.iloc[position]
+                        print(f"\n  Row {position + 2}:")
+                        print(f"    Brand: {row.get('BRAND', 'N/A')}")
+                        print(f"    Name: {row.get('NAME', 'N/A')}")
+                        print(f"    Category: {row.get('CATEGORY', 'N/A')}")
+                    
+                    print()
+            else:
+                print("✓ No near-duplicate product names found\n")
+        
         # Summary
         print("=" * 80)
         print("SUMMARY")
@@ -163,6 +205,11 @@ def check_duplicates_csv():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the product CSV for duplicate ingredient lists and products.")
+    add_profile_argument(parser)
+    if parser.parse_args().profile:
+        enable_profiling('check_duplicates_csv')
     success = check_duplicates_csv()
+    report_profile()
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,287 @@
+"""
+Column Sketches for K-Beauty Product Data Upload
+
+A bad export does not always fail validation: a shifted column or a renamed
+header (CONCERNADDRESSED vs CONCERNSADDRESSED) just leaves a field empty on
+every product. Each upload therefore profiles every product field with small
+streaming sketches and compares them with the sketches of the previous upload
+before anything is written.
+
+Per field, in constant memory regardless of the number of rows:
+
+- null rate: share of products where the field is missing or empty
+- distinct count: HyperLogLog estimate (2^HLL_PRECISION one-byte registers)
+- top values: Space-Saving heavy hitters (TOPK_CAPACITY counters, TOPK_SIZE kept)
+- array-length histogram (array fields only), bucketed by ARRAY_LENGTH_BUCKETS
+
+Array fields are counted per element, so the distinct count and top values of
+`concernsAddressed` describe concerns, not concern lists.
+
+Sketches are stored once per catalog generation:
+
+    column_sketches: { _id: <generation>, createdAt, rows,
+                       columns: { concernsAddressed: { nulls, values, distinct,
+                                  hll: <bytes>, topK: [[value, count], ...],
+                                  lengths: {"0": 3, "1": 40, "2": 57, ...} }, ... } }
+
+compare_sketches() reports every field that moved further than DRIFT_THRESHOLDS
+allow between the previous upload and this one.
+"""
+
+import hashlib
+import math
+from datetime import datetime, timezone
+
+HLL_PRECISION = 11          # 2048 registers: ~2.3% standard error on distinct counts
+TOPK_CAPACITY = 50          # Space-Saving counters per field
+TOPK_SIZE = 10              # Top values stored per field
+MAX_VALUE_LENGTH = 80       # Top values are truncated to this many characters
+# Lower bounds of the array-length histogram buckets ("0", "1", "2", "3-4", ..., "50+")
+ARRAY_LENGTH_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# An upload drifts when any field moves further than these limits from the previous upload
+DRIFT_THRESHOLDS = {
+    'nullRate': 0.2,        # Max increase in the share of missing or empty values
+    'distinctRatio': 2.0,   # Max factor by which the distinct count may shrink or grow
+    'topKOverlap': 0.5,     # Min share of values still matching the previous top values
+    'arrayLength': 0.3,     # Max total variation distance between array-length histograms
+}
+DRIFT_MIN_ROWS = 20         # Fields are only compared when both uploads have this many rows
+DISTINCT_MIN = 10           # distinctRatio is only checked above this many distinct values
+TOPK_MIN_COVERAGE = 0.5     # topKOverlap is only checked when the top values cover this share
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _sketch_value(value):
+    """The text a value is counted as (booleans spelled like JSON, numbers without noise)."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+class HyperLogLog:
+    """Distinct-count estimator with 2^precision one-byte registers."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError(f"Expected {self.size} HyperLogLog registers, got {len(self.registers)}")
+
+    def add(self, text):
+        hashed = _hash64(text)
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size ** 2 / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.size and zeros:
+            return self.size * math.log(self.size / zeros)  # Linear counting for small cardinalities
+        return raw
+
+
+class SpaceSaving:
+    """Top-K heavy hitters in a fixed number of counters (counts are upper bounds)."""
+
+    def __init__(self, capacity=TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, text):
+        if text in self.counts:
+            self.counts[text] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[text] = 1
+        else:
+            # Replace the smallest counter; the newcomer inherits its count
+            smallest = min(self.counts, key=self.counts.get)
+            self.counts[text] = self.counts.pop(smallest) + 1
+
+    def top(self, size=TOPK_SIZE):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:size]
+
+
+def length_bucket(length):
+    """Histogram bucket label of an array length ('0', '1', '3-4', '50+', ...)."""
+    bounds = ARRAY_LENGTH_BUCKETS
+    for position, lower in enumerate(bounds):
+        upper = bounds[position + 1] - 1 if position + 1 < len(bounds) else None
+        if upper is None:
+            return f"{lower}+"
+        if length <= upper:
+            return str(lower) if upper == lower else f"{lower}-{upper}"
+
+
+class ColumnSketch:
+    """Null count, distinct count, top values and array-length histogram of one field."""
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.values = 0
+        self.hll = HyperLogLog()
+        self.top = SpaceSaving()
+        self.lengths = {}
+
+    def _add_value(self, value):
+        text = _sketch_value(value)
+        self.values += 1
+        self.hll.add(text)
+        self.top.add(text[:MAX_VALUE_LENGTH])
+
+    def add(self, value):
+        self.rows += 1
+        if isinstance(value, (list, tuple)):
+            bucket = length_bucket(len(value))
+            self.lengths[bucket] = self.lengths.get(bucket, 0) + 1
+            if not value:
+                self.nulls += 1
+            for item in value:
+                self._add_value(item)
+            return
+        if value is None or (isinstance(value, str) and not value.strip()):
+            self.nulls += 1
+            return
+        self._add_value(value)
+
+    def to_document(self):
+        return {
+            'nulls': self.nulls,
+            'values': self.values,
+            'distinct': round(self.hll.estimate()),
+            'hll': bytes(self.hll.registers),
+            'topK': [[value, count] for value, count in self.top.top()],
+            'lengths': dict(self.lengths) if self.lengths else None,
+        }
+
+
+class CatalogSketch:
+    """Column sketches of every product field in an upload, fed one record at a time."""
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.rows = 0
+        self.columns = {field: ColumnSketch() for field in self.fields}
+
+    def add(self, record):
+        self.rows += 1
+        for field, sketch in self.columns.items():
+            sketch.add(record.get(field))
+
+    def update(self, records):
+        """Add records from any iterable (a list, a chunk or a generator)."""
+        for record in records:
+            self.add(record)
+        return self
+
+    def to_document(self, generation):
+        return {
+            '_id': generation,
+            'createdAt': datetime.now(timezone.utc),
+            'rows': self.rows,
+            'columns': {field: sketch.to_document() for field, sketch in self.columns.items()},
+        }
+
+
+def _shares(column):
+    values = column['values']
+    return {value: count / values for value, count in column['topK']} if values else {}
+
+
+def _length_shares(column):
+    lengths = column.get('lengths') or {}
+    total = sum(lengths.values())
+    return {bucket: count / total for bucket, count in lengths.items()} if total else {}
+
+
+def compare_sketches(previous, current, thresholds=DRIFT_THRESHOLDS):
+    """
+    Fields that drifted beyond the thresholds between two sketch documents.
+
+    Fields missing from the previous sketch, or empty on every product there,
+    never drift.
+
+    Returns:
+        List of {'field', 'metric', 'previous', 'current', 'limit'} dicts
+    """
+    drift = []
+    if previous['rows'] < DRIFT_MIN_ROWS or current['rows'] < DRIFT_MIN_ROWS:
+        return drift
+    for field, now in current['columns'].items():
+        before = previous['columns'].get(field)
+        if before is None:
+            continue
+
+        def report(metric, old, new):
+            drift.append({'field': field, 'metric': metric, 'previous': old, 'current': new,
+                          'limit': thresholds[metric]})
+
+        old_nulls, new_nulls = before['nulls'] / previous['rows'], now['nulls'] / current['rows']
+        if new_nulls - old_nulls > thresholds['nullRate']:
+            report('nullRate', round(old_nulls, 3), round(new_nulls, 3))
+        if not before['values']:
+            continue  # An empty column that is filled again is a fix, not drift
+
+        old_distinct, new_distinct = before['distinct'], now['distinct']
+        if max(old_distinct, new_distinct) >= DISTINCT_MIN:
+            ratio = max(old_distinct, new_distinct) / max(min(old_distinct, new_distinct), 1)
+            if ratio > thresholds['distinctRatio']:
+                report('distinctRatio', old_distinct, new_distinct)
+
+        old_shares, new_shares = _shares(before), _shares(now)
+        if sum(old_shares.values()) >= TOPK_MIN_COVERAGE:
+            overlap = sum(min(share, new_shares.get(value, 0.0)) for value, share in old_shares.items())
+            overlap /= sum(old_shares.values())
+            if overlap < thresholds['topKOverlap']:
+                report('topKOverlap', [value for value, _ in before['topK'][:3]],
+                       [value for value, _ in now['topK'][:3]])
+
+        old_lengths, new_lengths = _length_shares(before), _length_shares(now)
+        if old_lengths and new_lengths:
+            distance = sum(abs(old_lengths.get(bucket, 0.0) - new_lengths.get(bucket, 0.0))
+                           for bucket in old_lengths.keys() | new_lengths.keys()) / 2
+            if distance > thresholds['arrayLength']:
+                report('arrayLength', before['lengths'], now['lengths'])
+    return drift
+
+
+def format_drift(finding):
+    """One-line description of a compare_sketches() finding."""
+    metric, old, new = finding['metric'], finding['previous'], finding['current']
+    if metric == 'nullRate':
+        detail = f"missing/empty in {old:.0%} → {new:.0%} of products"
+    elif metric == 'distinctRatio':
+        detail = f"~{old} → ~{new} distinct values"
+    elif metric == 'topKOverlap':
+        detail = f"top values {old} → {new}"
+    else:
+        detail = f"array lengths {old} → {new}"
+    return f"{finding['field']}: {detail} (limit {metric} {finding['limit']})"
+
+
+class SketchStore:
+    """Column sketch documents, one per catalog generation."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def latest(self):
+        """The sketch document of the newest generation, or None."""
+        return self.collection.find_one(sort=[('_id', -1)])
+
+    def save(self, sketch, generation):
+        """Store the sketch for a generation (replacing it if the catalog was unchanged)."""
+        document = sketch.to_document(generation)
+        self.collection.replace_one({'_id': generation}, document, upsert=True)
+        return document
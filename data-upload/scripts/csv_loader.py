@@ -0,0 +1,119 @@
+"""
+Typed CSV Loader for K-Beauty Product Data
+
+Shared loader for the data-upload scripts. Column dtypes come from
+CSV_COLUMN_DTYPES in validation_config.py instead of pandas inference:
+low-cardinality enums are loaded as categoricals, INSTOCK/SENSITIVITYSAFE as
+nullable booleans and everything else as strings. Each tool passes the
+columns it needs, so unused columns are never parsed.
+
+Column names are left exactly as they appear in the file; only the lookup
+into CSV_COLUMN_DTYPES uses the canonical name ('Content.' prefix and
+whitespace stripped, upper-cased, known typos resolved).
+
+Encoding is sniffed once from a bounded byte sample (BOM, then strict UTF-8,
+then cp1252/latin-1) and the file is transcoded line by line while pandas
+reads it. Lines that do not decode in the detected encoding are decoded
+with a fallback and reported, instead of re-parsing the whole file with
+every candidate encoding.
+
+Usage:
+    df = load_catalog_csv(path, columns=['NAME', 'BRAND', 'CATEGORY'])
+    typed, untyped = memory_usage(df)
+    print(format_encoding_report(df))
+"""
+
+import pandas as pd
+
+from validation_config import CSV_COLUMN_DTYPES, BOOLEAN_VALUES
+from csv_scan import detect_encoding, TranscodingReader, canonical_column, read_header, format_decoding
+
+
+def to_nullable_boolean(series):
+    """Convert TRUE/FALSE-style strings to the nullable 'boolean' dtype (unknown -> <NA>)."""
+    return series.str.strip().str.upper().map(BOOLEAN_VALUES).astype('boolean')
+
+
+def _convert_booleans(df, boolean_columns):
+    for column in boolean_columns:
+        if column in df.columns:
+            df[column] = to_nullable_boolean(df[column])
+    return df
+
+
+def load_catalog_csv(csv_path, columns=None, encoding=None, dtype_overrides=None, **read_csv_kwargs):
+    """
+    Load a catalog CSV with schema-declared dtypes.
+
+    Args:
+        csv_path: Path to the CSV file
+        columns: Canonical column names to load (None loads every column)
+        encoding: File encoding (None detects it from a byte sample)
+        dtype_overrides: Canonical column -> dtype, e.g. {'INSTOCK': 'string'} to keep raw text
+        **read_csv_kwargs: Passed to pd.read_csv (e.g. chunksize)
+
+    Returns:
+        DataFrame, or an iterator of DataFrames when chunksize is given.
+        df.attrs['encoding'] and df.attrs['undecodable_lines'] describe the decoding.
+    """
+    encoding = encoding or detect_encoding(csv_path)
+    dtypes = dict(CSV_COLUMN_DTYPES)
+    dtypes.update(dtype_overrides or {})
+    wanted = {canonical_column(column) for column in columns} if columns else None
+
+    usecols, read_dtypes, boolean_columns = [], {}, []
+    for raw in read_header(csv_path, encoding=encoding):
+        canonical = canonical_column(raw)
+        if wanted is not None and canonical not in wanted:
+            continue
+        usecols.append(raw)
+        dtype = dtypes.get(canonical, 'string')
+        if dtype == 'boolean':
+            # Parsed as text first so every accepted spelling is recognized
+            boolean_columns.append(raw)
+            dtype = 'string'
+        read_dtypes[raw] = dtype
+
+    reader = TranscodingReader(csv_path, encoding)
+    if read_csv_kwargs.get('chunksize'):
+        return _read_chunks(reader, usecols, read_dtypes, boolean_columns, read_csv_kwargs)
+    with reader:
+        df = pd.read_csv(reader, usecols=usecols, dtype=read_dtypes, **read_csv_kwargs)
+    return _finish(df, reader, boolean_columns)
+
+
+def _finish(df, reader, boolean_columns):
+    df.attrs['encoding'] = reader.encoding
+    df.attrs['undecodable_lines'] = list(reader.undecodable_lines)
+    return _convert_booleans(df, boolean_columns)
+
+
+def _read_chunks(reader, usecols, read_dtypes, boolean_columns, read_csv_kwargs):
+    with reader, pd.read_csv(reader, usecols=usecols, dtype=read_dtypes, **read_csv_kwargs) as chunks:
+        for chunk in chunks:
+            yield _finish(chunk, reader, boolean_columns)
+
+
+def format_encoding_report(df, max_lines=10):
+    """One-line summary of the detected encoding and any undecodable lines."""
+    return format_decoding(df.attrs.get('encoding', 'unknown'), df.attrs.get('undecodable_lines', []),
+                           max_lines=max_lines)
+
+
+def memory_usage(df):
+    """
+    Return (typed_bytes, untyped_bytes): memory of the DataFrame as loaded and
+    as it would be with every column stored as Python objects.
+    """
+    typed = int(df.memory_usage(deep=True).sum())
+    untyped = int(df.astype(object).memory_usage(deep=True).sum())
+    return typed, untyped
+
+
+def format_memory_report(df):
+    """One-line memory summary for progress output."""
+    typed, untyped = memory_usage(df)
+    saved = untyped - typed
+    percent = (saved / untyped * 100) if untyped else 0
+    return (f"{len(df.columns)} columns, {typed / 1024:,.0f} KB in memory "
+            f"(vs {untyped / 1024:,.0f} KB untyped, {percent:.0f}% saved)")
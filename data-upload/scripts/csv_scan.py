@@ -0,0 +1,211 @@
+"""
+Lightweight CSV Scanning for K-Beauty Product Data
+
+The pandas-free half of the CSV loader. Importing pandas takes longer than
+reading the whole catalog, so quick checks (row counts, filtering one
+column, pre-commit and editor hooks) read the file with the stdlib csv
+module through this module and only import pandas when they are asked for
+something that needs a DataFrame.
+
+Encoding detection, line-by-line transcoding and canonical column names are
+shared with csv_loader.py, which builds on them, so both paths decode a file
+and name its columns identically. Cells use the same missing-value rules as
+pd.read_csv: empty strings and pandas' default NA markers ('N/A', 'null',
+...) are returned as None.
+
+Usage:
+    scan = CatalogScan(path, columns=['NAME', 'CATEGORY'])
+    for row_number, row in scan:
+        ...
+    print(format_decoding(scan.encoding, scan.undecodable_lines))
+"""
+
+import codecs
+import csv
+
+from validation_config import CSV_COLUMN_ALIASES
+
+
+SNIFF_BYTES = 64 * 1024  # Bytes sampled for encoding detection
+# Bytes that are unassigned in cp1252; a sample containing them is latin-1
+CP1252_UNDEFINED_BYTES = {0x81, 0x8D, 0x8F, 0x90, 0x9D}
+
+
+def detect_encoding(csv_path, sample_bytes=SNIFF_BYTES):
+    """
+    Detect the encoding of a file from its first `sample_bytes` bytes.
+
+    Returns one of 'utf-8-sig', 'utf-16', 'utf-8', 'cp1252' or 'latin-1'.
+    """
+    with open(csv_path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # final=False: a multi-byte character cut off at the end of the sample is fine
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if CP1252_UNDEFINED_BYTES.intersection(sample):
+        return 'latin-1'
+    return 'cp1252'
+
+
+class TranscodingReader:
+    """
+    Text stream over a byte file that decodes line by line.
+
+    Lines that fail to decode in `encoding` are decoded with `fallback`
+    (undecodable bytes replaced) and their physical line numbers recorded in
+    `undecodable_lines`. pandas can read from it directly.
+    """
+
+    def __init__(self, csv_path, encoding, fallback='cp1252'):
+        self.encoding = encoding
+        self.fallback = fallback if fallback != encoding else 'latin-1'
+        self.undecodable_lines = []
+        self._raw = open(csv_path, 'rb')
+        self._buffer = ''
+        self._line_number = 0
+        if encoding == 'utf-8-sig':
+            # Skip the BOM once; every line is then plain UTF-8
+            self._raw.read(len(codecs.BOM_UTF8))
+            self.encoding = 'utf-8'
+        if encoding == 'utf-16':
+            # UTF-16 cannot be split on b'\n'; decode the stream as a whole
+            self._text = codecs.getreader('utf-16')(self._raw, errors='replace')
+        else:
+            self._text = None
+
+    def _next_line(self):
+        if self._text is not None:
+            return self._text.readline() or None
+        line = self._raw.readline()
+        if not line:
+            return None
+        self._line_number += 1
+        try:
+            return line.decode(self.encoding)
+        except UnicodeDecodeError:
+            self.undecodable_lines.append(self._line_number)
+            return line.decode(self.fallback, errors='replace')
+
+    def read(self, size=-1):
+        chunks, length = [self._buffer], len(self._buffer)
+        while size is None or size < 0 or length < size:
+            line = self._next_line()
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        if size is None or size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self):
+        if '\n' in self._buffer:
+            line, _, self._buffer = self._buffer.partition('\n')
+            return line + '\n'
+        line = self._buffer + (self._next_line() or '')
+        self._buffer = ''
+        return line
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def canonical_column(name):
+    """Canonical column name used for dtype lookup (e.g. ' Content.Texture' -> 'TEXTURE')."""
+    canonical = str(name).replace('Content.', '').strip().upper()
+    return CSV_COLUMN_ALIASES.get(canonical, canonical)
+
+
+def read_header(csv_path, encoding=None):
+    """Read only the header row of a CSV file."""
+    with TranscodingReader(csv_path, encoding or detect_encoding(csv_path)) as reader:
+        return next(csv.reader(reader), [])
+
+
+def format_decoding(encoding, undecodable_lines, max_lines=10):
+    """One-line summary of the encoding used and any undecodable lines."""
+    if not undecodable_lines:
+        return f"encoding: {encoding}"
+    shown = ', '.join(str(line) for line in undecodable_lines[:max_lines])
+    more = f" (+{len(undecodable_lines) - max_lines} more)" if len(undecodable_lines) > max_lines else ''
+    return (f"encoding: {encoding}, {len(undecodable_lines)} line(s) with undecodable bytes "
+            f"replaced: {shown}{more}")
+
+
+# pd.read_csv's default NA markers, so scanned rows agree with loaded DataFrames
+NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+class CatalogScan:
+    """
+    Iterate a catalog CSV as (row_number, {column: text or None}) without pandas.
+
+    Column names are kept as they appear in the file; `columns` selects them
+    by canonical name like load_catalog_csv. Row numbers follow the
+    convention of the reports (first data row = 2) and blank lines are
+    skipped, as pandas does. `undecodable_lines` is complete once iteration
+    has finished.
+    """
+
+    def __init__(self, csv_path, columns=None, encoding=None):
+        self.csv_path = csv_path
+        self.encoding = encoding or detect_encoding(csv_path)
+        self.wanted = {canonical_column(column) for column in columns} if columns else None
+        self.columns = [column for column in read_header(csv_path, encoding=self.encoding)
+                        if self._selected(column)]
+        self.undecodable_lines = []
+
+    def _selected(self, column):
+        return self.wanted is None or canonical_column(column) in self.wanted
+
+    def find_column(self, canonical):
+        """Column name in the file for a canonical name (None when absent)."""
+        for column in self.columns:
+            if canonical_column(column) == canonical:
+                return column
+        return None
+
+    def __iter__(self):
+        with TranscodingReader(self.csv_path, self.encoding) as reader:
+            self.encoding = reader.encoding
+            self.undecodable_lines = reader.undecodable_lines
+            rows = csv.reader(reader)
+            header = next(rows, [])
+            positions = [(position, column) for position, column in enumerate(header)
+                         if self._selected(column)]
+            row_number = 1
+            for values in rows:
+                if not values:
+                    continue
+                row_number += 1
+                row = {}
+                for position, column in positions:
+                    value = values[position] if position < len(values) else ''
+                    row[column] = None if value in NA_VALUES else value
+                yield row_number, row
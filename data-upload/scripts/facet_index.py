@@ -0,0 +1,163 @@
+"""
+Facet Index for K-Beauty Product Data Upload
+
+Precomputes the product filters of the catalog so the web server can filter
+and count by facet without scanning products. Every product gets a bit
+position (its index in the sorted productId list); every category and every
+facet value gets a bitset with the bits of its products:
+
+    {
+      "version": 1, "generation": 12, "catalogHash": "<bundle hash>",
+      "productIds": ["anua-heartleaf-...", ...],
+      "categories": { "cleanser": {"count": 18, "bits": "<base64>"}, ... },
+      "facets": { "skinType": { "dry": {"count": 61, "bits": "<base64>"}, ... }, ... }
+    }
+
+Bit i is byte i // 8, bit i % 8 (least significant first). Filtering by
+several facets is an AND of bitsets (an OR within one facet), and counting is
+a popcount, see src/lib/facetIndex.js.
+
+The index is built for the same records as the catalog bundle and written
+next to it (facets-<hash>.json.gz); the bundle manifest names both files, so
+replacing the manifest switches bundle and index together. A copy is stored
+in MongoDB with the catalog generation as _id.
+"""
+
+import base64
+import hashlib
+import json
+
+from bson.binary import Binary
+
+FACET_INDEX_VERSION = 1
+FACET_FILE_PATTERN = 'facets-{}.json.gz'
+FACET_INDEXES_TO_KEEP = 3  # Generations kept in MongoDB
+# Facet name (query parameter) -> product field (string or string array)
+FACET_FIELDS = {
+    'skinType': 'skinTypes',
+    'concern': 'concernsAddressed',
+    'climate': 'climateSuitability',
+    'preference': 'preferences',
+    'texture': 'texture',
+    'usage': 'usage',
+    'inStock': 'inStock',
+}
+
+
+def _facet_values(value):
+    """Facet values of one field value ('true'/'false' for booleans)."""
+    if value is None:
+        return []
+    if isinstance(value, bool):
+        return ['true' if value else 'false']
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item is not None and str(item).strip()]
+    text = str(value).strip()
+    return [text] if text else []
+
+
+def _set_bit(bitsets, counts, value, position, size):
+    bits = bitsets.get(value)
+    if bits is None:
+        bits = bitsets[value] = bytearray((size + 7) // 8)
+    bits[position >> 3] |= 1 << (position & 7)
+    counts[value] = counts.get(value, 0) + 1
+
+
+def build_facet_index(records, generation=None, catalog_hash=None):
+    """
+    Build the facet index of encoded product records.
+
+    Records without a productId are skipped.
+
+    Returns:
+        Index dict with bitsets as bytes (see to_json() / to_document())
+
+    Raises:
+        ValueError: If two records share a productId (a bit position must name
+            one product; uploads reject these rows during validation)
+    """
+    products = {}
+    for record in records:
+        product_id = record.get('productId')
+        if product_id is None:
+            continue
+        if str(product_id) in products:
+            raise ValueError(f"productId '{product_id}' is used by more than one product")
+        products[str(product_id)] = record
+    product_ids = sorted(products)
+    size = len(product_ids)
+
+    categories = ({}, {})
+    facets = {facet: ({}, {}) for facet in FACET_FIELDS}
+    for position, product_id in enumerate(product_ids):
+        record = products[product_id]
+        _set_bit(*categories, record.get('category', 'other'), position, size)
+        for facet, field in FACET_FIELDS.items():
+            for value in set(_facet_values(record.get(field))):
+                _set_bit(*facets[facet], value, position, size)
+
+    def entries(bitsets, counts):
+        return {value: {'count': counts[value], 'bits': bytes(bitsets[value])} for value in sorted(bitsets)}
+
+    return {
+        'version': FACET_INDEX_VERSION,
+        'generation': generation,
+        'catalogHash': catalog_hash,
+        'productIds': product_ids,
+        'categories': entries(*categories),
+        'facets': {facet: entries(*values) for facet, values in facets.items()},
+    }
+
+
+def _map_bitsets(index, convert):
+    converted = dict(index)
+    converted['categories'] = {
+        category: dict(entry, bits=convert(entry['bits'])) for category, entry in index['categories'].items()
+    }
+    converted['facets'] = {
+        facet: {value: dict(entry, bits=convert(entry['bits'])) for value, entry in values.items()}
+        for facet, values in index['facets'].items()
+    }
+    return converted
+
+
+def to_json(index):
+    """Compact JSON bytes with base64 bitsets (the file the web server reads)."""
+    encoded = _map_bitsets(index, lambda bits: base64.b64encode(bits).decode('ascii'))
+    return json.dumps(encoded, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def content_hash(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+
+def to_document(index):
+    """
+    MongoDB document for the index, keyed by generation.
+
+    Facet values become {value, count, bits} lists because they are not safe field names.
+    """
+    index = _map_bitsets(index, Binary)
+    return {
+        '_id': index['generation'],
+        'version': index['version'],
+        'catalogHash': index['catalogHash'],
+        'productIds': index['productIds'],
+        'categories': [dict(entry, value=category) for category, entry in index['categories'].items()],
+        'facets': {
+            facet: [dict(entry, value=value) for value, entry in values.items()]
+            for facet, values in index['facets'].items()
+        },
+    }
+
+
+def save_facet_index(collection, index, keep=FACET_INDEXES_TO_KEEP):
+    """
+    Store the index of a generation in one document write, then prune old generations.
+
+    Returns:
+        The number of older generations removed
+    """
+    collection.replace_one({'_id': index['generation']}, to_document(index), upsert=True)
+    return collection.delete_many({'_id': {'$lte': index['generation'] - keep}}).deleted_count
@@ -1,19 +1,38 @@
 #!/usr/bin/env python3
+import argparse
 import pandas as pd
-from collections import defaultdict
 import re
 
+from csv_scan import canonical_column
+from csv_loader import load_catalog_csv, format_encoding_report
+from fuzzy_match import VocabularyIndex, format_mapping_patch
+from validation_config import CONCERN_MAPPING, CLIMATE_MAPPING, TEXTURE_MAPPING, PREFERENCE_MAPPING
+from profiling import add_profile_argument, enable_profiling, profile_stage, report_profile
+from violation_report import ViolationAggregator, add_report_arguments
+
 csv_file = "4-12-25 DB.csv"
 output_file = "invalid_values_report.txt"
+patch_file = "invalid_values_mapping_patch.txt"
+
+# Columns checked below; booleans are kept as raw text so invalid spellings can be reported
+CHECKED_COLUMNS = ['NAME', 'CATEGORY', 'SKINTYPES', 'CONCERNSADDRESSED', 'SENSITIVITYSAFE',
+                   'INSTOCK', 'GENDER', 'TEXTURE', 'USAGE', 'FREQUENCY', 'CLIMATESUITABILITY',
+                   'PREFERENCES', 'RATING']
+RAW_TEXT_COLUMNS = {'INSTOCK': 'string', 'SENSITIVITYSAFE': 'string'}
+
+parser = argparse.ArgumentParser(description="Report invalid values in the product CSV.")
+add_profile_argument(parser)
+add_report_arguments(parser)
+args = parser.parse_args()
+if args.profile:
+    enable_profiling('find_invalid_values')
 
-# Try different encodings
-try:
-    df = pd.read_csv(csv_file, encoding='utf-8')
-except UnicodeDecodeError:
-    try:
-        df = pd.read_csv(csv_file, encoding='latin-1')
-    except:
-        df = pd.read_csv(csv_file, encoding='cp1252')
+# Encoding is detected once; lines with undecodable bytes are reported below
+with profile_stage('load'):
+    df = load_catalog_csv(csv_file, columns=CHECKED_COLUMNS, dtype_overrides=RAW_TEXT_COLUMNS)
+encoding_report = format_encoding_report(df)
+# Checks below use canonical names (e.g. CONCERNADDRESSED -> CONCERNSADDRESSED)
+df = df.rename(columns=canonical_column)
 
 # Filter to only rows with actual product names
 if 'NAME' in df.columns:
@@ -75,7 +94,18 @@ VALID_PREFERENCES = {
     'mattifying', 'even-tone'
 }
 
-invalid_values = defaultdict(list)
+# Fields that get "did you mean" suggestions: valid vocabulary, the mapping
+# dictionary in validation_config.py that absorbs fixes, and its current entries
+FUZZY_FIELDS = {
+    'CONCERNSADDRESSED': (VALID_CONCERNS, 'CONCERN_MAPPING', CONCERN_MAPPING),
+    'PREFERENCES': (VALID_PREFERENCES, 'PREFERENCE_MAPPING', PREFERENCE_MAPPING),
+    'TEXTURE': (VALID_TEXTURES, 'TEXTURE_MAPPING', TEXTURE_MAPPING),
+    'CLIMATESUITABILITY': (VALID_CLIMATES, 'CLIMATE_MAPPING', CLIMATE_MAPPING),
+}
+fuzzy_indexes = {field: VocabularyIndex(vocabulary) for field, (vocabulary, _, _) in FUZZY_FIELDS.items()}
+
+# Exact counts per (field, value); only the first 20 rows of each value are kept for the report
+violations = ViolationAggregator(sample_size=20)
 
 def parse_array(value):
     if pd.isna(value) or value == '':
@@ -96,195 +126,176 @@ with open(output_file, 'w', encoding='utf-8') as f:
     f.write("=" * 80 + "\n")
     f.write("INVALID VALUES REPORT\n")
     f.write("=" * 80 + "\n\n")
-    f.write(f"Total products analyzed: {len(df)}\n\n")
+    f.write(f"Total products analyzed: {len(df)}\n")
+    f.write(f"CSV {encoding_report}\n\n")
     
     # Check each row
-    for idx, row in df.iterrows():
-        row_num = idx + 2
+    with profile_stage('check rows'):
+        for idx, row in df.iterrows():
+            row_num = idx + 2
         
-        # Check CATEGORY
-        if 'CATEGORY' in df.columns:
-            category = row.get('CATEGORY', '')
-            if pd.notna(category):
-                category = str(category).strip().upper()
-                if category not in VALID_CATEGORIES:
-                    invalid_values['CATEGORY'].append({
-                        'row': row_num,
-                        'value': category,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
-            elif pd.isna(category) or str(category).strip() == '':
-                invalid_values['CATEGORY (REQUIRED)'].append({
-                    'row': row_num,
-                    'value': 'EMPTY',
-                    'name': str(row.get('NAME', 'N/A'))
-                })
+            # Check CATEGORY
+            if 'CATEGORY' in df.columns:
+                category = row.get('CATEGORY', '')
+                if pd.notna(category):
+                    category = str(category).strip().upper()
+                    if category not in VALID_CATEGORIES:
+                        violations.error('CATEGORY', category, row=row_num, name=row.get('NAME', 'N/A'))
+                elif pd.isna(category) or str(category).strip() == '':
+                    violations.error('CATEGORY (REQUIRED)', 'EMPTY', row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check SKINTYPES
-        if 'SKINTYPES' in df.columns:
-            skin_types = parse_array(row.get('SKINTYPES', ''))
-            for st in skin_types:
-                if st not in VALID_SKIN_TYPES:
-                    invalid_values['SKINTYPES'].append({
-                        'row': row_num,
-                        'value': st,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check SKINTYPES
+            if 'SKINTYPES' in df.columns:
+                skin_types = parse_array(row.get('SKINTYPES', ''))
+                for st in skin_types:
+                    if st not in VALID_SKIN_TYPES:
+                        violations.error('SKINTYPES', st, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check CONCERNSADDRESSED
-        if 'CONCERNSADDRESSED' in df.columns:
-            concerns = parse_array(row.get('CONCERNSADDRESSED', ''))
-            for concern in concerns:
-                if concern not in VALID_CONCERNS:
-                    invalid_values['CONCERNSADDRESSED'].append({
-                        'row': row_num,
-                        'value': concern,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check CONCERNSADDRESSED
+            if 'CONCERNSADDRESSED' in df.columns:
+                concerns = parse_array(row.get('CONCERNSADDRESSED', ''))
+                for concern in concerns:
+                    if concern not in VALID_CONCERNS:
+                        violations.error('CONCERNSADDRESSED', concern, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check SENSITIVITYSAFE
-        if 'SENSITIVITYSAFE' in df.columns:
-            sens_safe = parse_boolean(row.get('SENSITIVITYSAFE', ''))
-            if sens_safe is None and pd.notna(row.get('SENSITIVITYSAFE', '')):
-                invalid_values['SENSITIVITYSAFE'].append({
-                    'row': row_num,
-                    'value': str(row.get('SENSITIVITYSAFE', '')),
-                    'name': str(row.get('NAME', 'N/A'))
-                })
+            # Check SENSITIVITYSAFE
+            if 'SENSITIVITYSAFE' in df.columns:
+                sens_safe = parse_boolean(row.get('SENSITIVITYSAFE', ''))
+                if sens_safe is None and pd.notna(row.get('SENSITIVITYSAFE', '')):
+                    violations.error('SENSITIVITYSAFE', str(row.get('SENSITIVITYSAFE', '')), row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check INSTOCK
-        if 'INSTOCK' in df.columns:
-            in_stock = parse_boolean(row.get('INSTOCK', ''))
-            if in_stock is None and pd.notna(row.get('INSTOCK', '')):
-                invalid_values['INSTOCK'].append({
-                    'row': row_num,
-                    'value': str(row.get('INSTOCK', '')),
-                    'name': str(row.get('NAME', 'N/A'))
-                })
+            # Check INSTOCK
+            if 'INSTOCK' in df.columns:
+                in_stock = parse_boolean(row.get('INSTOCK', ''))
+                if in_stock is None and pd.notna(row.get('INSTOCK', '')):
+                    violations.error('INSTOCK', str(row.get('INSTOCK', '')), row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check GENDER
-        if 'GENDER' in df.columns:
-            gender = row.get('GENDER', '')
-            if pd.notna(gender) and str(gender).strip():
-                gender = str(gender).strip().lower()
-                if gender not in VALID_GENDERS:
-                    invalid_values['GENDER'].append({
-                        'row': row_num,
-                        'value': gender,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check GENDER
+            if 'GENDER' in df.columns:
+                gender = row.get('GENDER', '')
+                if pd.notna(gender) and str(gender).strip():
+                    gender = str(gender).strip().lower()
+                    if gender not in VALID_GENDERS:
+                        violations.error('GENDER', gender, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check TEXTURE
-        if 'TEXTURE' in df.columns:
-            texture = row.get('TEXTURE', '')
-            if pd.notna(texture) and str(texture).strip():
-                texture = str(texture).strip().lower()
-                if texture not in VALID_TEXTURES:
-                    invalid_values['TEXTURE'].append({
-                        'row': row_num,
-                        'value': texture,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check TEXTURE
+            if 'TEXTURE' in df.columns:
+                texture = row.get('TEXTURE', '')
+                if pd.notna(texture) and str(texture).strip():
+                    texture = str(texture).strip().lower()
+                    if texture not in VALID_TEXTURES:
+                        violations.error('TEXTURE', texture, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check USAGE
-        if 'USAGE' in df.columns:
-            usage = row.get('USAGE', '')
-            if pd.notna(usage) and str(usage).strip():
-                usage = str(usage).strip().lower()
-                if usage not in VALID_USAGE:
-                    invalid_values['USAGE'].append({
-                        'row': row_num,
-                        'value': usage,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
-            elif pd.isna(usage) or str(usage).strip() == '':
-                invalid_values['USAGE (REQUIRED)'].append({
-                    'row': row_num,
-                    'value': 'EMPTY',
-                    'name': str(row.get('NAME', 'N/A'))
-                })
+            # Check USAGE
+            if 'USAGE' in df.columns:
+                usage = row.get('USAGE', '')
+                if pd.notna(usage) and str(usage).strip():
+                    usage = str(usage).strip().lower()
+                    if usage not in VALID_USAGE:
+                        violations.error('USAGE', usage, row=row_num, name=row.get('NAME', 'N/A'))
+                elif pd.isna(usage) or str(usage).strip() == '':
+                    violations.error('USAGE (REQUIRED)', 'EMPTY', row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check FREQUENCY
-        if 'FREQUENCY' in df.columns:
-            frequency = row.get('FREQUENCY', '')
-            if pd.notna(frequency) and str(frequency).strip():
-                frequency = str(frequency).strip().lower()
-                if frequency not in VALID_FREQUENCY:
-                    invalid_values['FREQUENCY'].append({
-                        'row': row_num,
-                        'value': frequency,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check FREQUENCY
+            if 'FREQUENCY' in df.columns:
+                frequency = row.get('FREQUENCY', '')
+                if pd.notna(frequency) and str(frequency).strip():
+                    frequency = str(frequency).strip().lower()
+                    if frequency not in VALID_FREQUENCY:
+                        violations.error('FREQUENCY', frequency, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check CLIMATESUITABILITY
-        if 'CLIMATESUITABILITY' in df.columns:
-            climates = parse_array(row.get('CLIMATESUITABILITY', ''))
-            for climate in climates:
-                if climate not in VALID_CLIMATES:
-                    invalid_values['CLIMATESUITABILITY'].append({
-                        'row': row_num,
-                        'value': climate,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check CLIMATESUITABILITY
+            if 'CLIMATESUITABILITY' in df.columns:
+                climates = parse_array(row.get('CLIMATESUITABILITY', ''))
+                for climate in climates:
+                    if climate not in VALID_CLIMATES:
+                        violations.error('CLIMATESUITABILITY', climate, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check PREFERENCES
-        if 'PREFERENCES' in df.columns:
-            preferences = parse_array(row.get('PREFERENCES', ''))
-            for pref in preferences:
-                if pref not in VALID_PREFERENCES:
-                    invalid_values['PREFERENCES'].append({
-                        'row': row_num,
-                        'value': pref,
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check PREFERENCES
+            if 'PREFERENCES' in df.columns:
+                preferences = parse_array(row.get('PREFERENCES', ''))
+                for pref in preferences:
+                    if pref not in VALID_PREFERENCES:
+                        violations.error('PREFERENCES', pref, row=row_num, name=row.get('NAME', 'N/A'))
         
-        # Check RATING
-        if 'RATING' in df.columns:
-            rating = row.get('RATING', '')
-            if pd.notna(rating) and str(rating).strip():
-                try:
-                    rating_val = float(str(rating).strip())
-                    if rating_val < 0 or rating_val > 5:
-                        invalid_values['RATING'].append({
-                            'row': row_num,
-                            'value': str(rating_val),
-                            'name': str(row.get('NAME', 'N/A'))
-                        })
-                except:
-                    invalid_values['RATING'].append({
-                        'row': row_num,
-                        'value': str(rating),
-                        'name': str(row.get('NAME', 'N/A'))
-                    })
+            # Check RATING
+            if 'RATING' in df.columns:
+                rating = row.get('RATING', '')
+                if pd.notna(rating) and str(rating).strip():
+                    try:
+                        rating_val = float(str(rating).strip())
+                        if rating_val < 0 or rating_val > 5:
+                            violations.error('RATING', str(rating_val), row=row_num, name=row.get('NAME', 'N/A'))
+                    except:
+                        violations.error('RATING', str(rating), row=row_num, name=row.get('NAME', 'N/A'))
+    
+    # Propose the nearest valid value for each unknown token
+    with profile_stage('suggest'):
+        suggestions = {}  # (field, value) -> correction
+        for field, (_, mapping_name, mapping) in FUZZY_FIELDS.items():
+            for group in violations.sorted_groups(field=field):
+                value = group['value']
+                if value in mapping:
+                    continue  # Already absorbed by the uploader's mapping
+                match = fuzzy_indexes[field].suggest(value)
+                if match is None:
+                    continue
+                suggestion, distance = match
+                suggestions[(field, value)] = {
+                    'mapping': mapping_name,
+                    'value': value,
+                    'suggestion': suggestion,
+                    # Extended concerns are stored as their core concern
+                    'target': mapping.get(suggestion, suggestion),
+                    'distance': distance,
+                    'rows': group['count'],
+                }
+    corrections = sorted(suggestions.values(), key=lambda c: (-c['rows'], c['distance'], c['mapping'], c['value']))
     
     # Write results
-    if not invalid_values:
+    if not violations.count():
         f.write("✓ No invalid values found! All data is valid according to the schema.\n")
     else:
         f.write("INVALID VALUES FOUND:\n\n")
-        for field, errors in sorted(invalid_values.items()):
+        for field in violations.fields():
+            groups = violations.sorted_groups(field=field)
             f.write("=" * 80 + "\n")
             f.write(f"FIELD: {field}\n")
-            f.write(f"Total invalid entries: {len(errors)}\n")
+            f.write(f"Total invalid entries: {sum(group['count'] for group in groups)}\n")
             f.write("=" * 80 + "\n\n")
             
-            # Group by value
-            value_groups = defaultdict(list)
-            for error in errors:
-                value_groups[error['value']].append(error)
-            
-            for value, occurrences in sorted(value_groups.items()):
+            for group in sorted(groups, key=lambda group: group['value']):
+                value = group['value']
                 f.write(f"  Invalid Value: '{value}'\n")
-                f.write(f"  Found in {len(occurrences)} product(s):\n")
-                for occ in occurrences[:20]:  # Limit to first 20 per value
-                    f.write(f"    - Row {occ['row']}: {occ['name']}\n")
-                if len(occurrences) > 20:
-                    f.write(f"    ... and {len(occurrences) - 20} more\n")
+                if (field, value) in suggestions:
+                    correction = suggestions[(field, value)]
+                    f.write(f"  Did you mean: '{correction['suggestion']}'? (distance {correction['distance']})\n")
+                f.write(f"  Found in {group['count']} product(s):\n")
+                for sample in group['samples']:
+                    f.write(f"    - Row {sample['row']}: {sample['name']}\n")
+                if group['count'] > len(group['samples']):
+                    f.write(f"    ... and {group['count'] - len(group['samples'])} more\n")
                 f.write("\n")
     
+    if corrections:
+        patch = format_mapping_patch(corrections)
+        f.write("=" * 80 + "\n")
+        f.write("SUGGESTED MAPPING PATCH (validation_config.py, most rows first)\n")
+        f.write("=" * 80 + "\n\n")
+        f.write("Review each entry before merging it into the mapping dictionaries.\n\n")
+        f.write(patch)
+        with open(patch_file, 'w', encoding='utf-8') as patch_out:
+            patch_out.write(patch)
+    
     f.write("\n" + "=" * 80 + "\n")
     f.write("VALIDATION COMPLETE\n")
     f.write("=" * 80 + "\n")
     
     print(f"Report saved to: {output_file}")
+    if corrections:
+        print(f"Mapping patch ({len(corrections)} suggestion(s)) saved to: {patch_file}")
+    for path in violations.write(args.json_report, args.ndjson_report, source=csv_file, rows=len(df)):
+        print(f"Violation report saved to: {path}")
+
+report_profile()
 
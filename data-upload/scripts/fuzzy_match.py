@@ -0,0 +1,139 @@
+"""
+Fuzzy Vocabulary Matching for K-Beauty Product Data Upload
+
+Proposes the nearest valid value for an unknown enum/array token (e.g. the
+concern 'wrinkle' -> 'wrinkles', the texture 'gel cream' -> 'gel-cream').
+
+Each vocabulary is indexed once in a BK-tree keyed on Levenshtein distance.
+A lookup only visits subtrees whose edge distance lies within
+[d - max_distance, d + max_distance] of the query (triangle inequality), so
+most of the vocabulary is never compared against the token.
+
+Usage:
+    index = VocabularyIndex(VALID_TEXTURES)
+    index.suggest('gel cream')   # -> ('gel-cream', 0)
+"""
+
+import re
+
+_SEPARATORS = re.compile(r'[\s_]+')
+
+
+def levenshtein(a, b):
+    """Edit distance between two strings (insertions, deletions, substitutions)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def normalize_token(token):
+    """Lower-case and use hyphens as word separators, like the VALID_* sets."""
+    return _SEPARATORS.sub('-', str(token).strip().lower())
+
+
+def default_max_distance(token):
+    """Allow one edit per four characters, between 1 and 3."""
+    return max(1, min(3, len(token) // 4))
+
+
+class BKTree:
+    """Burkhard-Keller tree over a set of words for bounded edit-distance search."""
+
+    def __init__(self, words=(), distance=levenshtein):
+        self.distance = distance
+        self.root = None  # (word, {edge distance: child node})
+        for word in sorted(words):  # Sorted so the tree shape is reproducible
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            node_word, children = node
+            d = self.distance(word, node_word)
+            if d == 0:
+                return
+            if d not in children:
+                children[d] = (word, {})
+                return
+            node = children[d]
+
+    def search(self, word, max_distance):
+        """Return [(distance, word)] within max_distance, closest first."""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            d = self.distance(word, node_word)
+            if d <= max_distance:
+                matches.append((d, node_word))
+            for edge, child in children.items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        return sorted(matches)
+
+
+class VocabularyIndex:
+    """Nearest-valid-value lookup over one VALID_* vocabulary."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = set(vocabulary)
+        self.tree = BKTree(self.vocabulary)
+
+    def suggest(self, token, max_distance=None):
+        """
+        Return (nearest valid value, distance) for a token, or None if nothing is close.
+
+        Separator-only differences ('gel cream' vs 'gel-cream') count as distance 0.
+        """
+        normalized = normalize_token(token)
+        if normalized in self.vocabulary:
+            return normalized, 0
+        if max_distance is None:
+            max_distance = default_max_distance(normalized)
+        matches = self.tree.search(normalized, max_distance)
+        if not matches:
+            return None
+        distance, word = matches[0]
+        return word, distance
+
+
+def format_mapping_patch(corrections):
+    """
+    Format corrections as Python dict entries to review and paste into validation_config.py.
+
+    Args:
+        corrections: Dicts with 'mapping', 'value', 'target', 'suggestion',
+            'distance' and 'rows', already ranked
+
+    Returns:
+        Patch text, one block per mapping dictionary
+    """
+    blocks = {}
+    for correction in corrections:
+        blocks.setdefault(correction['mapping'], []).append(correction)
+
+    lines = []
+    for mapping, entries in blocks.items():
+        lines.append(f"{mapping} = {{")
+        for entry in entries:
+            via = f" via '{entry['suggestion']}'" if entry['suggestion'] != entry['target'] else ''
+            lines.append(f"    '{entry['value']}': '{entry['target']}',  "
+                         f"# {entry['rows']} row(s), distance {entry['distance']}{via}")
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
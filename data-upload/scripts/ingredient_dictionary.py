@@ -0,0 +1,147 @@
+"""
+Ingredient Dictionary for K-Beauty Product Data Upload
+
+Maps canonical (normalized) ingredient names to small integer IDs so that
+products can store packed integer arrays instead of repeating long hyphenated
+strings across hundreds of documents.
+
+The dictionary lives in its own MongoDB collection:
+
+    { _id: <int id>, name: "centella-asiatica", docFrequency: 42 }
+
+IDs are stable across uploads: existing entries are loaded before new names are
+assigned, so an ingredient keeps its ID for as long as the collection exists.
+Readers resolve the IDs back to names with lookup() / resolve_record() here
+and with src/lib/ingredients.js on the web server.
+"""
+
+import struct
+
+from bson.binary import Binary
+from pymongo import ReplaceOne
+
+# Packed arrays are little-endian unsigned 16-bit integers (max 65,535 ingredients)
+PACKED_ID_FORMAT = '<{}H'
+MAX_INGREDIENT_ID = 0xFFFF
+
+# Product fields that hold ingredient name lists -> field that holds the packed IDs
+INGREDIENT_ID_FIELDS = {
+    'keyIngredients': 'keyIngredientIds',
+    'fullIngredientList': 'fullIngredientIds',
+}
+
+
+def pack_ingredient_ids(ids):
+    """Pack a list of ingredient IDs into a compact BSON binary value."""
+    return Binary(struct.pack(PACKED_ID_FORMAT.format(len(ids)), *ids))
+
+
+def unpack_ingredient_ids(packed):
+    """Unpack a BSON binary value produced by pack_ingredient_ids()."""
+    data = bytes(packed)
+    return list(struct.unpack(PACKED_ID_FORMAT.format(len(data) // 2), data))
+
+
+class IngredientDictionary:
+    """Bidirectional name <-> ID mapping with per-catalog document frequency."""
+
+    def __init__(self, entries=None):
+        self.name_to_id = {}
+        self.id_to_name = {}
+        self.doc_frequency = {}
+        for entry in entries or []:
+            self.name_to_id[entry['name']] = entry['_id']
+            self.id_to_name[entry['_id']] = entry['name']
+        self._next_id = max(self.id_to_name, default=0) + 1
+
+    @classmethod
+    def load(cls, collection):
+        """Load the existing dictionary from MongoDB (IDs are preserved)."""
+        return cls(collection.find({}, {'_id': 1, 'name': 1}))
+
+    def intern(self, name):
+        """Return the ID for an ingredient name, assigning a new one if needed."""
+        ingredient_id = self.name_to_id.get(name)
+        if ingredient_id is None:
+            if self._next_id > MAX_INGREDIENT_ID:
+                raise ValueError(
+                    f"Ingredient dictionary is full ({MAX_INGREDIENT_ID} entries); "
+                    f"cannot assign an ID to '{name}'"
+                )
+            ingredient_id = self._next_id
+            self._next_id += 1
+            self.name_to_id[name] = ingredient_id
+            self.id_to_name[ingredient_id] = name
+        return ingredient_id
+
+    def lookup(self, ids):
+        """Resolve a list (or packed binary) of IDs back to ingredient names."""
+        if isinstance(ids, (bytes, Binary)):
+            ids = unpack_ingredient_ids(ids)
+        return [self.id_to_name[i] for i in ids]
+
+    def resolve_record(self, record):
+        """Copy of a product record with ingredient name arrays in place of its packed IDs."""
+        resolved = dict(record)
+        for name_field, id_field in INGREDIENT_ID_FIELDS.items():
+            packed = resolved.pop(id_field, None)
+            if packed is not None and name_field not in resolved:
+                resolved[name_field] = self.lookup(packed)
+        return resolved
+
+    def intern_records(self, records, keep_strings=False):
+        """
+        Add packed ingredient ID fields to product records and count document frequency.
+        
+        Frequencies accumulate across calls, so records can be interned batch by batch.
+
+        Args:
+            records: List of product dicts (modified in place)
+            keep_strings: Also keep the original string arrays (by default they are
+                replaced by the packed IDs)
+
+        Returns:
+            Number of ingredient references that were interned
+        """
+        interned = 0
+        for record in records:
+            seen_in_product = set()
+            for name_field, id_field in INGREDIENT_ID_FIELDS.items():
+                names = record.get(name_field)
+                if not isinstance(names, list):
+                    continue
+                ids = [self.intern(name) for name in names]
+                record[id_field] = pack_ingredient_ids(ids)
+                seen_in_product.update(ids)
+                interned += len(ids)
+                if not keep_strings:
+                    del record[name_field]
+            for ingredient_id in seen_in_product:
+                self.doc_frequency[ingredient_id] = self.doc_frequency.get(ingredient_id, 0) + 1
+        return interned
+
+    def to_documents(self):
+        """Build dictionary documents for the ingredients collection."""
+        return [
+            {'_id': ingredient_id, 'name': name,
+             'docFrequency': self.doc_frequency.get(ingredient_id, 0)}
+            for ingredient_id, name in sorted(self.id_to_name.items())
+        ]
+
+    def to_operations(self):
+        """Build upsert operations for the ingredients collection (sync or async bulk_write)."""
+        return [
+            ReplaceOne({'_id': doc['_id']}, doc, upsert=True)
+            for doc in self.to_documents()
+        ]
+
+    def save(self, collection):
+        """Upsert all entries into MongoDB, keeping IDs stable."""
+        operations = self.to_operations()
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        collection.create_index('name', unique=True)
+        return len(operations)
+
+    def __len__(self):
+        return len(self.name_to_id)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+kbeauty-data: One Command for the K-Beauty Product Data Stages
+
+Runs the data tools as one dependency graph instead of separate scripts that
+each re-read the CSV:
+
+    load → clean → normalize → validate ─┬→ report
+                        └──→ dedup ──────┤
+                                         └  upload (normalize + validate)
+
+Asking for a stage runs whatever it depends on. Every stage except report and
+upload (which have side effects) stores its output in CACHE_DIR, keyed on a
+hash of the input file, the source of these scripts and the keys of the
+stages it depends on. A later run that needs the same output loads it instead
+of recomputing it, so `validate` followed by `upload` normalizes the catalog
+once. Editing the CSV or any script under scripts/ invalidates the cache.
+
+Normalization runs offline, so productIds for rows without a PRODUCTID are
+generated without the persistent registry. The upload stage resolves them
+against the registry and recomputes similar products only if an ID differs.
+When upload runs, its exit status is the command's (as in
+upload_kbeauty_data.py: 0 uploaded, 1 nothing written, 4 not verified).
+
+Usage:
+    python scripts/kbeauty_data.py validate
+    python scripts/kbeauty_data.py report upload --csv "path/to/4-12-25 DB.csv"
+    python scripts/kbeauty_data.py --graph
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+
+import pandas as pd
+
+from upload_kbeauty_data import (
+    DATABASE_NAME, COLLECTION_NAME, PRODUCT_IDS_COLLECTION_NAME, SIMILAR_PRODUCTS_TOP_K, DUPLICATE_NAME_THRESHOLD,
+    SCRIPT_DIR, CSV_FILE_PATH, UPLOAD_COLUMNS, EXIT_OK, EXIT_FAILED, EXIT_UNVERIFIED,
+    clean_columns, check_unknown_columns, transform_products, validate_records, check_duplicate_product_ids,
+    confirm_upload, connect_to_mongo,
+    report_product_id_issues, resolve_shopify_variants, check_column_drift, write_products,
+    verify_written_products, print_summary,
+)
+from csv_loader import load_catalog_csv, canonical_column, format_memory_report, format_encoding_report
+from product_identity import find_duplicate_clusters, format_cluster
+from product_ids import ProductIdRegistry
+from record_encoder import RecordEncoder
+from similar_products import add_similar_products
+from profiling import add_profile_argument, enable_profiling, profile_stage, report_profile
+
+CACHE_DIR = os.path.join(SCRIPT_DIR, '..', '.kbeauty_cache')
+REPORT_FILE = "kbeauty_data_report.json"
+DEFAULT_TARGETS = ['report']
+MAX_REPORTED_ITEMS = 100  # Per list in the JSON report
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint(directory=SCRIPT_DIR):
+    """SHA-256 over the source of every script, so code changes invalidate cached artifacts."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update(file_digest(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+class Stage:
+    """One node of the graph: a function of the outputs of the stages it depends on."""
+
+    def __init__(self, name, depends, run, cached=True, description=''):
+        self.name = name
+        self.depends = depends
+        self.run = run
+        self.cached = cached
+        self.description = description
+
+
+STAGES = {}
+
+
+def stage(name, depends=(), cached=True):
+    """Register a stage function: run(context, *outputs of `depends`)."""
+    def register(run):
+        STAGES[name] = Stage(name, tuple(depends), run, cached=cached,
+                             description=(run.__doc__ or '').strip().splitlines()[0])
+        return run
+    return register
+
+
+class ArtifactCache:
+    """Pickled stage outputs, one file per stage and key (older keys are removed)."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, stage_name, key):
+        return os.path.join(self.directory, f"{stage_name}-{key[:16]}.pkl")
+
+    def get(self, stage_name, key):
+        """Returns (True, output) on a hit, (False, None) otherwise."""
+        try:
+            with open(self._path(stage_name, key), 'rb') as f:
+                return True, pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+
+    def put(self, stage_name, key, output):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(stage_name, key)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)  # Never leave a truncated artifact behind
+        for stale in glob.glob(os.path.join(self.directory, f"{stage_name}-*.pkl")):
+            if stale != path:
+                os.remove(stale)
+
+    def clear(self):
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, '*.pkl')):
+            os.remove(path)
+            removed += 1
+        return removed
+
+
+class StageRunner:
+    """Resolves stages on demand, reusing outputs from this run and from the cache."""
+
+    def __init__(self, csv_path, cache=None, use_cache=True, allow_drift=False, allow_unknown_columns=False):
+        self.csv_path = csv_path
+        self.cache = cache or ArtifactCache()
+        self.use_cache = use_cache
+        self.allow_drift = allow_drift
+        self.allow_unknown_columns = allow_unknown_columns
+        self.outputs = {}
+        self.keys = {}
+        self._input_key = None
+
+    def input_key(self):
+        if self._input_key is None:
+            self._input_key = hashlib.sha256(
+                (file_digest(self.csv_path) + code_fingerprint()).encode('ascii')).hexdigest()
+        return self._input_key
+
+    def key(self, name):
+        """Cache key of a stage: its name plus the keys of its inputs."""
+        if name not in self.keys:
+            parents = [self.key(parent) for parent in STAGES[name].depends] or [self.input_key()]
+            self.keys[name] = hashlib.sha256('|'.join([name] + parents).encode('utf-8')).hexdigest()
+        return self.keys[name]
+
+    def result(self, name):
+        if name in self.outputs:
+            return self.outputs[name]
+        node = STAGES[name]
+        if node.cached and self.use_cache:
+            started = time.perf_counter()
+            hit, output = self.cache.get(name, self.key(name))
+            if hit:
+                print(f"♻️  {name}: cached ({self.key(name)[:12]}, {time.perf_counter() - started:.2f}s)")
+                self.outputs[name] = output
+                return output
+
+        inputs = [self.result(parent) for parent in node.depends]
+        print(f"▶️  {name}: {node.description}")
+        started = time.perf_counter()
+        with profile_stage(name):
+            output = node.run(self, *inputs)
+        print(f"   ⏱️  {name} took {time.perf_counter() - started:.2f}s")
+        if node.cached:
+            self.cache.put(name, self.key(name), output)
+        self.outputs[name] = output
+        return output
+
+
+# --- Stages ---
+
+@stage('load')
+def run_load(context):
+    """Read the CSV with schema dtypes."""
+    df = load_catalog_csv(context.csv_path)
+    print(f"   ✅ Loaded {len(df)} rows ({format_memory_report(df)}; {format_encoding_report(df)})")
+    return df
+
+
+@stage('clean', depends=['load'])
+def run_clean(context, raw):
+    """Keep the uploaded columns and clean exported column names."""
+    columns = [column for column in raw.columns if canonical_column(column) in UPLOAD_COLUMNS]
+    unknown = [column for column in raw.columns if column not in columns]
+    if unknown:
+        # upload refuses these unless --allow-unknown-columns is passed
+        print(f"   ⚠️  {len(unknown)} column(s) not in the product schema: {', '.join(unknown)}")
+    return clean_columns(raw[columns].copy())
+
+
+@stage('normalize', depends=['clean'])
+def run_normalize(context, df):
+    """Map categories and columns, normalize values, compute similar products."""
+    df = df.copy()
+    # Rows whose productId is generated here; upload re-resolves them against the registry
+    generated = df['PRODUCTID'].isna() if 'PRODUCTID' in df.columns else pd.Series(True, index=df.index)
+    df = transform_products(df, log=_quiet)
+    add_similar_products(df, top_k=SIMILAR_PRODUCTS_TOP_K)
+    print(f"   ✅ Normalized {len(df)} products ({int(generated.sum())} generated productIds)")
+    return df, generated.to_numpy()
+
+
+@stage('validate', depends=['normalize'])
+def run_validate(context, normalized):
+    """Encode product documents and validate them."""
+    df, _ = normalized
+    encoder = RecordEncoder()
+    records = encoder.encode_all(df.to_dict('records'))
+    errors = validate_records(records)
+    print(f"   {'❌' if errors else '✅'} {len(errors)} validation error(s) in {len(records)} products")
+    return records, errors
+
+
+@stage('dedup', depends=['normalize'])
+def run_dedup(context, normalized):
+    """Find near-duplicate products and repeated productIds."""
+    df, _ = normalized
+    clusters = find_duplicate_clusters(df, name_column='name', brand_column='brand',
+                                       threshold=DUPLICATE_NAME_THRESHOLD)
+    repeated = df['productId'][df['productId'].duplicated(keep=False)]
+    duplicate_ids = sorted(repeated.astype(str).unique())
+    print(f"   {'⚠️ ' if clusters or duplicate_ids else '✅'} {len(clusters)} possible duplicate cluster(s), "
+          f"{len(duplicate_ids)} repeated productId(s)")
+    return {'clusters': clusters, 'duplicateProductIds': duplicate_ids}
+
+
+@stage('report', depends=['load', 'validate', 'dedup'], cached=False)
+def run_report(context, raw, validated, duplicates):
+    """Write the row count, validation and duplicate report."""
+    _, errors = validated
+    names = raw['NAME'] if 'NAME' in raw.columns else None
+    empty_names = [] if names is None else [
+        int(position) + 2 for position in
+        (names.isna() | (names.astype(str).str.strip() == '')).to_numpy().nonzero()[0]
+    ]
+    report = {
+        'source': os.path.abspath(context.csv_path),
+        'inputKey': context.input_key(),
+        'rows': len(raw),
+        'encoding': raw.attrs.get('encoding'),
+        'undecodableLines': raw.attrs.get('undecodable_lines', [])[:MAX_REPORTED_ITEMS],
+        'emptyNameRows': empty_names[:MAX_REPORTED_ITEMS],
+        'emptyNameRowCount': len(empty_names),
+        'fullyDuplicateRows': int(raw.duplicated().sum()),
+        'validationErrorCount': len(errors),
+        'validationErrors': errors[:MAX_REPORTED_ITEMS],
+        'duplicateClusters': [format_cluster(cluster) for cluster in duplicates['clusters']][:MAX_REPORTED_ITEMS],
+        'duplicateProductIds': duplicates['duplicateProductIds'][:MAX_REPORTED_ITEMS],
+    }
+    with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"   📄 {report['rows']} rows, {report['emptyNameRowCount']} without NAME, "
+          f"{report['fullyDuplicateRows']} fully duplicate, {report['validationErrorCount']} validation error(s), "
+          f"{len(duplicates['clusters'])} duplicate cluster(s) → {REPORT_FILE}")
+    return REPORT_FILE
+
+
+@stage('upload', depends=['normalize', 'validate'], cached=False)
+def run_upload(context, normalized, validated):
+    """
+    Resolve productIds against the registry and replace the live catalog.
+    
+    Returns:
+        EXIT_OK, EXIT_FAILED (nothing written) or EXIT_UNVERIFIED
+    """
+    df, generated = normalized
+    records, errors = validated
+    try:
+        check_unknown_columns(context.csv_path, context.allow_unknown_columns)
+    except ValueError as e:
+        print(f"   ❌ Error: {e}")
+        return EXIT_FAILED
+    print("🔌 Connecting to MongoDB Atlas...")
+    client = connect_to_mongo()
+    try:
+        db = client[DATABASE_NAME]
+        product_ids = ProductIdRegistry.load(db[PRODUCT_IDS_COLLECTION_NAME])
+
+        df = df.copy()
+        offline_ids = df['productId'].copy()
+        df['productId'] = df['productId'].astype(object).where(~generated, None)
+        product_ids.assign(df)
+        report_product_id_issues(product_ids)
+        changed = int((df['productId'] != offline_ids).sum())
+        if changed:
+            print(f"   ℹ️  {changed} productId(s) differ from the registry; recomputing similar products")
+            add_similar_products(df, top_k=SIMILAR_PRODUCTS_TOP_K)
+            records = RecordEncoder(strict=not context.allow_unknown_columns).encode_all(df.to_dict('records'))
+            errors = validate_records(records)
+        else:
+            records = [dict(record) for record in records]  # Interning must not touch the cached artifact
+
+        if not check_duplicate_product_ids(records) or not confirm_upload(errors):
+            return EXIT_FAILED
+        resolve_shopify_variants(db, records)
+        sketch, ok = check_column_drift(db, records, allow_drift=context.allow_drift)
+        if not ok:
+            return EXIT_FAILED
+        write_products(db, records, product_ids, sketch=sketch)
+        if not verify_written_products(db[COLLECTION_NAME], records):
+            print(f"\n--- ❌ UPLOAD NOT VERIFIED ---")
+            print(f"The products collection does not match the {len(records)} uploaded products.")
+            return EXIT_UNVERIFIED
+        print(f"\n--- ✅ UPLOAD COMPLETE ---")
+        print(f"Successfully uploaded {len(records)} products with standardized data.")
+        print_summary(df)
+        return EXIT_OK
+    finally:
+        client.close()
+
+
+def print_graph():
+    for name, node in STAGES.items():
+        depends = ', '.join(node.depends) or 'CSV file'
+        cache = 'cached' if node.cached else 'always runs'
+        print(f"  {name:<10} ← {depends:<28} ({cache}) {node.description}")
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(prog='kbeauty-data',
+                                     description="Run K-Beauty product data stages with cached intermediate results.")
+    parser.add_argument('targets', nargs='*', metavar='stage',
+                        help=f"Stages to run, in order ({', '.join(STAGES)}; default: {' '.join(DEFAULT_TARGETS)})")
+    parser.add_argument('--csv', dest='csv_path', default=None,
+                        help="CSV file path, relative to the scripts directory (default: 4-12-25 DB.csv)")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every stage (still refreshes the cache)")
+    parser.add_argument('--clear-cache', action='store_true', help=f"Delete cached artifacts in {CACHE_DIR}")
+    parser.add_argument('--graph', action='store_true', help="Print the stage graph and exit")
+    parser.add_argument('--allow-drift', action='store_true',
+                        help="upload: proceed even if columns drift from the previous upload's sketches")
+    parser.add_argument('--allow-unknown-columns', action='store_true',
+                        help="upload: skip CSV columns that are not in the product schema instead of aborting")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    if args.graph:
+        print_graph()
+        return 0
+    cache = ArtifactCache()
+    if args.clear_cache:
+        print(f"🗑️  Removed {cache.clear()} cached artifact(s)")
+        if not args.targets:
+            return 0
+    targets = args.targets or DEFAULT_TARGETS
+    unknown = [target for target in targets if target not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    csv_path = os.path.join(SCRIPT_DIR, args.csv_path) if args.csv_path else CSV_FILE_PATH
+    if not os.path.exists(csv_path):
+        print(f"❌ Error: File '{csv_path}' not found.")
+        return EXIT_FAILED
+    if args.profile:
+        enable_profiling('kbeauty_data')
+    runner = StageRunner(csv_path, cache=cache, use_cache=not args.no_cache, allow_drift=args.allow_drift,
+                         allow_unknown_columns=args.allow_unknown_columns)
+    status = EXIT_OK
+    for target in targets:
+        output = runner.result(target)
+        if target == 'upload':
+            status = output
+    report_profile()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
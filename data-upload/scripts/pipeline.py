@@ -0,0 +1,129 @@
+"""
+Bounded-Queue Pipeline for K-Beauty Product Data Upload
+
+Runs producer/consumer stages in threads connected by bounded queues so that
+reading, normalizing, validating and writing overlap instead of running one
+after another. Bounded queues keep memory flat: a fast stage blocks once the
+next stage is `maxsize` items behind.
+
+pandas, hashlib, regex and pymongo network I/O all release the GIL for most of
+their work, so threads are enough to overlap the stages.
+
+Usage:
+    pipeline = Pipeline(maxsize=4)
+    chunks = pipeline.source('read', pd.read_csv(path, chunksize=500))
+    normalized = pipeline.stage('normalize', normalize_chunk, chunks)
+    pipeline.sink('write', write_batch, normalized)
+    pipeline.run()
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()  # End-of-stream marker passed down the queues
+_POLL_SECONDS = 0.1
+
+
+class PipelineError(Exception):
+    """Raised by Pipeline.run() when a stage failed."""
+
+
+class Pipeline:
+    """A linear chain of threaded stages connected by bounded queues."""
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._threads = []
+        self._stop = threading.Event()
+        self._errors = []
+        self.busy_seconds = {}  # Time each stage spent working (not waiting)
+
+    def _queue(self):
+        return queue.Queue(maxsize=self.maxsize)
+
+    def _put(self, outbox, item):
+        while not self._stop.is_set():
+            try:
+                outbox.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, inbox):
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _spawn(self, name, target):
+        def guarded():
+            try:
+                target()
+            except Exception as e:
+                self._errors.append((name, e))
+                self._stop.set()
+        self.busy_seconds[name] = 0.0
+        self._threads.append(threading.Thread(target=guarded, name=f"pipeline-{name}", daemon=True))
+
+    def source(self, name, iterable):
+        """Feed items from an iterable into a new queue."""
+        outbox = self._queue()
+
+        def run():
+            iterator = iter(iterable)
+            while True:
+                started = time.perf_counter()
+                item = next(iterator, _DONE)
+                self.busy_seconds[name] += time.perf_counter() - started
+                if item is _DONE or not self._put(outbox, item):
+                    break
+            self._put(outbox, _DONE)
+
+        self._spawn(name, run)
+        return outbox
+
+    def stage(self, name, func, inbox):
+        """Apply func to each item of inbox; None results are dropped."""
+        outbox = self._queue()
+
+        def run():
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                result = func(item)
+                self.busy_seconds[name] += time.perf_counter() - started
+                if result is not None and not self._put(outbox, result):
+                    break
+            self._put(outbox, _DONE)
+
+        self._spawn(name, run)
+        return outbox
+
+    def sink(self, name, func, inbox):
+        """Consume every item of inbox with func."""
+        def run():
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                func(item)
+                self.busy_seconds[name] += time.perf_counter() - started
+
+        self._spawn(name, run)
+
+    def run(self):
+        """Start all stages, wait for them and raise PipelineError if one failed."""
+        for thread in self._threads:
+            thread.start()
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            name, error = self._errors[0]
+            raise PipelineError(f"Stage '{name}' failed: {error}") from error
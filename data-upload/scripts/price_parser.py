@@ -0,0 +1,137 @@
+"""
+Price and Size Parsing for K-Beauty Product Data Upload
+
+Vectorized parsers for the MRP and WEIGHT columns:
+
+- MRP: any currency marker is ignored, including mojibake from re-encoded
+  exports ('? 2,499', 'â‚¹2,499', 'Rs. 2,499', 'INR 2499'). Thousands
+  separators (Western or Indian, '1,24,999') are removed. For ranges
+  ('1,299 - 1,599', '₹999 to ₹1,299') the lower bound is used, matching the
+  "from" price shown in the shop.
+- WEIGHT: '50 ml', '1.7 fl oz', '2 x 50ml', '1 L', '100 g', '10 Sheets' become
+  a size in ml, g, or pieces (sheets/pads/patches).
+
+From these the uploader stores `mrp`, `sizeValue`/`sizeUnit`, `pricePerUnit`
+(₹ per ml, g or piece) and `budgetTier`, which uses the same ₹1,000 and
+₹2,500 thresholds as the recommendation engine's budget scoring.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from validation_config import BUDGET_TIER_LOW_MAX, BUDGET_TIER_MEDIUM_MAX
+
+BUDGET_TIER_LOW = 1     # Under ₹1,000
+BUDGET_TIER_MEDIUM = 2  # ₹1,000 - ₹2,500
+BUDGET_TIER_HIGH = 3    # Over ₹2,500
+
+_NUMBER = r'(\d[\d,]*(?:\.\d+)?)'
+# Leading junk (currency markers of any encoding), a number, and an optional range end
+_PRICE_PATTERN = rf'^\D*?{_NUMBER}(?:\s*(?:-|–|—|to)\s*\D*?{_NUMBER})?\D*$'
+
+_SIZE_PATTERN = (
+    r'^\s*(?:(?P<count>\d+)\s*[x×]\s*)?'
+    r'(?P<amount>\d+(?:[.,]\d+)?)\s*'
+    r'(?P<unit>fl\.?\s*oz|ml|l|ltr|litre|liter|g|gm|gms|gr|grams?|kg|oz|'
+    r'sheets?|pads?|patch(?:es)?|pcs|pieces?|ea)\b'
+)
+
+# Unit -> (canonical unit, multiplier)
+SIZE_UNITS = {
+    'ml': ('ml', 1), 'l': ('ml', 1000), 'ltr': ('ml', 1000), 'litre': ('ml', 1000), 'liter': ('ml', 1000),
+    'floz': ('ml', 29.5735),
+    'g': ('g', 1), 'gm': ('g', 1), 'gms': ('g', 1), 'gr': ('g', 1), 'gram': ('g', 1), 'grams': ('g', 1),
+    'kg': ('g', 1000), 'oz': ('g', 28.3495),
+    'sheet': ('pcs', 1), 'sheets': ('pcs', 1), 'pad': ('pcs', 1), 'pads': ('pcs', 1),
+    'patch': ('pcs', 1), 'patches': ('pcs', 1), 'pcs': ('pcs', 1), 'piece': ('pcs', 1),
+    'pieces': ('pcs', 1), 'ea': ('pcs', 1),
+}
+
+
+def _to_number(text):
+    return pd.to_numeric(text.str.replace(',', '', regex=False), errors='coerce')
+
+
+def parse_prices(values):
+    """
+    Parse a column of raw MRP strings into floats (NaN where no price is found).
+
+    Returns:
+        (prices, ranges): Series of prices and a boolean Series marking range values
+    """
+    text = values.astype('string').str.strip()
+    parts = text.str.extract(_PRICE_PATTERN)
+    low, high = _to_number(parts[0]), _to_number(parts[1])
+    return low.astype('float64'), high.notna()
+
+
+def parse_price(text):
+    """parse_prices() for one raw MRP string (None if no price is found)."""
+    match = re.match(_PRICE_PATTERN, str(text).strip())
+    return float(match.group(1).replace(',', '')) if match else None
+
+
+def parse_sizes(values):
+    """
+    Parse a column of raw WEIGHT strings into a size and a canonical unit.
+
+    Returns:
+        DataFrame with 'sizeValue' (float, NaN if unparsed) and 'sizeUnit'
+        ('ml', 'g', 'pcs' or <NA>)
+    """
+    text = values.astype('string').str.strip().str.lower()
+    parts = text.str.extract(_SIZE_PATTERN)
+    unit_keys = parts['unit'].str.replace(r'[\s.]', '', regex=True)
+    units = unit_keys.map({key: unit for key, (unit, _) in SIZE_UNITS.items()})
+    multipliers = unit_keys.map({key: factor for key, (_, factor) in SIZE_UNITS.items()}).astype('float64')
+
+    amount = pd.to_numeric(parts['amount'].str.replace(',', '.', regex=False), errors='coerce')
+    count = pd.to_numeric(parts['count'], errors='coerce').fillna(1)
+    size = (amount.astype('float64') * count.astype('float64') * multipliers).round(2)
+    return pd.DataFrame({'sizeValue': size, 'sizeUnit': units.astype('string')}, index=values.index)
+
+
+def budget_tiers(prices):
+    """Budget tier per price: 1 under ₹1,000, 2 for ₹1,000-₹2,500, 3 over ₹2,500 (<NA> if unknown)."""
+    tiers = np.select(
+        [prices < BUDGET_TIER_LOW_MAX, prices <= BUDGET_TIER_MEDIUM_MAX, prices > BUDGET_TIER_MEDIUM_MAX],
+        [BUDGET_TIER_LOW, BUDGET_TIER_MEDIUM, BUDGET_TIER_HIGH],
+        default=0,
+    )
+    return pd.Series(tiers, index=prices.index).where(prices.notna()).astype('Int64')
+
+
+def budget_tier(price):
+    """budget_tiers() for one price."""
+    if price < BUDGET_TIER_LOW_MAX:
+        return BUDGET_TIER_LOW
+    if price <= BUDGET_TIER_MEDIUM_MAX:
+        return BUDGET_TIER_MEDIUM
+    return BUDGET_TIER_HIGH
+
+
+def add_price_fields(df, price_column='mrp', size_column='weight'):
+    """
+    Replace the raw MRP with a number and add size, price-per-unit and budget tier columns.
+
+    Returns:
+        Dict of counts: 'prices', 'ranges', 'sizes' parsed
+    """
+    counts = {'prices': 0, 'ranges': 0, 'sizes': 0}
+    if price_column in df.columns:
+        prices, ranges = parse_prices(df[price_column])
+        df[price_column] = prices
+        df['budgetTier'] = budget_tiers(prices)
+        counts['prices'] = int(prices.notna().sum())
+        counts['ranges'] = int(ranges.sum())
+    if size_column in df.columns:
+        sizes = parse_sizes(df[size_column])
+        df['sizeValue'] = sizes['sizeValue']
+        df['sizeUnit'] = sizes['sizeUnit']
+        counts['sizes'] = int(sizes['sizeValue'].notna().sum())
+        if price_column in df.columns:
+            per_unit = df[price_column] / df['sizeValue'].where(df['sizeValue'] > 0)
+            df['pricePerUnit'] = per_unit.round(2)
+    return counts
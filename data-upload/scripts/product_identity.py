@@ -0,0 +1,159 @@
+"""
+Product Identity Deduplication for K-Beauty Product Data Upload
+
+Finds rows that describe the same product under slightly different spellings
+or sizing ("Snail Mucin Essence 50 ml" vs "Snail Mucin Essence 50ml"), which
+would otherwise get two different generated productIds.
+
+Candidates are blocked by normalized brand, so names are only compared within
+one brand. Inside a block, names are compared by the Jaccard similarity of
+their token sets. Prefix filtering keeps this near-linear: tokens are ordered
+rarest first, and two sets can only reach the threshold if they share one of
+the first `len(tokens) - ceil(threshold * len(tokens)) + 1` tokens, so only
+pairs that share a rare prefix token are ever scored. Matches are merged into
+clusters with union-find.
+
+Usage:
+    clusters = find_duplicate_clusters(df, name_column='name', brand_column='brand')
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8  # Jaccard similarity of name token sets
+
+# "50 ml", "50-ml" and "50ML" all become the single token "50ml"
+_SIZE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)[\s-]*(ml|g|gm|gr|oz|l|kg|mg|ea|pcs|sheets?)\b')
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _fold(text):
+    """Lower-case and strip accents."""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def normalize_brand(brand):
+    """Blocking key: brand with case, accents, spacing and punctuation removed."""
+    if brand is None or (isinstance(brand, float) and math.isnan(brand)):
+        return ''
+    return _NON_ALNUM.sub('', _fold(brand))
+
+
+def name_tokens(name, brand_key=''):
+    """Token set of a product name, with sizes joined and the brand name dropped."""
+    text = _SIZE_PATTERN.sub(lambda m: m.group(1) + m.group(2), _fold(name))
+    tokens = set(_NON_ALNUM.split(text)) - {''}
+    if brand_key and len(tokens) > 1:
+        tokens.discard(brand_key)
+    return frozenset(tokens)
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def _block_matches(token_sets, threshold):
+    """Yield (i, j, similarity) for pairs within one brand block above threshold."""
+    frequency = Counter(token for tokens in token_sets for token in tokens)
+    ordered = [sorted(tokens, key=lambda token: (frequency[token], token)) for tokens in token_sets]
+
+    prefix_index = defaultdict(list)  # token -> earlier rows with it in their prefix
+    for i, tokens in enumerate(ordered):
+        prefix_length = len(tokens) - math.ceil(threshold * len(tokens)) + 1
+        candidates = set()
+        for token in tokens[:prefix_length]:
+            candidates.update(prefix_index[token])
+            prefix_index[token].append(i)
+        for j in sorted(candidates):
+            similarity = jaccard(token_sets[i], token_sets[j])
+            if similarity >= threshold:
+                yield j, i, similarity
+
+
+def find_duplicate_clusters(df, name_column='name', brand_column='brand',
+                            threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Find clusters of rows that are probably the same product.
+
+    Args:
+        df: Product DataFrame
+        name_column: Column with the product name
+        brand_column: Column with the brand (used as the blocking key)
+        threshold: Minimum Jaccard similarity of name token sets
+
+    Returns:
+        List of clusters, largest first. Each cluster is a dict with
+        'positions' (row positions in df), 'brand', 'names' and
+        'similarity' (lowest pairwise score that joined the cluster).
+    """
+    if name_column not in df.columns or brand_column not in df.columns:
+        return []
+
+    names = df[name_column].tolist()
+    brands = df[brand_column].tolist()
+    blocks = defaultdict(list)
+    for position, (name, brand) in enumerate(zip(names, brands)):
+        if isinstance(name, str) and name.strip():
+            blocks[normalize_brand(brand)].append(position)
+
+    union_find = _UnionFind(len(df))
+    matches = []
+    for brand_key, positions in blocks.items():
+        if len(positions) < 2:
+            continue
+        token_sets = [name_tokens(names[position], brand_key) for position in positions]
+        for i, j, similarity in _block_matches(token_sets, threshold):
+            union_find.union(positions[i], positions[j])
+            matches.append((positions[i], similarity))
+
+    lowest = {}
+    for position, similarity in matches:
+        root = union_find.find(position)
+        lowest[root] = min(similarity, lowest.get(root, similarity))
+
+    members = {root: [] for root in lowest}
+    for position in range(len(df)):
+        root = union_find.find(position)
+        if root in members:
+            members[root].append(position)
+
+    clusters = []
+    for root, positions in members.items():
+        clusters.append({
+            'positions': positions,
+            'brand': brands[positions[0]],
+            'names': [names[position] for position in positions],
+            'similarity': lowest[root],
+        })
+    clusters.sort(key=lambda cluster: (-len(cluster['positions']), cluster['positions'][0]))
+    return clusters
+
+
+def format_cluster(cluster, first_row=2):
+    """One-line description of a cluster with CSV row numbers."""
+    rows = ', '.join(str(position + first_row) for position in cluster['positions'])
+    names = ' | '.join(dict.fromkeys(str(name) for name in cluster['names']))
+    return (f"Rows {rows}: possible duplicate product ({cluster['brand']}: {names}, "
+            f"similarity {cluster['similarity']:.2f})")
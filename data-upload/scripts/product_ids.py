@@ -0,0 +1,165 @@
+"""
+Product ID Registry for K-Beauty Product Data Upload
+
+Generates productIds for rows without a PRODUCTID and keeps them stable across
+uploads, so caches, wishlists and saved reports that reference a productId stay
+valid when the sheet is reordered or re-exported.
+
+A product's identity key is its slugified brand and name
+("cosrx-advanced-snail-96-mucin-power-essence"); its generated ID is the first
+50 characters of the key plus 8 hex digits of the key's MD5. The registry
+lives in its own MongoDB collection:
+
+    { _id: "<identity key>", productId: "<productId>" }
+
+Once a key has an ID it is reused on every later upload. If a new key would
+produce an ID that another key already owns (a truncation or hash collision),
+it gets a numeric suffix instead and the collision is reported.
+"""
+
+import hashlib
+import re
+
+import pandas as pd
+from pymongo import ReplaceOne
+
+ID_SLUG_LENGTH = 50  # Characters of the identity key kept in the productId
+ID_HASH_LENGTH = 8   # Hex digits of the MD5 appended for uniqueness
+
+
+def identity_keys(names, brands):
+    """Slugify brand + name for whole columns at once (missing values become 'unknown')."""
+    names = names.astype(object).where(names.notna(), 'unknown').astype(str).str.strip()
+    brands = brands.astype(object).where(brands.notna(), 'unknown').astype(str).str.strip()
+    return (
+        (brands + '_' + names).str.lower()
+        .str.replace(r'[^a-z0-9-]', '-', regex=True)
+        .str.replace(r'-+', '-', regex=True)
+        .str.strip('-')
+    )
+
+
+def identity_key(name, brand):
+    """identity_keys() for one product (None counts as missing)."""
+    name = 'unknown' if name is None else str(name).strip()
+    brand = 'unknown' if brand is None else str(brand).strip()
+    key = re.sub(r'[^a-z0-9-]', '-', f"{brand}_{name}".lower())
+    return re.sub(r'-+', '-', key).strip('-')
+
+
+def product_id_for_key(key):
+    """Generated productId for one identity key."""
+    hash_id = hashlib.md5(key.encode()).hexdigest()[:ID_HASH_LENGTH]
+    return f"{key[:ID_SLUG_LENGTH]}-{hash_id}" if key else f"product-{hash_id}"
+
+
+class ProductIdRegistry:
+    """Persistent identity key <-> productId mapping with collision detection."""
+
+    def __init__(self, entries=None):
+        self.key_to_id = {}
+        self.id_to_key = {}
+        self.new_keys = set()    # Keys registered since load (saved by save())
+        self.collisions = []     # (key, generated ID, ID actually assigned)
+        self.conflicts = []      # (productId, registered key, key in this upload)
+        for entry in entries or []:
+            self.key_to_id[entry['_id']] = entry['productId']
+            self.id_to_key[entry['productId']] = entry['_id']
+
+    @classmethod
+    def load(cls, collection):
+        """Load the existing registry from MongoDB."""
+        return cls(collection.find({}, {'_id': 1, 'productId': 1}))
+
+    def _register(self, key, product_id):
+        previous = self.key_to_id.get(key)
+        if previous is not None and self.id_to_key.get(previous) == key:
+            del self.id_to_key[previous]  # A claimed ID replaces the key's generated one
+        self.key_to_id[key] = product_id
+        self.id_to_key[product_id] = key
+        self.new_keys.add(key)
+
+    def resolve(self, key):
+        """Return the productId for an identity key, assigning a collision-free one if new."""
+        product_id = self.key_to_id.get(key)
+        if product_id is not None:
+            return product_id
+        generated = product_id = product_id_for_key(key)
+        suffix = 2
+        while product_id in self.id_to_key:
+            product_id = f"{generated}-{suffix}"
+            suffix += 1
+        if product_id != generated:
+            self.collisions.append((key, generated, product_id))
+        self._register(key, product_id)
+        return product_id
+
+    def claim(self, key, product_id):
+        """Record an explicit productId from the CSV; conflicting owners are reported."""
+        owner = self.id_to_key.get(product_id)
+        if owner is not None and owner != key:
+            self.conflicts.append((product_id, owner, key))
+            return
+        if self.key_to_id.get(key) != product_id:
+            self._register(key, product_id)
+
+    def assign(self, df, id_column='productId', name_column='name', brand_column='brand'):
+        """
+        Fill missing productIds in df from the registry (modified in place).
+
+        Returns:
+            Number of productIds that were filled in
+        """
+        names = df[name_column] if name_column in df.columns else pd.Series(pd.NA, index=df.index)
+        brands = df[brand_column] if brand_column in df.columns else pd.Series(pd.NA, index=df.index)
+        keys = identity_keys(names, brands)
+        if id_column not in df.columns:
+            df[id_column] = pd.Series(pd.NA, index=df.index, dtype=object)
+
+        present = df[id_column].notna()
+        for key, product_id in zip(keys[present], df.loc[present, id_column]):
+            self.claim(key, str(product_id))
+
+        missing = ~present
+        if missing.any():
+            resolved = {key: self.resolve(key) for key in keys[missing].unique()}
+            df[id_column] = df[id_column].astype(object)
+            df.loc[missing, id_column] = keys[missing].map(resolved)
+        return int(missing.sum())
+
+    def forget(self, product_ids):
+        """
+        Drop entries registered since load for these productIds (e.g. rows that
+        were quarantined instead of uploaded), so save() does not persist them.
+
+        Returns:
+            Number of entries dropped
+        """
+        forgotten = 0
+        for product_id in product_ids:
+            key = self.id_to_key.get(product_id)
+            if key in self.new_keys:
+                self.new_keys.discard(key)
+                del self.key_to_id[key]
+                del self.id_to_key[product_id]
+                forgotten += 1
+        return forgotten
+
+    def to_operations(self):
+        """Build upsert operations for entries registered since load."""
+        return [
+            ReplaceOne({'_id': key}, {'_id': key, 'productId': self.key_to_id[key]}, upsert=True)
+            for key in sorted(self.new_keys)
+        ]
+
+    def save(self, collection):
+        """Upsert new entries into MongoDB. Returns the number of entries written."""
+        operations = self.to_operations()
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        collection.create_index('productId', unique=True)
+        self.new_keys.clear()
+        return len(operations)
+
+    def __len__(self):
+        return len(self.key_to_id)
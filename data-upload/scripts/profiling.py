@@ -0,0 +1,262 @@
+"""
+Stage Profiling for K-Beauty Product Data Upload
+
+`--profile` support shared by the data scripts. Each named stage (load,
+transform, validate, ...) gets its own cProfile profiler and tracemalloc
+measurements. Re-entering a stage (e.g. once per pipeline chunk) accumulates
+into the same profile.
+
+At the end, report() prints wall time, profiled time and peak traced
+memory per stage, plus the top-N functions by cumulative time and the top
+allocation sites. It also writes, per stage:
+
+    profiles/<script>.<stage>.prof     pstats file (snakeviz, pstats, gprof2dot)
+    profiles/<script>.<stage>.folded   folded stacks ("a;b;c <microseconds>")
+
+and profiles/<script>.folded with every stage under its own root frame,
+ready for flamegraph.pl or speedscope.
+
+cProfile records caller/callee pairs, not whole stacks, so folded stacks are
+reconstructed by splitting each function's time across its callers in
+proportion to the time spent under each call edge. Paths below
+MIN_FRAME_FRACTION of the stage's time are folded into their caller, which
+keeps the number of reconstructed stacks bounded on large call graphs.
+
+Stages must not nest within one thread (only one profiler can be active per
+thread). tracemalloc counts allocations from all threads, so in --pipeline
+mode the memory figures of overlapping stages include each other.
+
+Usage:
+    add_profile_argument(parser)
+    if args.profile:
+        enable_profiling('upload_kbeauty_data')
+    with profile_stage('load'):
+        df = load_csv(path)
+    report_profile()
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+DEFAULT_TOP_N = 15
+PROFILE_DIR = 'profiles'
+MAX_STACK_DEPTH = 64  # Folded stacks deeper than this are cut off
+MIN_FRAME_FRACTION = 0.001  # Call paths under this share of the stage's time are folded into their caller
+_TRACEMALLOC_FRAMES = 1
+
+_active = None  # The StageProfiler of this process, if profiling is enabled
+
+
+def _format_bytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def _function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in, e.g. "<method 'append' of 'list' objects>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def folded_stacks(stats, root=None):
+    """
+    Build folded stack lines from a pstats.Stats object.
+
+    Returns:
+        List of "frame;frame;frame <microseconds>" strings
+    """
+    entries = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))  # edge cumulative time
+
+    totals = {}
+    min_seconds = stats.total_tt * MIN_FRAME_FRACTION
+    # Roots: time not covered by any recorded caller (calls made from frames that
+    # were already running when profiling started have no caller entry)
+    roots = []
+    for func, (_, _, _, ct, callers) in entries.items():
+        attributed = sum(edge[3] for caller, edge in callers.items() if caller != func)
+        if ct > 0 and ct - attributed > min_seconds:
+            roots.append((func, (ct - attributed) / ct))
+
+    def walk(func, labels, on_stack, weight):
+        _, _, tt, ct, _ = entries[func]
+        labels = labels + [_function_label(func)]
+        self_time = tt * weight
+        if len(labels) < MAX_STACK_DEPTH and ct > 0:
+            on_stack = on_stack | {func}
+            for callee, edge_time in callees.get(func, []):
+                if callee in on_stack:
+                    continue  # Recursion: time is already counted at the outer frame
+                callee_ct = entries[callee][3]
+                if callee_ct <= 0 or edge_time <= 0:
+                    continue
+                if edge_time * weight < min_seconds:
+                    self_time += edge_time * weight  # Too small to draw: charge it to this frame
+                else:
+                    walk(callee, labels, on_stack, weight * edge_time / callee_ct)
+        if self_time > 0:
+            key = ';'.join(labels)
+            totals[key] = totals.get(key, 0) + self_time
+
+    prefix = [root] if root else []
+    for func, weight in roots:
+        walk(func, prefix, frozenset(), weight)
+    return [f"{stack} {int(seconds * 1_000_000)}" for stack, seconds in sorted(totals.items())
+            if int(seconds * 1_000_000) > 0]
+
+
+class _Stage:
+    def __init__(self):
+        self.profiles = {}  # thread id -> cProfile.Profile
+        self.wall_seconds = 0.0
+        self.calls = 0
+        self.peak_bytes = 0
+        self.net_bytes = 0
+        self.snapshot = None
+
+    def stats(self):
+        profiles = list(self.profiles.values())
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+class StageProfiler:
+    """Per-stage cProfile + tracemalloc measurements for one script run."""
+
+    def __init__(self, script_name, output_dir=PROFILE_DIR, top_n=DEFAULT_TOP_N):
+        self.script_name = script_name
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.stages = {}
+        self._lock = threading.Lock()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def stage(self, name):
+        with self._lock:
+            stage = self.stages.setdefault(name, _Stage())
+            profile = stage.profiles.setdefault(threading.get_ident(), cProfile.Profile())
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                stage.wall_seconds += elapsed
+                stage.calls += 1
+                stage.peak_bytes = max(stage.peak_bytes, peak - before)
+                stage.net_bytes += current - before
+                stage.snapshot = tracemalloc.take_snapshot()
+
+    def write_files(self):
+        """Write .prof and .folded files; returns the combined folded file path."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        combined = []
+        for name, stage in self.stages.items():
+            stats = stage.stats()
+            if stats is None:
+                continue
+            base = os.path.join(self.output_dir, f"{self.script_name}.{name.replace(' ', '_')}")
+            stats.dump_stats(base + '.prof')
+            lines = folded_stacks(stats)
+            with open(base + '.folded', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            combined.extend(folded_stacks(stats, root=name))
+        combined_path = os.path.join(self.output_dir, f"{self.script_name}.folded")
+        with open(combined_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(combined) + '\n')
+        return combined_path
+
+    def report(self):
+        """Print the per-stage summary and write the profile files."""
+        print("\n" + "=" * 80)
+        print(f"PROFILE: {self.script_name}")
+        print("=" * 80)
+        print(f"{'Stage':<24}{'Calls':>7}{'Wall s':>10}{'Profiled s':>12}{'Peak mem':>12}{'Net mem':>12}")
+        for name, stage in self.stages.items():
+            stats = stage.stats()
+            profiled = stats.total_tt if stats else 0.0
+            print(f"{name:<24}{stage.calls:>7}{stage.wall_seconds:>10.3f}{profiled:>12.3f}"
+                  f"{_format_bytes(stage.peak_bytes):>12}{_format_bytes(stage.net_bytes):>12}")
+
+        for name, stage in self.stages.items():
+            stats = stage.stats()
+            if stats is None:
+                continue
+            print(f"\n--- {name}: top {self.top_n} functions by cumulative time ---")
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            body = buffer.getvalue()
+            # Skip pstats' preamble (totals line and blank lines) and keep the table
+            table_start = body.find('   ncalls')
+            print(body[table_start:].rstrip() if table_start >= 0 else body.rstrip())
+            if stage.snapshot is not None:
+                print(f"\n--- {name}: top {self.top_n} allocation sites (live at stage end) ---")
+                for stat in stage.snapshot.statistics('lineno')[:self.top_n]:
+                    print(f"   {stat}")
+
+        combined_path = self.write_files()
+        print(f"\n📁 Profiles written to '{self.output_dir}/' "
+              f"(*.prof for pstats/snakeviz, {os.path.basename(combined_path)} for flamegraph.pl)")
+
+
+def add_profile_argument(parser):
+    """Add the shared --profile option to an argparse parser."""
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Profile each stage (cProfile + tracemalloc) and write "
+                             f"flamegraph-ready output to '{PROFILE_DIR}/'")
+
+
+def enable_profiling(script_name, output_dir=PROFILE_DIR, top_n=DEFAULT_TOP_N):
+    """Turn on profiling for this process; profile_stage() blocks record from now on."""
+    global _active
+    _active = StageProfiler(script_name, output_dir=output_dir, top_n=top_n)
+    return _active
+
+
+@contextmanager
+def profile_stage(name):
+    """Profile the enclosed block as stage `name` (no-op unless profiling is enabled)."""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+def profiled_iter(name, iterable):
+    """Yield from iterable, profiling each next() call as stage `name` (e.g. chunked reads)."""
+    iterator = iter(iterable)
+    while True:
+        with profile_stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def report_profile():
+    """Print the profile summary and write files (no-op unless profiling is enabled)."""
+    if _active is not None:
+        _active.report()
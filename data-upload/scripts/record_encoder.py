@@ -0,0 +1,143 @@
+"""
+Record Encoder for K-Beauty Product Data Upload
+
+Turns normalized DataFrame rows into minimal, typed BSON documents before they
+are written to MongoDB:
+
+- absent values (None, NaN, <NA>, empty strings) are omitted instead of stored
+- Shopify IDs are stored as int64 (or as strings when they are not numeric)
+- columns that are not part of PRODUCT_FIELD_TYPES are rejected: the upload
+  aborts on them unless the encoder is lenient (--allow-unknown-columns),
+  in which case they are dropped and reported
+
+The encoder also measures the BSON size of each record before and after
+encoding so the upload can report how much storage and wire traffic it saved.
+"""
+
+import math
+from collections import Counter
+
+import bson
+import pandas as pd
+from bson.codec_options import CodecOptions, TypeRegistry
+from bson.int64 import Int64
+
+from validation_config import PRODUCT_FIELD_TYPES
+
+# Raw records can hold pandas <NA>, which BSON cannot encode; measure it as null
+_RAW_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry(fallback_encoder=lambda value: None))
+
+
+def _is_absent(value):
+    """True for None, NaN, <NA> and blank strings (pandas artifacts for missing cells)."""
+    if value is None or value is pd.NA:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    if isinstance(value, str) and not value.strip():
+        return True
+    return False
+
+
+def _encode_shopify_id(value):
+    """Cast a Shopify ID to int64 when numeric (CSV floats like 7176831991843.0), else a string."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return Int64(value)
+    if isinstance(value, float):
+        return Int64(int(value)) if value.is_integer() else None
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    return Int64(int(text)) if text.isdigit() else text
+
+
+def encode_value(value, field_type):
+    """Encode a single value; returns None if the value should be omitted."""
+    if isinstance(value, (list, tuple)):
+        if field_type != 'string_array':
+            return None
+        return [str(item) for item in value if not _is_absent(item)]
+    if _is_absent(value):
+        return None
+    if field_type == 'string':
+        return str(value).strip()
+    if field_type == 'float':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(number) else number
+    if field_type == 'int':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(number) if number.is_integer() else None
+    if field_type == 'bool':
+        return bool(value)
+    if field_type == 'shopify_id':
+        return _encode_shopify_id(value)
+    # Scalar in an array field (e.g. a column that was never normalized)
+    return None
+
+
+class RecordEncoder:
+    """Encodes product records and keeps size/stray-column statistics."""
+
+    def __init__(self, field_types=None, strict=True):
+        """
+        Args:
+            field_types: Field -> type mapping (default: PRODUCT_FIELD_TYPES)
+            strict: Raise ValueError on stray columns (False drops and reports them)
+        """
+        self.field_types = field_types or PRODUCT_FIELD_TYPES
+        self.strict = strict
+        self.stray_fields = Counter()
+        self.documents = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.max_saving = 0
+
+    def encode(self, record):
+        """Build a minimal typed document from a record dict."""
+        document = {}
+        for field, value in record.items():
+            field_type = self.field_types.get(field)
+            if field_type is None:
+                self.stray_fields[field] += 1
+                continue
+            encoded = encode_value(value, field_type)
+            if encoded is not None:
+                document[field] = encoded
+
+        if self.strict and self.stray_fields:
+            raise ValueError(f"Stray columns not in product schema: {sorted(self.stray_fields)}")
+
+        before = len(bson.encode(record, codec_options=_RAW_CODEC_OPTIONS))
+        after = len(bson.encode(document))
+        self.documents += 1
+        self.bytes_before += before
+        self.bytes_after += after
+        self.max_saving = max(self.max_saving, before - after)
+        return document
+
+    def encode_all(self, records):
+        """Encode a list of records."""
+        return [self.encode(record) for record in records]
+
+    def report(self):
+        """Print stray columns and the size reduction achieved."""
+        if self.stray_fields:
+            print(f"   ⚠️  Rejected {len(self.stray_fields)} column(s) not in the product schema: "
+                  f"{', '.join(sorted(self.stray_fields))}")
+        if not self.documents:
+            return
+        saved = self.bytes_before - self.bytes_after
+        percent = (saved / self.bytes_before * 100) if self.bytes_before else 0
+        print(f"   ✅ Encoded {self.documents} documents: "
+              f"{self.bytes_before:,} → {self.bytes_after:,} bytes ({percent:.1f}% smaller)")
+        print(f"      ℹ️  Per document: {self.bytes_before / self.documents:,.0f} → "
+              f"{self.bytes_after / self.documents:,.0f} bytes on average, "
+              f"up to {self.max_saving:,} bytes saved")
@@ -1,69 +1,84 @@
-import pandas as pd
+import argparse
+
+# Only the stdlib csv scanner is imported up front; pandas is loaded for --memory alone
+from csv_scan import CatalogScan, format_decoding
 
 csv_file = "4-12-25 DB.csv"
 output_file = "row_count_analysis.txt"
 
+parser = argparse.ArgumentParser(description="Count rows, empty names and duplicate rows in the product CSV.")
+parser.add_argument('--memory', action='store_true',
+                    help="Also load the file with pandas and report typed memory usage (slower)")
+args = parser.parse_args()
+
 with open(output_file, 'w', encoding='utf-8') as f:
     f.write("=" * 80 + "\n")
     f.write("ROW COUNT ANALYSIS\n")
     f.write("=" * 80 + "\n\n")
     
     try:
-        # Try different encodings
-        try:
-            df = pd.read_csv(csv_file, encoding='utf-8')
-        except UnicodeDecodeError:
-            try:
-                df = pd.read_csv(csv_file, encoding='latin-1')
-            except:
-                df = pd.read_csv(csv_file, encoding='cp1252')
+        scan = CatalogScan(csv_file)
+        rows = []
+        empty_rows = 0
+        seen_rows = set()
+        duplicate_rows = 0
+        for row_number, row in scan:
+            rows.append((row_number, row))
+            values = tuple(row.values())
+            if all(value is None for value in values):
+                empty_rows += 1
+            # Same definition as DataFrame.duplicated(): every column equal to an earlier row
+            if values in seen_rows:
+                duplicate_rows += 1
+            else:
+                seen_rows.add(values)
         
-        total_rows = len(df)
+        total_rows = len(rows)
+        if args.memory:
+            from csv_loader import load_catalog_csv, format_memory_report
+            f.write(f"Loaded with schema dtypes: {format_memory_report(load_catalog_csv(csv_file))}\n")
+        f.write(f"Decoded with {format_decoding(scan.encoding, scan.undecodable_lines)}\n")
         f.write(f"Total rows in CSV (including header): {total_rows + 1}\n")
         f.write(f"Total data rows (excluding header): {total_rows}\n\n")
         
         # Check for empty rows
-        empty_rows = df.isna().all(axis=1).sum()
         f.write(f"Completely empty rows: {empty_rows}\n\n")
         
         # Check rows with at least some data
-        rows_with_data = df.dropna(how='all')
-        f.write(f"Rows with at least some data: {len(rows_with_data)}\n\n")
+        f.write(f"Rows with at least some data: {total_rows - empty_rows}\n\n")
         
         # Check if NAME column has values
-        if 'NAME' in df.columns:
-            name_count = df['NAME'].notna().sum()
-            name_filled = df[df['NAME'].notna() & (df['NAME'].astype(str).str.strip() != '')]
+        name_column = 'NAME' if 'NAME' in scan.columns else None
+        if name_column:
+            name_count = sum(1 for _, row in rows if row[name_column] is not None)
+            empty_names = [(row_number, row) for row_number, row in rows
+                           if row[name_column] is None or row[name_column].strip() == '']
             f.write(f"Rows with NAME filled: {name_count}\n")
-            f.write(f"Rows with non-empty NAME: {len(name_filled)}\n\n")
+            f.write(f"Rows with non-empty NAME: {total_rows - len(empty_names)}\n\n")
             
             # Show rows without names
-            empty_names = df[df['NAME'].isna() | (df['NAME'].astype(str).str.strip() == '')]
             if len(empty_names) > 0:
                 f.write(f"Rows with empty NAME ({len(empty_names)} rows):\n")
-                for idx in empty_names.index:
-                    f.write(f"  Row {idx + 2} (CSV row {idx + 2})\n")
+                for row_number, _ in empty_names:
+                    f.write(f"  Row {row_number} (CSV row {row_number})\n")
                 f.write("\n")
         
         # Check for duplicate rows (all columns same)
-        duplicate_rows = df.duplicated().sum()
         f.write(f"Completely duplicate rows: {duplicate_rows}\n\n")
         
         # Count actual products (rows with NAME)
-        if 'NAME' in df.columns:
-            actual_products = df[df['NAME'].notna() & (df['NAME'].astype(str).str.strip() != '')]
-            f.write(f"Actual products (with NAME): {len(actual_products)}\n\n")
+        if name_column:
+            f.write(f"Actual products (with NAME): {total_rows - len(empty_names)}\n\n")
         
         # Show first few empty rows if any
-        if 'NAME' in df.columns:
-            empty_rows_list = df[df['NAME'].isna() | (df['NAME'].astype(str).str.strip() == '')]
-            if len(empty_rows_list) > 0:
+        if name_column:
+            if len(empty_names) > 0:
                 f.write("Sample of empty rows (showing first 5 columns):\n")
-                for idx in empty_rows_list.index[:10]:
-                    f.write(f"\nRow {idx + 2}:")
-                    for col in df.columns[:5]:
-                        val = df.at[idx, col]
-                        f.write(f"\n  {col}: {str(val)[:50] if pd.notna(val) else 'EMPTY'}")
+                for row_number, row in empty_names[:10]:
+                    f.write(f"\nRow {row_number}:")
+                    for col in scan.columns[:5]:
+                        val = row[col]
+                        f.write(f"\n  {col}: {str(val)[:50] if val is not None else 'EMPTY'}")
                 f.write("\n\n")
         
         f.write("=" * 80 + "\n")
@@ -0,0 +1,253 @@
+"""
+Shopify Variant Resolution for K-Beauty Product Data Upload
+
+Resolves every product's Shopify variant while the catalog is uploaded, so
+the checkout path (/api/shopify/sync-cart) finds `shopifyVariantId` on the
+product document and never waits on a live /api/shopify/get-variants lookup.
+
+Products are requested from the Admin REST API in batches of up to 250 IDs
+(`products.json?ids=...&fields=id,variants`), following `Link: rel="next"`
+pagination. Requests stay below Shopify's leaky-bucket limit: the
+X-Shopify-Shop-Api-Call-Limit header ("32/40") is read after every call and
+the resolver pauses before the bucket fills; 429 and 5xx responses are
+retried after Retry-After (or an exponential backoff).
+
+Results are cached in MongoDB, one document per Shopify product, and only
+products missing from the cache or older than CACHE_MAX_AGE are requested:
+
+    { _id: <shopifyProductId>, found: true, variantIds: [<id>, ...], resolvedAt: <datetime> }
+
+Each product document then gets a validated `shopifyVariantId`: a CSV value
+that belongs to the product is kept, a missing or foreign one is replaced
+with the product's first (default) variant.
+
+The API base URL is https://<NEXT_PUBLIC_SHOPIFY_STORE_URL>/admin/api/<version>
+unless SHOPIFY_ADMIN_BASE_URL is set, e.g. to a local stand-in for testing:
+
+    SHOPIFY_ADMIN_BASE_URL=http://127.0.0.1:8099/admin/api/2024-01
+"""
+
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+from bson.int64 import Int64
+from pymongo import ReplaceOne
+
+SHOPIFY_API_VERSION = "2024-01"  # Same version as src/app/api/shopify/get-variants
+BATCH_SIZE = 250                 # Maximum ids (and page size) accepted by products.json
+REQUEST_TIMEOUT = 30             # Seconds per HTTP request
+MAX_RETRIES = 5                  # Per request, for 429 and 5xx responses
+# Shopify's REST bucket leaks 2 calls per second; keep this many calls in reserve
+LEAK_RATE = 2.0
+RATE_LIMIT_HEADROOM = 4
+CACHE_MAX_AGE = timedelta(days=7)  # Cached lookups older than this are requested again
+
+_NEXT_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+class ShopifyError(Exception):
+    """A Shopify request failed after all retries."""
+
+
+def admin_base_url(store_url=None, api_version=SHOPIFY_API_VERSION):
+    """
+    Admin REST base URL from SHOPIFY_ADMIN_BASE_URL or the store URL.
+
+    Returns None when neither is configured.
+    """
+    override = os.environ.get('SHOPIFY_ADMIN_BASE_URL')
+    if override:
+        return override.rstrip('/')
+    store_url = store_url or os.environ.get('NEXT_PUBLIC_SHOPIFY_STORE_URL')
+    if not store_url:
+        return None
+    host = re.sub(r'^https?://', '', store_url).rstrip('/')
+    return f"https://{host}/admin/api/{api_version}"
+
+
+def shopify_product_id(value):
+    """Numeric Shopify product ID of an encoded record value (None if absent or not numeric)."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return int(value)
+    text = str(value).strip()
+    return int(text) if text.isdigit() else None
+
+
+class ShopifyVariantResolver:
+    """Batched, paginated and rate-limit-aware products.json client."""
+
+    def __init__(self, base_url, access_token, batch_size=BATCH_SIZE, timeout=REQUEST_TIMEOUT,
+                 sleep=time.sleep):
+        self.base_url = base_url.rstrip('/')
+        self.access_token = access_token
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.sleep = sleep
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    def _wait(self, seconds):
+        self.throttled_seconds += seconds
+        self.sleep(seconds)
+
+    def _throttle(self, headers):
+        """Pause until the call bucket has RATE_LIMIT_HEADROOM calls left."""
+        limit = headers.get('X-Shopify-Shop-Api-Call-Limit')
+        if not limit or '/' not in limit:
+            return
+        used, capacity = (int(part) for part in limit.split('/', 1))
+        excess = used - (capacity - RATE_LIMIT_HEADROOM)
+        if excess > 0:
+            self._wait(excess / LEAK_RATE)
+
+    def request(self, url):
+        """GET one page. Returns (parsed JSON, URL of the next page or None)."""
+        request = urllib.request.Request(url, headers={
+            'Accept': 'application/json',
+            'X-Shopify-Access-Token': self.access_token,
+        })
+        for attempt in range(MAX_RETRIES + 1):
+            self.requests += 1
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    data = json.loads(response.read().decode('utf-8'))
+                    headers = response.headers
+            except urllib.error.HTTPError as e:
+                if (e.code != 429 and e.code < 500) or attempt == MAX_RETRIES:
+                    raise ShopifyError(f"GET {url} returned {e.code}: {e.read()[:200]!r}") from e
+                self.retries += 1
+                retry_after = e.headers.get('Retry-After')
+                self._wait(float(retry_after) if retry_after else 2.0 ** attempt)
+                continue
+            self._throttle(headers)
+            match = _NEXT_LINK.search(headers.get('Link') or '')
+            return data, (match.group(1) if match else None)
+        raise ShopifyError(f"GET {url} failed after {MAX_RETRIES} retries")
+
+    def fetch_variants(self, product_ids):
+        """
+        Look up products by ID.
+
+        Returns:
+            {product ID: [variant IDs in Shopify's order]} for the products that exist
+        """
+        product_ids = sorted(set(product_ids))
+        variants = {}
+        for start in range(0, len(product_ids), self.batch_size):
+            batch = product_ids[start:start + self.batch_size]
+            query = urllib.parse.urlencode({
+                'ids': ','.join(str(product_id) for product_id in batch),
+                'fields': 'id,variants',
+                'limit': self.batch_size,
+            })
+            url = f"{self.base_url}/products.json?{query}"
+            while url:
+                data, url = self.request(url)
+                for product in data.get('products', []):
+                    variants[int(product['id'])] = [
+                        int(variant['id']) for variant in product.get('variants') or []
+                    ]
+        return variants
+
+
+class ShopifyVariantCache:
+    """Persistent Shopify product -> variant IDs lookups (including products that were not found)."""
+
+    def __init__(self, entries=None):
+        self.entries = {}
+        self.changed = set()  # Product IDs looked up since load (saved by save())
+        for entry in entries or []:
+            self.entries[int(entry['_id'])] = entry
+
+    @classmethod
+    def load(cls, collection):
+        """Load the existing cache from MongoDB."""
+        return cls(collection.find({}))
+
+    def stale(self, product_ids, max_age=CACHE_MAX_AGE, now=None):
+        """Product IDs that are not cached or were looked up more than `max_age` ago."""
+        now = now or datetime.now(timezone.utc)
+        stale = []
+        for product_id in sorted(set(product_ids)):
+            entry = self.entries.get(product_id)
+            resolved_at = entry and entry['resolvedAt']
+            if resolved_at is not None and resolved_at.tzinfo is None:
+                resolved_at = resolved_at.replace(tzinfo=timezone.utc)  # BSON dates come back naive
+            if resolved_at is None or now - resolved_at > max_age:
+                stale.append(product_id)
+        return stale
+
+    def update(self, requested, variants, now=None):
+        """Store the result of looking up `requested` (IDs missing from `variants` were not found)."""
+        now = now or datetime.now(timezone.utc)
+        for product_id in requested:
+            found = product_id in variants
+            self.entries[product_id] = {
+                '_id': Int64(product_id),
+                'found': found,
+                'variantIds': [Int64(variant_id) for variant_id in variants.get(product_id, [])],
+                'resolvedAt': now,
+            }
+            self.changed.add(product_id)
+
+    def get(self, product_id):
+        return self.entries.get(product_id)
+
+    def to_operations(self):
+        """Build upsert operations for lookups made since load."""
+        return [
+            ReplaceOne({'_id': Int64(product_id)}, self.entries[product_id], upsert=True)
+            for product_id in sorted(self.changed)
+        ]
+
+    def save(self, collection):
+        """Upsert new lookups into MongoDB. Returns the number of entries written."""
+        operations = self.to_operations()
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        self.changed.clear()
+        return len(operations)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def embed_variants(records, cache):
+    """
+    Set a validated shopifyVariantId on every record whose Shopify product is cached.
+
+    Returns:
+        (changed positions, issues) where issues maps 'filled', 'replaced',
+        'notFound' and 'noVariants' to lists of (productId, shopifyProductId)
+    """
+    changed = []
+    issues = {'filled': [], 'replaced': [], 'notFound': [], 'noVariants': []}
+    for position, record in enumerate(records):
+        shopify_id = shopify_product_id(record.get('shopifyProductId'))
+        entry = cache.get(shopify_id) if shopify_id is not None else None
+        if entry is None:
+            continue
+        label = (record.get('productId'), shopify_id)
+        if not entry['found']:
+            issues['notFound'].append(label)
+            continue
+        variant_ids = [int(variant_id) for variant_id in entry['variantIds']]
+        if not variant_ids:
+            issues['noVariants'].append(label)
+            continue
+        current = shopify_product_id(record.get('shopifyVariantId'))
+        if current in variant_ids:
+            continue
+        issues['replaced' if current is not None else 'filled'].append(label)
+        record['shopifyVariantId'] = Int64(variant_ids[0])
+        changed.append(position)
+    return changed, issues
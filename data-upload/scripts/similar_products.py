@@ -0,0 +1,110 @@
+"""
+Similar Products for K-Beauty Product Data Upload
+
+Precomputes product-to-product neighbor lists at ingest time so alternatives and
+"swap" suggestions are a single field read instead of request-time pairwise
+comparisons.
+
+Each product is described by a sparse TF-IDF vector over its normalized
+ingredients, concerns and preferences. Rows are L2-normalized, so the cosine
+similarity of every pair in a category is one sparse matrix product (X @ X.T).
+The top-K neighbors per product are stored, most similar first, in the
+`similarProducts` field as a list of productIds.
+"""
+
+import numpy as np
+from scipy import sparse
+
+# Feature columns and the prefix used to keep their vocabularies apart
+# (so the concern 'texture' never collides with an ingredient of the same name)
+FEATURE_COLUMNS = {
+    'fullIngredientList': 'ing',
+    'keyIngredients': 'key',
+    'concernsAddressed': 'concern',
+    'preferences': 'pref',
+}
+
+DEFAULT_TOP_K = 5
+MIN_SIMILARITY = 0.05  # Neighbors below this score are not worth suggesting
+
+
+def product_tokens(row):
+    """Collect the prefixed feature tokens of one product row."""
+    tokens = set()
+    for column, prefix in FEATURE_COLUMNS.items():
+        values = row.get(column)
+        if isinstance(values, list):
+            tokens.update(f"{prefix}:{value}" for value in values if value)
+    return tokens
+
+
+def build_tfidf_matrix(token_sets):
+    """
+    Build an L2-normalized sparse TF-IDF matrix (one row per product).
+
+    Tokens are binary within a product (an ingredient is listed once), so the
+    weight of a token is its smoothed inverse document frequency.
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for row_index, tokens in enumerate(token_sets):
+        for token in sorted(tokens):  # Sorted so the float sums (and ties) are reproducible
+            rows.append(row_index)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    shape = (len(token_sets), len(vocabulary))
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+
+    doc_frequency = np.bincount(cols, minlength=len(vocabulary))
+    idf = np.log((1 + shape[0]) / (1 + doc_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def top_k_neighbors(matrix, top_k=DEFAULT_TOP_K, min_similarity=MIN_SIMILARITY):
+    """Return, for each row, the indices of its top-K most similar other rows."""
+    similarity = (matrix @ matrix.T).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    neighbors = []
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        scores = similarity.data[start:end]
+        indices = similarity.indices[start:end]
+        keep = scores >= min_similarity
+        scores, indices = scores[keep], indices[keep]
+        order = np.lexsort((indices, -scores))[:top_k]  # Highest score first, ties by row order
+        neighbors.append(indices[order].tolist())
+    return neighbors
+
+
+def add_similar_products(df, top_k=DEFAULT_TOP_K, id_column='productId', category_column='category'):
+    """
+    Add a `similarProducts` column with the top-K neighbors within each category.
+
+    Args:
+        df: Normalized product DataFrame (array columns already converted to lists)
+        top_k: Number of neighbors to keep per product
+
+    Returns:
+        Number of products that received at least one neighbor
+    """
+    similar = [[] for _ in range(len(df))]
+    feature_columns = [column for column in FEATURE_COLUMNS if column in df.columns]
+
+    for group_positions in df.groupby(category_column, sort=False).indices.values():
+        if len(group_positions) < 2:
+            continue
+        group_rows = df[feature_columns].iloc[group_positions].to_dict('records')
+        token_sets = [product_tokens(row) for row in group_rows]
+        matrix = build_tfidf_matrix(token_sets)
+        product_ids = df[id_column].iloc[group_positions].tolist()
+        for local_index, neighbor_indices in enumerate(top_k_neighbors(matrix, top_k)):
+            similar[group_positions[local_index]] = [product_ids[i] for i in neighbor_indices]
+
+    df['similarProducts'] = similar
+    return sum(1 for neighbors in similar if neighbors)
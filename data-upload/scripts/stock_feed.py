@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Stock Feed for K-Beauty Product Data Upload
+
+Applies the daily stock and price changes without a full upload. A full
+upload re-normalizes every ingredient list and rewrites the products
+collection; a stock feed only touches `inStock`, `mrp` and the fields
+derived from the price (`budgetTier`, `pricePerUnit`) of the listed
+products. Every other field, document _id and index stays as it is.
+
+Feed format: a CSV with PRODUCTID and at least one of INSTOCK and MRP,
+spelled like the catalog sheet. Blank cells leave that field unchanged.
+
+    PRODUCTID,INSTOCK,MRP
+    cosrx-advanced-snail-96-mucin-power-essence-6f1c2a9b,FALSE,
+    beauty-of-joseon-relief-sun-rice-probiotics-0d3e5f21,TRUE,"₹1,150"
+
+Every row is validated first: the productId must exist in the live
+catalog, INSTOCK must be a TRUE/FALSE spelling and MRP must parse like the
+uploader parses it. Only values that differ from the live documents are
+written, as one unordered bulk_write of $set updates. The catalog history
+and bundle are then refreshed from the live collection, so the web server
+sees the new stock at its next cold start.
+
+Usage:
+    python scripts/stock_feed.py stock.csv [--dry-run] [--skip-invalid] [--no-bundle]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from pymongo import UpdateMany
+
+from upload_kbeauty_data import (
+    DATABASE_NAME, COLLECTION_NAME, INGREDIENTS_COLLECTION_NAME, SCRIPT_DIR, CATALOG_BUNDLE_DIR,
+    EXIT_OK, EXIT_FAILED, EXIT_QUARANTINED,
+    connect_to_mongo, record_catalog_generation, store_facet_index,
+)
+from catalog_bundle import write_catalog_bundle
+from csv_scan import CatalogScan
+from ingredient_dictionary import IngredientDictionary
+from price_parser import parse_price, budget_tier
+from validation_config import BOOLEAN_VALUES
+from violation_report import ViolationAggregator, format_group, add_report_arguments
+
+FEED_COLUMNS = ['PRODUCTID', 'INSTOCK', 'MRP']
+# Live fields read to compute what actually changes
+CURRENT_FIELDS = {'_id': 0, 'productId': 1, 'inStock': 1, 'mrp': 1, 'sizeValue': 1,
+                  'budgetTier': 1, 'pricePerUnit': 1}
+
+
+def read_feed(feed_path, violations):
+    """
+    Parse and check the feed file on its own (no database).
+
+    Returns:
+        (changes, rows): {productId: {'row': row number, 'inStock': bool or None,
+        'mrp': float or None}} for rows without errors, and the number of rows read.
+        Problems are recorded in `violations`.
+    """
+    scan = CatalogScan(feed_path, columns=FEED_COLUMNS)
+    id_column = scan.find_column('PRODUCTID')
+    stock_column = scan.find_column('INSTOCK')
+    price_column = scan.find_column('MRP')
+    if id_column is None or (stock_column is None and price_column is None):
+        violations.error('COLUMNS', message="The feed needs a PRODUCTID column and an INSTOCK and/or MRP column")
+        return {}, 0
+
+    changes = {}
+    seen = set()
+    rows = 0
+    for row_number, row in scan:
+        rows += 1
+        product_id = (row[id_column] or '').strip()
+        if not product_id:
+            violations.error('PRODUCTID', row=row_number, message="Missing PRODUCTID")
+            continue
+        if product_id in seen:
+            violations.error('PRODUCTID', product_id, row=row_number,
+                             message=f"PRODUCTID '{product_id}' is listed more than once")
+            changes.pop(product_id, None)
+            continue
+        seen.add(product_id)
+
+        change = {'row': row_number, 'inStock': None, 'mrp': None}
+        stock = (row[stock_column] or '').strip() if stock_column else ''
+        if stock:
+            change['inStock'] = BOOLEAN_VALUES.get(stock.upper())
+            if change['inStock'] is None:
+                violations.error('INSTOCK', stock, row=row_number, message=f"Invalid INSTOCK '{stock}'")
+        price = (row[price_column] or '').strip() if price_column else ''
+        if price:
+            change['mrp'] = parse_price(price)
+            if change['mrp'] is None or change['mrp'] <= 0:
+                violations.error('MRP', price, row=row_number, message=f"Invalid MRP '{price}'")
+                change['mrp'] = None
+        if (stock and change['inStock'] is None) or (price and change['mrp'] is None):
+            continue
+        changes[product_id] = change
+    return changes, rows
+
+
+def price_fields(mrp, size_value):
+    """mrp and the fields the uploader derives from it (see price_parser.add_price_fields)."""
+    fields = {'mrp': mrp, 'budgetTier': budget_tier(mrp)}
+    if size_value:
+        fields['pricePerUnit'] = round(mrp / size_value, 2)
+    return fields
+
+
+def build_updates(changes, current):
+    """
+    $set operations for the values that differ from the live documents.
+
+    Args:
+        changes: Output of read_feed() (only productIds present in `current`)
+        current: {productId: live document with CURRENT_FIELDS}
+
+    Returns:
+        (operations, counts) with counts of 'stock' and 'price' changes
+    """
+    operations = []
+    counts = {'stock': 0, 'price': 0}
+    for product_id, change in changes.items():
+        product = current[product_id]
+        fields = {}
+        if change['inStock'] is not None and product.get('inStock') != change['inStock']:
+            fields['inStock'] = change['inStock']
+            counts['stock'] += 1
+        if change['mrp'] is not None and product.get('mrp') != change['mrp']:
+            fields.update(price_fields(change['mrp'], product.get('sizeValue')))
+            counts['price'] += 1
+        if fields:
+            # UpdateMany: a productId repeated in the sheet is stored once per row
+            operations.append(UpdateMany({'productId': product_id}, {'$set': fields}))
+    return operations, counts
+
+
+def print_violations(violations, limit=20):
+    groups = violations.sorted_groups()
+    print(f"\n❌ {violations.count()} problem(s) in the feed:")
+    for group in groups[:limit]:
+        print(f"   - {format_group(group)}")
+    if len(groups) > limit:
+        print(f"   ... and {len(groups) - limit} more")
+
+
+def apply_feed(feed_path, dry_run=False, skip_invalid=False, refresh_bundle=True,
+               json_report=None, ndjson_report=None):
+    """
+    Validate a stock feed against the live catalog and apply it.
+
+    Returns:
+        EXIT_OK, EXIT_QUARANTINED (--skip-invalid and some rows were skipped) or EXIT_FAILED
+    """
+    violations = ViolationAggregator()
+    print(f"🔄 Reading stock feed '{feed_path}'...")
+    changes, rows = read_feed(feed_path, violations)
+    print(f"   ✅ Read {rows} row(s), {len(changes)} without errors")
+
+    print("🔌 Connecting to MongoDB Atlas...")
+    client = connect_to_mongo()
+    try:
+        collection = client[DATABASE_NAME][COLLECTION_NAME]
+        current = {
+            product['productId']: product
+            for product in collection.find({'productId': {'$in': list(changes)}}, CURRENT_FIELDS)
+        }
+        for product_id in [product_id for product_id in changes if product_id not in current]:
+            violations.error('PRODUCTID', product_id, row=changes.pop(product_id)['row'],
+                             message=f"Unknown productId '{product_id}' (not in the live catalog)")
+        violations.write(json_report, ndjson_report, source=os.path.basename(feed_path), rows=rows)
+
+        if violations.count():
+            print_violations(violations)
+            if not skip_invalid:
+                print("❌ Nothing was applied (pass --skip-invalid to apply the valid rows).")
+                return EXIT_FAILED
+
+        operations, counts = build_updates(changes, current)
+        print(f"🔍 {len(operations)} product(s) change: {counts['stock']} stock, {counts['price']} price "
+              f"({len(changes) - len(operations)} already up to date)")
+        if dry_run or not operations:
+            if dry_run:
+                print("   ℹ️  Dry run: nothing was written")
+            return EXIT_QUARANTINED if violations.count() else EXIT_OK
+
+        started = time.perf_counter()
+        result = collection.bulk_write(operations, ordered=False)
+        print(f"   ✅ Updated {result.modified_count} document(s) in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+        if refresh_bundle:
+            records = list(collection.find({}))
+            ingredients = IngredientDictionary.load(client[DATABASE_NAME][INGREDIENTS_COLLECTION_NAME])
+            generation = record_catalog_generation(client[DATABASE_NAME], records, ingredients=ingredients)
+            manifest = write_catalog_bundle(records, CATALOG_BUNDLE_DIR, generation=generation,
+                                            ingredients=ingredients)
+            print(f"   ✅ Wrote catalog bundle {manifest['file']}")
+            store_facet_index(client[DATABASE_NAME], manifest)
+        return EXIT_QUARANTINED if violations.count() else EXIT_OK
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Apply a productId/INSTOCK/MRP feed to the live catalog.")
+    parser.add_argument('feed_path', help="Feed CSV path, relative to this script")
+    parser.add_argument('--dry-run', action='store_true', help="Validate and show the changes without writing")
+    parser.add_argument('--skip-invalid', action='store_true',
+                        help="Apply the valid rows even if other rows have errors (exit status "
+                             f"{EXIT_QUARANTINED})")
+    parser.add_argument('--no-bundle', dest='refresh_bundle', action='store_false',
+                        help="Do not record a catalog generation or rewrite the catalog bundle")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    feed_path = os.path.join(SCRIPT_DIR, args.feed_path)
+    if not os.path.exists(feed_path):
+        print(f"❌ Error: File '{feed_path}' not found.")
+        return EXIT_FAILED
+    return apply_feed(feed_path, dry_run=args.dry_run, skip_invalid=args.skip_invalid,
+                      refresh_bundle=args.refresh_bundle, json_report=args.json_report,
+                      ndjson_report=args.ndjson_report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Upload Verification for K-Beauty Product Data Upload
+
+Checks that the products collection holds exactly the documents the uploader
+meant to write, without reading them back. Both sides compute the same
+order-independent checksums, and only the checksums cross the network:
+
+- client: every record is hashed exactly like MongoDB's $toHashedIndexKey
+  (MD5 over the document's BSON, the hash used by hashed indexes) and sized
+  with its BSON length
+- server: one aggregation over the written collection computes the same
+  values with $toHashedIndexKey and $bsonSize on $$ROOT
+
+Checksums are summed per category ({count, hash, bytes}), so a catalog of any
+size is verified with one small result per category. For a category whose
+checksums differ, the range of _ids is bisected (one aggregation per half)
+until at most BISECT_LEAF_SIZE documents remain, and only those are compared
+one by one. That pinpoints the missing, extra and changed documents.
+
+Servers without $toHashedIndexKey, or whose hashes differ from the client's
+for a probe document, are verified on BSON sizes only; servers without
+$bsonSize as well are verified on document counts.
+"""
+
+import hashlib
+import math
+import struct
+from datetime import datetime, timezone
+
+import bson
+from bson.int64 import Int64
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure
+
+BISECT_LEAF_SIZE = 8        # Ranges with at most this many documents are compared one by one
+HASH_MODULUS = 2 ** 32      # Hashes are summed modulo this so the server's $sum stays an exact long
+
+# Verification modes, strongest first
+MODE_HASH = 'hash'
+MODE_SIZE = 'size'
+MODE_COUNT = 'count'
+
+# Covers every BSON type the uploader writes; hashed by the server and the client to
+# make sure both compute the same $toHashedIndexKey
+PROBE_DOCUMENT = {
+    '_id': ObjectId('000000000000000000000001'),
+    'name': 'Relief Sun · 50ml',
+    'mrp': 1650.5,
+    'shopifyProductId': Int64(7176831991843),
+    'rating': 4,
+    'inStock': True,
+    'weight': None,
+    'skinTypes': ['dry', 'oily'],
+    'nested': {'ids': [1, 2], 'at': datetime(2024, 1, 1, tzinfo=timezone.utc)},
+}
+
+# BSON type byte -> canonical type hashed by MongoDB (see canonicalizeBSONType)
+_CANONICAL_TYPES = {
+    0x01: 10, 0x10: 10, 0x12: 10,   # double, int32, int64 (hashed as 64-bit integers)
+    0x02: 15, 0x0E: 15,             # string, symbol
+    0x03: 20, 0x04: 25,             # document, array
+    0x05: 30, 0x07: 35, 0x08: 40,   # binary, ObjectId, boolean
+    0x09: 45, 0x11: 47, 0x0A: 5,    # date, timestamp, null
+    0x06: 0, 0xFF: -1, 0x7F: 127,   # undefined, MinKey, MaxKey
+}
+# Value size of the fixed-size types
+_FIXED_SIZES = {0x01: 8, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8, 0x12: 8,
+                0x06: 0, 0xFF: 0, 0x7F: 0}
+_LONG_MIN = -2 ** 63
+
+
+def _int32(value):
+    return struct.pack('<i', value)
+
+
+def _number_for_hash(type_byte, data):
+    """The 64-bit integer a number is hashed as (doubles are truncated; NaN and overflow hash as LONG_MIN)."""
+    if type_byte == 0x10:
+        return struct.unpack('<i', data)[0]
+    if type_byte == 0x12:
+        return struct.unpack('<q', data)[0]
+    number = struct.unpack('<d', data)[0]
+    if math.isnan(number) or not _LONG_MIN <= number < 2 ** 63:
+        return _LONG_MIN
+    return int(number)
+
+
+def _value_size(type_byte, data, start):
+    if type_byte in _FIXED_SIZES:
+        return _FIXED_SIZES[type_byte]
+    if type_byte in (0x02, 0x0E):
+        return 4 + struct.unpack_from('<i', data, start)[0]
+    if type_byte in (0x03, 0x04):
+        return struct.unpack_from('<i', data, start)[0]
+    if type_byte == 0x05:
+        return 5 + struct.unpack_from('<i', data, start)[0]
+    raise ValueError(f"Cannot hash BSON type 0x{type_byte:02x}")
+
+
+def _hash_embedded(md5, data, start):
+    """Hash the elements of the embedded document or array at `start`, including its terminator."""
+    offset = start + 4
+    while True:
+        type_byte = data[offset]
+        if type_byte == 0:
+            md5.update(_int32(0))  # The terminator is hashed as an element of canonical type 0
+            return
+        name_end = data.index(b'\x00', offset + 1)
+        value_start = name_end + 1
+        size = _value_size(type_byte, data, value_start)
+        _hash_element(md5, type_byte, data, value_start, size, name=data[offset + 1:value_start])
+        offset = value_start + size
+
+
+def _hash_element(md5, type_byte, data, start, size, name=None):
+    if type_byte not in _CANONICAL_TYPES:
+        raise ValueError(f"Cannot hash BSON type 0x{type_byte:02x}")
+    md5.update(_int32(_CANONICAL_TYPES[type_byte]))
+    if name is not None:
+        md5.update(name)  # Field name including its NUL terminator
+    if type_byte in (0x03, 0x04):
+        _hash_embedded(md5, data, start)
+    elif _CANONICAL_TYPES[type_byte] == 10:
+        md5.update(struct.pack('<q', _number_for_hash(type_byte, data[start:start + size])))
+    else:
+        md5.update(data[start:start + size])
+
+
+def hash_document(document):
+    """
+    The value MongoDB's {$toHashedIndexKey: '$$ROOT'} returns for a stored document.
+
+    Fields are hashed in stored order, with _id first as pymongo writes it.
+    """
+    data = bson.encode(document)
+    md5 = hashlib.md5(_int32(0))  # Hash seed 0
+    _hash_element(md5, 0x03, data, 0, len(data))
+    return struct.unpack('<q', md5.digest()[:8])[0]
+
+
+def _modulo(value):
+    """$mod of a long: the remainder has the sign of the dividend (unlike Python's %)."""
+    remainder = abs(value) % HASH_MODULUS
+    return -remainder if value < 0 else remainder
+
+
+def document_checksum(document, mode=MODE_HASH):
+    """(hash, BSON size) of one document; parts the mode does not use are 0."""
+    if mode == MODE_COUNT:
+        return 0, 0
+    size = len(bson.encode(document))
+    return (hash_document(document) if mode == MODE_HASH else 0), size
+
+
+class UploadVerifier:
+    """Compares written records with server-side checksums of a collection."""
+
+    def __init__(self, collection, leaf_size=BISECT_LEAF_SIZE):
+        self.collection = collection
+        self.leaf_size = leaf_size
+        self.mode = None
+        self.queries = 0
+        self.bytes_received = 0
+
+    def _aggregate(self, pipeline):
+        results = list(self.collection.aggregate(pipeline))
+        self.queries += 1
+        self.bytes_received += sum(len(bson.encode(result)) for result in results)
+        return results
+
+    def detect_mode(self):
+        """Strongest mode the server supports, checked against the probe document."""
+        probes = [
+            (MODE_HASH, {'$toHashedIndexKey': {'$literal': PROBE_DOCUMENT}}, hash_document(PROBE_DOCUMENT)),
+            (MODE_SIZE, {'$bsonSize': {'$literal': PROBE_DOCUMENT}}, len(bson.encode(PROBE_DOCUMENT))),
+        ]
+        for mode, expression, expected in probes:
+            try:
+                results = self._aggregate([{'$limit': 1}, {'$project': {'_id': 0, 'value': expression}}])
+            except OperationFailure:
+                continue
+            if results and results[0]['value'] == expected:
+                return mode
+        return MODE_COUNT
+
+    def _fields(self):
+        """$project fields computing the per-document checksum on the server."""
+        fields = {}
+        if self.mode == MODE_HASH:
+            fields['hash'] = {'$toHashedIndexKey': '$$ROOT'}
+        if self.mode in (MODE_HASH, MODE_SIZE):
+            fields['size'] = {'$bsonSize': '$$ROOT'}
+        return fields
+
+    def server_checksums(self, match, group_by='$category'):
+        """{group: {'count', 'hash', 'bytes'}} aggregated on the server over the matching documents."""
+        fields = self._fields()
+        group = {'_id': group_by, 'count': {'$sum': 1}}
+        if 'hash' in fields:
+            group['hash'] = {'$sum': {'$mod': ['$hash', HASH_MODULUS]}}
+        if 'size' in fields:
+            group['bytes'] = {'$sum': '$size'}
+        pipeline = [{'$match': match}]
+        if fields:
+            pipeline.append({'$project': dict(fields, category=1)})
+        pipeline.append({'$group': group})
+        return {
+            result['_id']: {'count': result['count'], 'hash': result.get('hash', 0),
+                            'bytes': result.get('bytes', 0)}
+            for result in self._aggregate(pipeline)
+        }
+
+    @staticmethod
+    def client_checksums(entries):
+        """Sum (id, hash, size) entries the way server_checksums() does."""
+        return {'count': len(entries), 'hash': sum(_modulo(entry[1]) for entry in entries),
+                'bytes': sum(entry[2] for entry in entries)}
+
+    def _range_match(self, category, lower, upper):
+        match = {'category': category}
+        bounds = {}
+        if lower is not None:
+            bounds['$gte'] = lower
+        if upper is not None:
+            bounds['$lt'] = upper
+        if bounds:
+            match['_id'] = bounds
+        return match
+
+    def _compare_documents(self, match, entries, mismatches):
+        projection = dict(self._fields(), productId=1)
+        server = {document['_id']: document for document in
+                  self._aggregate([{'$match': match}, {'$project': projection}])}
+        client = {entry[0]: entry for entry in entries}
+        for document_id, entry in client.items():
+            document = server.get(document_id)
+            if document is None:
+                mismatches['missing'].append((document_id, entry[3]))
+            elif (document.get('hash', 0), document.get('size', 0)) != (entry[1], entry[2]):
+                mismatches['changed'].append((document_id, entry[3]))
+        for document_id, document in server.items():
+            if document_id not in client:
+                mismatches['extra'].append((document_id, document.get('productId')))
+
+    def _bisect(self, category, entries, lower, upper, server, mismatches):
+        """Narrow a mismatching _id range [lower, upper) down to the documents that differ."""
+        if server is None:
+            server = self.server_checksums(self._range_match(category, lower, upper), group_by=None)
+            server = server.get(None, {'count': 0, 'hash': 0, 'bytes': 0})
+        if server == self.client_checksums(entries):
+            return
+        if len(entries) <= self.leaf_size:
+            self._compare_documents(self._range_match(category, lower, upper), entries, mismatches)
+            return
+        middle = len(entries) // 2
+        split = entries[middle][0]
+        self._bisect(category, entries[:middle], lower, split, None, mismatches)
+        self._bisect(category, entries[middle:], split, upper, None, mismatches)
+
+    def verify(self, records):
+        """
+        Verify the collection against the records written to it (with their _ids).
+
+        Returns:
+            Dict with 'mode', 'documents', 'categories', 'queries', 'bytes' (received)
+            and 'missing', 'extra', 'changed': lists of (_id, productId)
+        """
+        if self.mode is None:
+            self.mode = self.detect_mode()
+        by_category = {}
+        for record in records:
+            document_hash, size = document_checksum(record, self.mode)
+            by_category.setdefault(record.get('category'), []).append(
+                (record['_id'], document_hash, size, record.get('productId')))
+
+        server = self.server_checksums({})
+        mismatches = {'missing': [], 'extra': [], 'changed': []}
+        for category in sorted(by_category.keys() | server.keys(), key=str):
+            entries = sorted(by_category.get(category, []), key=lambda entry: entry[0])
+            checksums = server.get(category, {'count': 0, 'hash': 0, 'bytes': 0})
+            self._bisect(category, entries, None, None, checksums, mismatches)
+
+        result = {'mode': self.mode, 'documents': len(records), 'categories': len(by_category),
+                  'queries': self.queries, 'bytes': self.bytes_received}
+        result.update(mismatches)
+        return result
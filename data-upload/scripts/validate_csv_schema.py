@@ -4,11 +4,15 @@ CSV Schema Validation Script
 Validates the CSV file against the database schema requirements
 """
 
+import argparse
 import pandas as pd
 import sys
 import re
 from collections import defaultdict
 
+from profiling import add_profile_argument, enable_profiling, profile_stage, report_profile
+from violation_report import ERROR, WARNING, ViolationAggregator, add_report_arguments, format_group
+
 # Configuration
 EXCEL_FILE = "4-12-25 DB.xlsx"  # Supports Excel format
 
@@ -152,20 +156,20 @@ def check_ingredient_format(ingredient):
     return True
 
 
-def validate_csv():
-    """Main validation function"""
+def validate_csv(json_report=None, ndjson_report=None):
+    """Main validation function (optionally writes the violations as JSON/NDJSON)"""
     print("=" * 80)
     print("DATA SCHEMA VALIDATION REPORT")
     print("=" * 80)
     print(f"\nValidating file: {EXCEL_FILE}\n")
     
-    errors = []
-    warnings = []
+    violations = ViolationAggregator()
     stats = defaultdict(int)
     
     try:
         # Read Excel file
-        df = pd.read_excel(EXCEL_FILE)
+        with profile_stage('load'):
+            df = pd.read_excel(EXCEL_FILE)
         print(f"✓ Excel file loaded successfully")
         print(f"✓ Total rows: {len(df)}")
         print(f"✓ Total columns: {len(df.columns)}\n")
@@ -184,7 +188,7 @@ def validate_csv():
         for req_col in required_excel_cols:
             if req_col not in excel_columns_lower:
                 missing_cols.append(req_col)
-                errors.append(f"Missing required column: {req_col}")
+                violations.error('COLUMNS', req_col, message=f"Missing required column: {req_col}")
             else:
                 print(f"✓ Found required column: {req_col}")
         
@@ -195,7 +199,7 @@ def validate_csv():
         
         # Check for PRODUCTID column (critical)
         if 'PRODUCTID' not in excel_columns_lower:
-            errors.append("CRITICAL: PRODUCTID column is missing. This is required for unique product identification.")
+            violations.error('COLUMNS', 'PRODUCTID (CRITICAL)', message="CRITICAL: PRODUCTID column is missing. This is required for unique product identification.")
         else:
             print(f"\n✓ PRODUCTID column found")
         
@@ -206,7 +210,7 @@ def validate_csv():
         
         # Check for typo in FULLINGREDIENTLIST
         if 'FULLINGREDIENTSLIST' in excel_columns_lower and 'FULLINGREDIENTLIST' not in excel_columns_lower:
-            warnings.append("Column name typo detected: 'FULLINGREDIENTSLIST' should be 'FULLINGREDIENTLIST' (missing 'E'). This is handled by the upload script.")
+            violations.warning('COLUMNS', 'FULLINGREDIENTSLIST', message="Column name typo detected: 'FULLINGREDIENTSLIST' should be 'FULLINGREDIENTLIST' (missing 'E'). This is handled by the upload script.")
             print("⚠ Column name typo: FULLINGREDIENTSLIST (should be FULLINGREDIENTLIST)")
         
         print(f"\nFound columns: {', '.join(df.columns)}\n")
@@ -218,141 +222,142 @@ def validate_csv():
         
         product_ids = set()
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # +2 because CSV is 1-indexed and has header
+        with profile_stage('validate rows'):
+            for idx, row in df.iterrows():
+                row_num = idx + 2  # +2 because CSV is 1-indexed and has header
             
-            # Check PRODUCTID (if exists)
-            if 'PRODUCTID' in df.columns:
-                product_id = row.get('PRODUCTID', '')
-                if pd.isna(product_id) or str(product_id).strip() == '':
-                    errors.append(f"Row {row_num}: Missing PRODUCTID")
-                else:
-                    product_id = str(product_id).strip()
-                    if product_id in product_ids:
-                        errors.append(f"Row {row_num}: Duplicate PRODUCTID '{product_id}'")
+                # Check PRODUCTID (if exists)
+                if 'PRODUCTID' in df.columns:
+                    product_id = row.get('PRODUCTID', '')
+                    if pd.isna(product_id) or str(product_id).strip() == '':
+                        violations.error('PRODUCTID', None, row=row_num, message="Missing PRODUCTID")
                     else:
-                        product_ids.add(product_id)
+                        product_id = str(product_id).strip()
+                        if product_id in product_ids:
+                            violations.error('PRODUCTID (DUPLICATE)', product_id, row=row_num, message=f"Duplicate PRODUCTID '{product_id}'")
+                        else:
+                            product_ids.add(product_id)
             
-            # Check NAME
-            name = row.get('NAME', '')
-            if pd.isna(name) or str(name).strip() == '':
-                errors.append(f"Row {row_num}: Missing NAME")
+                # Check NAME
+                name = row.get('NAME', '')
+                if pd.isna(name) or str(name).strip() == '':
+                    violations.error('NAME', None, row=row_num, message="Missing NAME")
             
-            # Check CATEGORY
-            category = row.get('CATEGORY', '')
-            if pd.isna(category) or str(category).strip() == '':
-                errors.append(f"Row {row_num}: Missing CATEGORY")
-            else:
-                category = str(category).strip().upper()
-                if category not in CATEGORY_MAP:
-                    errors.append(f"Row {row_num}: Invalid CATEGORY '{category}'. Valid: {', '.join(CATEGORY_MAP.keys())}")
+                # Check CATEGORY
+                category = row.get('CATEGORY', '')
+                if pd.isna(category) or str(category).strip() == '':
+                    violations.error('CATEGORY', None, row=row_num, message="Missing CATEGORY")
+                else:
+                    category = str(category).strip().upper()
+                    if category not in CATEGORY_MAP:
+                        violations.error('CATEGORY', category, row=row_num, message=f"Invalid CATEGORY '{category}'. Valid: {', '.join(CATEGORY_MAP.keys())}")
             
-            # Check INSTOCK
-            in_stock = row.get('INSTOCK', '')
-            in_stock_bool = parse_boolean(in_stock)
-            if in_stock_bool is None:
-                errors.append(f"Row {row_num}: Invalid INSTOCK value '{in_stock}'. Must be true/false")
+                # Check INSTOCK
+                in_stock = row.get('INSTOCK', '')
+                in_stock_bool = parse_boolean(in_stock)
+                if in_stock_bool is None:
+                    violations.error('INSTOCK', in_stock, row=row_num, message=f"Invalid INSTOCK value '{in_stock}'. Must be true/false")
             
-            # Check SKINTYPES
-            skin_types = parse_array(row.get('SKINTYPES', ''))
-            for st in skin_types:
-                if st not in VALID_SKIN_TYPES:
-                    errors.append(f"Row {row_num}: Invalid SKINTYPE '{st}'. Valid: {', '.join(VALID_SKIN_TYPES)}")
+                # Check SKINTYPES
+                skin_types = parse_array(row.get('SKINTYPES', ''))
+                for st in skin_types:
+                    if st not in VALID_SKIN_TYPES:
+                        violations.error('SKINTYPES', st, row=row_num, message=f"Invalid SKINTYPE '{st}'. Valid: {', '.join(VALID_SKIN_TYPES)}")
             
-            # Check CONCERNSADDRESSED
-            concerns = parse_array(row.get('CONCERNSADDRESSED', ''))
-            for concern in concerns:
-                if concern not in VALID_CONCERNS:
-                    warnings.append(f"Row {row_num}: Unknown concern '{concern}'. May need to be added to VALID_CONCERNS or mapped to core concern.")
+                # Check CONCERNSADDRESSED
+                concerns = parse_array(row.get('CONCERNSADDRESSED', ''))
+                for concern in concerns:
+                    if concern not in VALID_CONCERNS:
+                        violations.warning('CONCERNSADDRESSED', concern, row=row_num, message=f"Unknown concern '{concern}'. May need to be added to VALID_CONCERNS or mapped to core concern.")
             
-            # Check SENSITIVITYSAFE
-            sens_safe = row.get('SENSITIVITYSAFE', '')
-            sens_safe_bool = parse_boolean(sens_safe)
-            if sens_safe_bool is None:
-                errors.append(f"Row {row_num}: Invalid SENSITIVITYSAFE value '{sens_safe}'. Must be true/false")
+                # Check SENSITIVITYSAFE
+                sens_safe = row.get('SENSITIVITYSAFE', '')
+                sens_safe_bool = parse_boolean(sens_safe)
+                if sens_safe_bool is None:
+                    violations.error('SENSITIVITYSAFE', sens_safe, row=row_num, message=f"Invalid SENSITIVITYSAFE value '{sens_safe}'. Must be true/false")
             
-            # Check KEYINGREDIENTS
-            key_ingredients = parse_array(row.get('KEYINGREDIENTS', ''))
-            for ing in key_ingredients:
-                if not check_ingredient_format(ing):
-                    warnings.append(f"Row {row_num}: KEYINGREDIENT '{ing}' may not be properly normalized (should be lowercase with hyphens)")
+                # Check KEYINGREDIENTS
+                key_ingredients = parse_array(row.get('KEYINGREDIENTS', ''))
+                for ing in key_ingredients:
+                    if not check_ingredient_format(ing):
+                        violations.warning('KEYINGREDIENTS', ing, row=row_num, message=f"KEYINGREDIENT '{ing}' may not be properly normalized (should be lowercase with hyphens)")
             
-            # Check FULLINGREDIENTLIST (handle typo)
-            full_ing_col = 'FULLINGREDIENTSLIST' if 'FULLINGREDIENTSLIST' in df.columns else 'FULLINGREDIENTLIST'
-            if full_ing_col in df.columns:
-                full_ingredients = row.get(full_ing_col, '')
-                if pd.isna(full_ingredients) or str(full_ingredients).strip() == '':
-                    warnings.append(f"Row {row_num}: FULLINGREDIENTLIST is empty. This is CRITICAL for allergy checking.")
-                else:
-                    # Check if ingredients are normalized
-                    ing_list = str(full_ingredients)
-                    # Check for common normalization issues
-                    if any(c.isupper() for c in ing_list if c.isalpha()):
-                        warnings.append(f"Row {row_num}: FULLINGREDIENTLIST contains uppercase letters. Should be normalized to lowercase.")
-                    if '/' in ing_list or ',' in ing_list:
-                        # Check if it's properly formatted
-                        pass  # Can have commas and slashes, but should be normalized
+                # Check FULLINGREDIENTLIST (handle typo)
+                full_ing_col = 'FULLINGREDIENTSLIST' if 'FULLINGREDIENTSLIST' in df.columns else 'FULLINGREDIENTLIST'
+                if full_ing_col in df.columns:
+                    full_ingredients = row.get(full_ing_col, '')
+                    if pd.isna(full_ingredients) or str(full_ingredients).strip() == '':
+                        violations.warning('FULLINGREDIENTLIST', None, row=row_num, message="FULLINGREDIENTLIST is empty. This is CRITICAL for allergy checking.")
+                    else:
+                        # Check if ingredients are normalized
+                        ing_list = str(full_ingredients)
+                        # Check for common normalization issues
+                        if any(c.isupper() for c in ing_list if c.isalpha()):
+                            violations.warning('FULLINGREDIENTLIST (CASE)', None, row=row_num, message="FULLINGREDIENTLIST contains uppercase letters. Should be normalized to lowercase.")
+                        if '/' in ing_list or ',' in ing_list:
+                            # Check if it's properly formatted
+                            pass  # Can have commas and slashes, but should be normalized
             
-            # Check GENDER
-            if 'GENDER' in df.columns:
-                gender = row.get('GENDER', '')
-                if not pd.isna(gender) and str(gender).strip():
-                    gender = str(gender).strip().lower()
-                    if gender not in VALID_GENDERS:
-                        warnings.append(f"Row {row_num}: Invalid GENDER '{gender}'. Valid: {', '.join(VALID_GENDERS)}")
+                # Check GENDER
+                if 'GENDER' in df.columns:
+                    gender = row.get('GENDER', '')
+                    if not pd.isna(gender) and str(gender).strip():
+                        gender = str(gender).strip().lower()
+                        if gender not in VALID_GENDERS:
+                            violations.warning('GENDER', gender, row=row_num, message=f"Invalid GENDER '{gender}'. Valid: {', '.join(VALID_GENDERS)}")
             
-            # Check TEXTURE
-            if 'TEXTURE' in df.columns:
-                texture = row.get('TEXTURE', '')
-                if not pd.isna(texture) and str(texture).strip():
-                    texture = str(texture).strip().lower()
-                    if texture not in VALID_TEXTURES:
-                        # Check for variations
-                        texture_variations = {
-                            'creamy-foam', 'lightweight-lotion', 'lightweight-oil', 
-                            'viscous-liquid', 'milky-serum', 'emulsion-like', 
-                            'creamy-clay', 'lotion', 'cream', 'gel', 'sheet',
-                            'creamy-grain', 'viscous', 'watery', 'essence-like'
-                        }
-                        if texture not in texture_variations:
-                            warnings.append(f"Row {row_num}: TEXTURE '{texture}' may not match schema. Valid: {', '.join(VALID_TEXTURES)}")
+                # Check TEXTURE
+                if 'TEXTURE' in df.columns:
+                    texture = row.get('TEXTURE', '')
+                    if not pd.isna(texture) and str(texture).strip():
+                        texture = str(texture).strip().lower()
+                        if texture not in VALID_TEXTURES:
+                            # Check for variations
+                            texture_variations = {
+                                'creamy-foam', 'lightweight-lotion', 'lightweight-oil', 
+                                'viscous-liquid', 'milky-serum', 'emulsion-like', 
+                                'creamy-clay', 'lotion', 'cream', 'gel', 'sheet',
+                                'creamy-grain', 'viscous', 'watery', 'essence-like'
+                            }
+                            if texture not in texture_variations:
+                                violations.warning('TEXTURE', texture, row=row_num, message=f"TEXTURE '{texture}' may not match schema. Valid: {', '.join(VALID_TEXTURES)}")
             
-            # Check USAGE
-            usage = row.get('USAGE', '')
-            if pd.isna(usage) or str(usage).strip() == '':
-                errors.append(f"Row {row_num}: Missing USAGE")
-            else:
-                usage = str(usage).strip().lower()
-                if usage not in VALID_USAGE:
-                    errors.append(f"Row {row_num}: Invalid USAGE '{usage}'. Valid: {', '.join(VALID_USAGE)}")
+                # Check USAGE
+                usage = row.get('USAGE', '')
+                if pd.isna(usage) or str(usage).strip() == '':
+                    violations.error('USAGE', None, row=row_num, message="Missing USAGE")
+                else:
+                    usage = str(usage).strip().lower()
+                    if usage not in VALID_USAGE:
+                        violations.error('USAGE', usage, row=row_num, message=f"Invalid USAGE '{usage}'. Valid: {', '.join(VALID_USAGE)}")
             
-            # Check FREQUENCY
-            if 'FREQUENCY' in df.columns:
-                frequency = row.get('FREQUENCY', '')
-                if not pd.isna(frequency) and str(frequency).strip():
-                    frequency = str(frequency).strip().lower()
-                    if frequency not in VALID_FREQUENCY:
-                        warnings.append(f"Row {row_num}: FREQUENCY '{frequency}' may not match schema. Valid: {', '.join(VALID_FREQUENCY)}")
+                # Check FREQUENCY
+                if 'FREQUENCY' in df.columns:
+                    frequency = row.get('FREQUENCY', '')
+                    if not pd.isna(frequency) and str(frequency).strip():
+                        frequency = str(frequency).strip().lower()
+                        if frequency not in VALID_FREQUENCY:
+                            violations.warning('FREQUENCY', frequency, row=row_num, message=f"FREQUENCY '{frequency}' may not match schema. Valid: {', '.join(VALID_FREQUENCY)}")
             
-            # Check CLIMATESUITABILITY
-            if 'CLIMATESUITABILITY' in df.columns:
-                climates = parse_array(row.get('CLIMATESUITABILITY', ''))
-                for climate in climates:
-                    if climate not in VALID_CLIMATES and climate != 'all':
-                        warnings.append(f"Row {row_num}: Invalid CLIMATE '{climate}'. Valid: {', '.join(VALID_CLIMATES)} or 'all'")
+                # Check CLIMATESUITABILITY
+                if 'CLIMATESUITABILITY' in df.columns:
+                    climates = parse_array(row.get('CLIMATESUITABILITY', ''))
+                    for climate in climates:
+                        if climate not in VALID_CLIMATES and climate != 'all':
+                            violations.warning('CLIMATESUITABILITY', climate, row=row_num, message=f"Invalid CLIMATE '{climate}'. Valid: {', '.join(VALID_CLIMATES)} or 'all'")
             
-            # Check PREFERENCES
-            if 'PREFERENCES' in df.columns:
-                preferences = parse_array(row.get('PREFERENCES', ''))
-                for pref in preferences:
-                    if pref not in VALID_PREFERENCES:
-                        warnings.append(f"Row {row_num}: Unknown preference '{pref}'. May not match user preferences in questionnaire.")
+                # Check PREFERENCES
+                if 'PREFERENCES' in df.columns:
+                    preferences = parse_array(row.get('PREFERENCES', ''))
+                    for pref in preferences:
+                        if pref not in VALID_PREFERENCES:
+                            violations.warning('PREFERENCES', pref, row=row_num, message=f"Unknown preference '{pref}'. May not match user preferences in questionnaire.")
             
-            # Count categories
-            if 'CATEGORY' in df.columns:
-                cat = row.get('CATEGORY', '').strip().upper()
-                if cat in CATEGORY_MAP:
-                    stats[f"category_{CATEGORY_MAP[cat]}"] += 1
+                # Count categories
+                if 'CATEGORY' in df.columns:
+                    cat = row.get('CATEGORY', '').strip().upper()
+                    if cat in CATEGORY_MAP:
+                        stats[f"category_{CATEGORY_MAP[cat]}"] += 1
         
         print(f"✓ Validated {len(df)} rows")
         print(f"✓ Found {len(product_ids)} unique product IDs")
@@ -371,33 +376,40 @@ def validate_csv():
         print("=" * 80)
         
         print(f"\n✓ Total rows validated: {len(df)}")
-        print(f"✗ Errors found: {len(errors)}")
-        print(f"⚠ Warnings found: {len(warnings)}")
+        error_count = violations.count(ERROR)
+        warning_count = violations.count(WARNING)
+        print(f"✗ Errors found: {error_count}")
+        print(f"⚠ Warnings found: {warning_count}")
         
-        if errors:
+        # One line per distinct (field, value), most frequent first within each field
+        if error_count:
             print("\n" + "=" * 80)
             print("ERRORS (MUST FIX):")
             print("=" * 80)
-            for i, error in enumerate(errors, 1):
-                print(f"{i}. {error}")
+            for i, group in enumerate(violations.sorted_groups(ERROR), 1):
+                print(f"{i}. {format_group(group)}")
         
-        if warnings:
+        if warning_count:
+            warning_groups = violations.sorted_groups(WARNING)
             print("\n" + "=" * 80)
             print("WARNINGS (SHOULD REVIEW):")
             print("=" * 80)
-            for i, warning in enumerate(warnings[:50], 1):  # Limit to first 50 warnings
-                print(f"{i}. {warning}")
-            if len(warnings) > 50:
-                print(f"\n... and {len(warnings) - 50} more warnings")
+            for i, group in enumerate(warning_groups[:50], 1):  # Limit to first 50 distinct warnings
+                print(f"{i}. {format_group(group)}")
+            if len(warning_groups) > 50:
+                print(f"\n... and {len(warning_groups) - 50} more distinct warnings")
+        
+        for path in violations.write(json_report, ndjson_report, source=EXCEL_FILE, rows=len(df)):
+            print(f"\n📄 Violation report written to: {path}")
         
-        if not errors and not warnings:
+        if not error_count and not warning_count:
             print("\n✓ All validations passed! CSV is ready for upload.")
-        elif not errors:
+        elif not error_count:
             print("\n⚠ CSV has warnings but no critical errors. Review warnings before upload.")
         else:
             print("\n✗ CSV has errors that must be fixed before upload.")
         
-        return len(errors) == 0
+        return error_count == 0
         
     except Exception as e:
         print(f"\n✗ Error reading Excel file: {e}")
@@ -407,6 +419,13 @@ def validate_csv():
 
 
 if __name__ == "__main__":
-    success = validate_csv()
+    parser = argparse.ArgumentParser(description="Validate the product sheet against the database schema.")
+    add_profile_argument(parser)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling('validate_csv_schema')
+    success = validate_csv(json_report=args.json_report, ndjson_report=args.ndjson_report)
+    report_profile()
     sys.exit(0 if success else 1)
 
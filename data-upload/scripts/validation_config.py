@@ -371,6 +371,11 @@ FREQUENCY_MAPPING = {
     'reapply-as-needed': 'as-needed',
 }
 
+# Preference mapping: maps misspelled/alternative preferences to valid ones
+# (entries come from the mapping patch written by find_invalid_values.py)
+PREFERENCE_MAPPING = {
+}
+
 # Category mapping (Excel to Database)
 CATEGORY_MAP = {
     'CLEANSERS': 'cleanser',
@@ -384,3 +389,110 @@ CATEGORY_MAP = {
     'OTHER': 'other'
 }
 
+
+# ============================================================================
+# PRODUCT DOCUMENT SCHEMA
+# ============================================================================
+
+# BSON type of every field the uploader is allowed to write (see ProductSchema
+# in src/lib/mongodb.js). Fields not listed here are rejected by the record
+# encoder. Types: 'string', 'int' (int32), 'float', 'bool', 'string_array',
+# 'shopify_id' ('shopify_id' is stored as int64 when numeric, otherwise as a string).
+PRODUCT_FIELD_TYPES = {
+    'productId': 'string',
+    'name': 'string',
+    'brand': 'string',
+    'category': 'string',
+    'subCategory': 'string',
+    'mrp': 'float',
+    'weight': 'string',
+    'sizeValue': 'float',       # WEIGHT in sizeUnit
+    'sizeUnit': 'string',       # 'ml', 'g' or 'pcs'
+    'pricePerUnit': 'float',    # mrp / sizeValue
+    'budgetTier': 'int',        # 1 low, 2 medium, 3 high (see BUDGET_TIER_*)
+    'skinTypes': 'string_array',
+    'concernsAddressed': 'string_array',
+    'sensitivitySafe': 'bool',
+    'keyIngredients': 'string_array',
+    'fullIngredientList': 'string_array',
+    'gender': 'string',
+    'texture': 'string',
+    'climateSuitability': 'string_array',
+    'preferences': 'string_array',
+    'usage': 'string',
+    'frequency': 'string',
+    'description': 'string',
+    'benefits': 'string',
+    'instructions': 'string',
+    'rating': 'float',
+    'imageUrl': 'string',
+    'productUrl': 'string',
+    'cheapestStoreLink': 'string',
+    'inStock': 'bool',
+    'shopifyProductId': 'shopify_id',
+    'shopifyVariantId': 'shopify_id',
+    'similarProducts': 'string_array',  # Precomputed same-category neighbors (productIds)
+}
+
+# Budget tier thresholds in ₹, matching the budget scoring in
+# src/lib/recommendationEngine.js: tier 1 below LOW_MAX, tier 2 up to and
+# including MEDIUM_MAX, tier 3 above
+BUDGET_TIER_LOW_MAX = 1000
+BUDGET_TIER_MEDIUM_MAX = 2500
+
+# ============================================================================
+# CSV COLUMN DTYPES
+# ============================================================================
+
+# pandas dtype of every known CSV column, keyed by canonical (upper-case,
+# stripped) column name. Used by csv_loader.load_catalog_csv() so no tool has
+# to rely on object-dtype inference. Kinds:
+#   'category' - low-cardinality enums
+#   'boolean'  - nullable boolean (TRUE/FALSE/YES/NO/Y/N/1/0, anything else -> <NA>)
+#   'string'   - free text, and comma-separated arrays (split during normalization)
+# MRP, RATING and Shopify IDs stay 'string' so malformed values are reported
+# by the validators instead of failing the CSV parse.
+CSV_COLUMN_DTYPES = {
+    'PRODUCTID': 'string',
+    'CATEGORY': 'category',
+    'SUBCATEGORY': 'category',
+    'BRAND': 'category',
+    'NAME': 'string',
+    'INSTOCK': 'boolean',
+    'MRP': 'string',
+    'WEIGHT': 'category',
+    'SKINTYPES': 'string',            # array
+    'SENSITIVITYSAFE': 'boolean',
+    'CONCERNSADDRESSED': 'string',    # array
+    'KEYINGREDIENTS': 'string',       # array
+    'FULLINGREDIENTLIST': 'string',   # array
+    'GENDER': 'category',
+    'TEXTURE': 'category',
+    'CLIMATESUITABILITY': 'category',  # array, but only a handful of distinct combinations
+    'PREFERENCES': 'string',          # array
+    'USAGE': 'category',
+    'FREQUENCY': 'category',
+    'DESCRIPTION': 'string',
+    'BENEFITS': 'string',
+    'INSTRUCTIONS': 'string',
+    'RATING': 'string',
+    'IMAGEURL': 'string',
+    'PRODUCTURL': 'string',
+    'CHEAPESTSTORELINK': 'string',
+    'SHOPIFYPRODUCTID': 'string',
+    'SHOPIFYVARIANTID': 'string',
+}
+
+# Header spellings found in real exports -> canonical column name
+CSV_COLUMN_ALIASES = {
+    'FULLINGRIEDIENTSLIST': 'FULLINGREDIENTLIST',
+    'FULLINGREDIENTSLIST': 'FULLINGREDIENTLIST',
+    'SHOPIFYPRODCUTID': 'SHOPIFYPRODUCTID',
+    'CONCERNADDRESSED': 'CONCERNSADDRESSED',
+}
+
+# Accepted spellings for 'boolean' columns (compared after strip + upper)
+BOOLEAN_VALUES = {
+    'TRUE': True, '1': True, 'YES': True, 'Y': True,
+    'FALSE': False, '0': False, 'NO': False, 'N': False,
+}
@@ -0,0 +1,176 @@
+"""
+Violation Aggregation for K-Beauty Product Data Upload
+
+Collects validation findings in memory that grows with the number of
+distinct (severity, field, value) groups, not with the number of rows:
+every violation increments an exact count for its group, and only the first
+`sample_size` row numbers (with product names, when given) are kept per
+group. A sheet where 100,000 rows share the same misspelled concern costs
+one group with 20 sample rows.
+
+The aggregate can be written as one JSON document, or as NDJSON (a summary
+line followed by one line per group) for CI checks and dashboards:
+
+    {"type": "summary", "source": "4-12-25 DB.csv", "totals": {"error": 3, "warning": 41}, ...}
+    {"type": "violation", "severity": "warning", "field": "CONCERNSADDRESSED",
+     "value": "wrinkle", "count": 12, "samples": [{"row": 4, "name": "..."}, ...],
+     "samplesTruncated": false, "message": "Unknown concern 'wrinkle'. ..."}
+
+Usage:
+    violations = ViolationAggregator()
+    violations.error('USAGE', usage, row=row_num, message=f"Invalid USAGE '{usage}'")
+    violations.write_json('report.json', source=csv_file)
+"""
+
+import json
+from collections import Counter
+from datetime import datetime, timezone
+
+DEFAULT_SAMPLE_SIZE = 20  # Row samples kept per (severity, field, value) group
+
+ERROR = 'error'
+WARNING = 'warning'
+_SEVERITY_ORDER = {ERROR: 0, WARNING: 1}
+
+
+def _json_value(value):
+    """Group values are stored as strings (None for column-level or missing values)."""
+    if value is None:
+        return None
+    return str(value)
+
+
+class ViolationAggregator:
+    """Exact counts and bounded row samples of violations per (severity, field, value)."""
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.groups = {}        # (severity, field, value) -> group dict
+        self.totals = Counter()  # severity -> number of violations
+
+    def add(self, severity, field, value=None, row=None, message=None, name=None):
+        """
+        Record one violation.
+
+        Args:
+            severity: ERROR or WARNING
+            field: Column (or check) the violation belongs to
+            value: Offending value; violations with the same value are grouped
+            row: CSV row number (None for file- or column-level findings)
+            message: Human-readable description; the first one seen is kept per group
+            name: Product name, stored with the row sample
+        """
+        key = (severity, field, _json_value(value))
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {
+                'severity': severity, 'field': field, 'value': key[2],
+                'count': 0, 'samples': [], 'message': message,
+            }
+        group['count'] += 1
+        self.totals[severity] += 1
+        if row is not None and len(group['samples']) < self.sample_size:
+            sample = {'row': int(row)}
+            if name is not None:
+                sample['name'] = str(name)
+            group['samples'].append(sample)
+
+    def error(self, field, value=None, row=None, message=None, name=None):
+        self.add(ERROR, field, value, row=row, message=message, name=name)
+
+    def warning(self, field, value=None, row=None, message=None, name=None):
+        self.add(WARNING, field, value, row=row, message=message, name=name)
+
+    def count(self, severity=None):
+        """Number of violations recorded (of one severity, or all)."""
+        if severity is None:
+            return sum(self.totals.values())
+        return self.totals[severity]
+
+    def sorted_groups(self, severity=None, field=None):
+        """Groups ordered by severity, field, then most frequent value first."""
+        groups = [
+            group for group in self.groups.values()
+            if (severity is None or group['severity'] == severity)
+            and (field is None or group['field'] == field)
+        ]
+        return sorted(groups, key=lambda group: (
+            _SEVERITY_ORDER.get(group['severity'], len(_SEVERITY_ORDER)),
+            group['field'], -group['count'], group['value'] or '',
+        ))
+
+    def fields(self, severity=None):
+        """Fields with at least one violation (of one severity, or all)."""
+        return sorted({group['field'] for group in self.sorted_groups(severity)})
+
+    @staticmethod
+    def _export(group):
+        return {
+            'severity': group['severity'],
+            'field': group['field'],
+            'value': group['value'],
+            'count': group['count'],
+            'samples': group['samples'],
+            'samplesTruncated': group['count'] > len(group['samples']),
+            'message': group['message'],
+        }
+
+    def summary(self, source=None, rows=None):
+        """Report header: totals per severity and the number of distinct groups."""
+        return {
+            'source': source,
+            'generatedAt': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': rows,
+            'totals': {ERROR: self.totals[ERROR], WARNING: self.totals[WARNING], **self.totals},
+            'groups': len(self.groups),
+            'sampleSize': self.sample_size,
+        }
+
+    def to_dict(self, source=None, rows=None):
+        """The whole report as one JSON-serializable document."""
+        report = self.summary(source=source, rows=rows)
+        report['violations'] = [self._export(group) for group in self.sorted_groups()]
+        return report
+
+    def write_json(self, path, source=None, rows=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(source=source, rows=rows), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def write_ndjson(self, path, source=None, rows=None):
+        """Summary line first, then one line per group (streamable by line-oriented tools)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(dict(type='summary', **self.summary(source=source, rows=rows)),
+                               ensure_ascii=False) + '\n')
+            for group in self.sorted_groups():
+                f.write(json.dumps(dict(type='violation', **self._export(group)), ensure_ascii=False) + '\n')
+
+    def write(self, json_path=None, ndjson_path=None, source=None, rows=None):
+        """Write whichever structured reports were requested; returns the paths written."""
+        written = []
+        if json_path:
+            self.write_json(json_path, source=source, rows=rows)
+            written.append(json_path)
+        if ndjson_path:
+            self.write_ndjson(ndjson_path, source=source, rows=rows)
+            written.append(ndjson_path)
+        return written
+
+
+def format_group(group, max_rows=10):
+    """One console line for a group: message, count and sample row numbers."""
+    text = group['message'] or f"{group['field']}: '{group['value']}'"
+    rows = [str(sample['row']) for sample in group['samples'][:max_rows]]
+    if not rows:
+        return text
+    more = ', ...' if group['count'] > len(rows) else ''
+    plural = 's' if group['count'] != 1 else ''
+    return f"{text} ({group['count']} row{plural}: {', '.join(rows)}{more})"
+
+
+def add_report_arguments(parser):
+    """Add the shared --json/--ndjson options to an argparse parser."""
+    parser.add_argument('--json', metavar='PATH', dest='json_report',
+                        help="Write the aggregated violations as one JSON document")
+    parser.add_argument('--ndjson', metavar='PATH', dest='ndjson_report',
+                        help="Write the aggregated violations as NDJSON (summary line + one line per group)")
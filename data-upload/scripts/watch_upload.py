@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for K-Beauty Product Data Upload
+
+Keeps the products collection in sync with the catalog CSV while editors work
+on it. The file is watched with filesystem events (watchdog: inotify,
+FSEvents or ReadDirectoryChangesW; stat polling if watchdog is not
+installed), and bursts of saves are debounced into one sync.
+
+State stays warm between syncs: the MongoDB connection, the productId
+registry, the ingredient dictionary and every normalized row, keyed by a
+hash of its raw CSV values. On each sync only rows whose hash is new are
+transformed, encoded and validated; similar products are recomputed for the
+whole catalog (they depend on every product in the category), and only
+products whose document actually changed are written:
+
+    ReplaceOne({_id}, product, upsert=True)          for added/changed products
+    delete_many({productId: {$in: removed}})         for products no longer in the file
+
+Products keep the _id of their existing document (new ones get a fresh
+ObjectId), so after each push the whole collection is verified against
+server-side checksums of the expected documents (see upload_verification.py).
+The first sync after startup pushes every product and removes documents that
+are not in the file; so does the sync after a failed verification.
+
+A sync with validation errors pushes nothing; fix the rows and save again. A
+productId used by more than one row is a validation error too. A sync whose
+columns drift from the previous upload's sketches pushes nothing either
+(unless --allow-drift is given). Shopify variant IDs are resolved on every
+sync through the cached lookups (see shopify_variants.py), and a product is
+pushed again when its resolved variant changes. Each successful sync records
+a catalog generation and writes the catalog bundle, like a full upload.
+
+Usage:
+    python scripts/watch_upload.py [csv_path] [--debounce 2.0] [--poll] [--once] [--no-shopify] [--allow-drift]
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+import traceback
+
+import pandas as pd
+from bson.objectid import ObjectId
+from pymongo import DeleteMany, ReplaceOne
+
+from upload_kbeauty_data import (
+    DATABASE_NAME, COLLECTION_NAME, INGREDIENTS_COLLECTION_NAME, PRODUCT_IDS_COLLECTION_NAME,
+    KEEP_INGREDIENT_STRINGS, SIMILAR_PRODUCTS_TOP_K, CATALOG_BUNDLE_DIR, SCRIPT_DIR, CSV_FILE_PATH,
+    load_csv, transform_products, validate_product, find_duplicate_product_ids, connect_to_mongo,
+    report_duplicate_products, report_product_id_issues, record_catalog_generation, store_facet_index,
+    resolve_shopify_variants, check_column_drift, save_column_sketch, verify_written_products,
+)
+from ingredient_dictionary import IngredientDictionary
+from product_ids import ProductIdRegistry
+from record_encoder import RecordEncoder
+from similar_products import add_similar_products
+from catalog_bundle import write_catalog_bundle
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional: fall back to polling the file's mtime and size
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCH_DEBOUNCE_SECONDS = 2.0  # Quiet period after the last save before syncing
+WATCH_POLL_INTERVAL = 1.0     # Seconds between stat() calls when polling
+MAX_REPORTED_ERRORS = 10
+
+
+def row_hashes(df):
+    """Hash each raw row's values (column names included), so edits change the hash."""
+    hashes = pd.util.hash_pandas_object(df, index=False, categorize=False)
+    columns_hash = hash(tuple(df.columns))
+    return [f"{columns_hash:x}-{value:x}" for value in hashes.tolist()]
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Forwards events that touch the watched file (editors often save via rename)."""
+
+    def __init__(self, path, events):
+        self.path = path
+        self.events = events
+
+    def on_any_event(self, event):
+        paths = {event.src_path, getattr(event, 'dest_path', None)}
+        if self.path in {os.path.abspath(p) for p in paths if p}:
+            self.events.put(time.monotonic())
+
+
+class FileWatcher:
+    """Puts a timestamp on `events` whenever the file changes."""
+
+    def __init__(self, path, poll=False, poll_interval=WATCH_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.events = queue.Queue()
+        self.poll = poll or Observer is None
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._observer = None
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _poll_loop(self):
+        last = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current != last:
+                last = current
+                self.events.put(time.monotonic())
+
+    def start(self):
+        if self.poll:
+            threading.Thread(target=self._poll_loop, name='watch-poll', daemon=True).start()
+            return 'polling'
+        self._observer = Observer()
+        self._observer.schedule(_ChangeHandler(self.path, self.events),
+                                os.path.dirname(self.path), recursive=False)
+        self._observer.start()
+        return 'filesystem events'
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+    def wait_for_change(self, debounce=WATCH_DEBOUNCE_SECONDS):
+        """Block until a change, then until no further change for `debounce` seconds."""
+        self.events.get()
+        while True:
+            try:
+                self.events.get(timeout=debounce)
+            except queue.Empty:
+                return
+
+
+class CatalogSync:
+    """Warm in-memory catalog state and incremental pushes to MongoDB."""
+
+    def __init__(self, client, allow_unknown_columns=False, resolve_variants=True, allow_drift=False):
+        self.client = client
+        self.allow_unknown_columns = allow_unknown_columns
+        self.resolve_variants = resolve_variants
+        self.allow_drift = allow_drift
+        self.db = client[DATABASE_NAME]
+        self.collection = self.db[COLLECTION_NAME]
+        self.collection.create_index('productId')
+        self.product_ids = ProductIdRegistry.load(self.db[PRODUCT_IDS_COLLECTION_NAME])
+        self.ingredients = IngredientDictionary.load(self.db[INGREDIENTS_COLLECTION_NAME])
+        self.saved_ingredients = {}  # _id -> last written dictionary document
+        self.normalized = None       # Normalized rows indexed by raw row hash
+        self.records = {}            # Row hash -> encoded product (before interning)
+        self.similar = {}            # Row hash -> similarProducts last pushed
+        self.live = None             # productId -> row hash currently in MongoDB
+        self.variants = {}           # productId -> shopifyVariantId embedded by the last push
+        self.document_ids = None     # productId -> _id of its document in MongoDB
+
+    def _normalize_new_rows(self, raw, hashes):
+        """Transform rows not seen before and add them to the cache. Returns the new hashes."""
+        known = set(self.normalized.index) if self.normalized is not None else set()
+        new_positions = [i for i, row_hash in enumerate(hashes) if row_hash not in known]
+        new_hashes = {hashes[i] for i in new_positions}
+        if new_positions:
+            changed = raw.iloc[new_positions].copy()
+            changed.index = [hashes[i] for i in new_positions]
+            changed = changed[~changed.index.duplicated()]
+            collisions, conflicts = len(self.product_ids.collisions), len(self.product_ids.conflicts)
+            changed = transform_products(changed, log=lambda *args, **kwargs: None,
+                                         product_ids=self.product_ids)
+            report_product_id_issues(self.product_ids, collisions=collisions, conflicts=conflicts)
+            frames = [self.normalized, changed] if self.normalized is not None else [changed]
+            self.normalized = pd.concat(frames)
+        current = set(hashes)
+        self.normalized = self.normalized[self.normalized.index.isin(current)]
+        return new_hashes
+
+    def _intern(self, records):
+        """Intern copies of all current records; doc frequencies are recounted from scratch."""
+        self.ingredients.doc_frequency = {}
+        documents = [dict(record) for record in records]
+        self.ingredients.intern_records(documents, keep_strings=KEEP_INGREDIENT_STRINGS)
+        return documents
+
+    def _save_ingredients(self):
+        operations = []
+        for document in self.ingredients.to_documents():
+            if self.saved_ingredients.get(document['_id']) != document:
+                operations.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+        if operations:
+            self.db[INGREDIENTS_COLLECTION_NAME].bulk_write(operations, ordered=False)
+        return operations
+
+    def sync(self, csv_path):
+        """
+        Bring MongoDB in line with the CSV, writing only what changed.
+
+        Returns:
+            True if the catalog was pushed (or already in sync), False on validation
+            errors, column drift or a failed verification
+        """
+        started = time.perf_counter()
+        try:
+            raw = load_csv(csv_path, allow_unknown_columns=self.allow_unknown_columns)
+        except ValueError as e:
+            print(f"   ❌ {e}; nothing pushed")
+            return False
+        hashes = row_hashes(raw)
+        new_hashes = self._normalize_new_rows(raw, hashes)
+        print(f"🔄 {len(raw)} rows, {len(new_hashes)} new or edited")
+
+        df = self.normalized.loc[hashes]
+        df.index = range(len(df))  # Row positions, so row numbers match the CSV
+        if new_hashes:
+            report_duplicate_products(df)
+        add_similar_products(df, top_k=SIMILAR_PRODUCTS_TOP_K)
+
+        # Re-encode rows that are new or whose neighbors changed; validate only those
+        dirty = [
+            position for position, row_hash in enumerate(hashes)
+            if row_hash in new_hashes or self.similar.get(row_hash) != df.at[position, 'similarProducts']
+        ]
+        dirty_hashes = {hashes[position] for position in dirty}
+        encoder = RecordEncoder(strict=not self.allow_unknown_columns)
+        encoded = encoder.encode_all(df.iloc[dirty].to_dict('records')) if dirty else []
+        records = dict(self.records)
+        errors = []
+        for position, record in zip(dirty, encoded):
+            records[hashes[position]] = record
+            errors.extend(validate_product(record, position + 2))
+        # Repeated productIds are checked over every row: an edit can collide with an unedited row
+        duplicates = find_duplicate_product_ids([records[row_hash] for row_hash in hashes])
+        errors.extend(error for _, (_, row_errors) in sorted(duplicates.items()) for error in row_errors)
+        if errors:
+            print(f"   ❌ {len(errors)} validation error(s), nothing pushed:")
+            for error in errors[:MAX_REPORTED_ERRORS]:
+                print(f"      - {error}")
+            if len(errors) > MAX_REPORTED_ERRORS:
+                print(f"      ... and {len(errors) - MAX_REPORTED_ERRORS} more")
+            return False
+
+        live = {str(records[row_hash]['productId']): row_hash for row_hash in hashes}
+
+        documents = self._intern([records[row_hash] for row_hash in hashes])
+        by_hash = dict(zip(hashes, documents))
+        # Variant IDs come from the Shopify cache, so they can change without a CSV edit
+        variants = {}
+        if self.resolve_variants:
+            for position in resolve_shopify_variants(self.db, documents):
+                variants[str(documents[position]['productId'])] = documents[position]['shopifyVariantId']
+
+        first_sync = self.live is None
+        if first_sync:
+            self.document_ids = {}
+            for document in self.collection.find({}, {'productId': 1}):
+                self.document_ids.setdefault(str(document.get('productId')), document['_id'])
+        for product_id, row_hash in live.items():
+            by_hash[row_hash]['_id'] = self.document_ids.get(product_id) or ObjectId()
+        previous = self.live or {}
+        changed_ids = [product_id for product_id, row_hash in live.items()
+                       if previous.get(product_id) != row_hash or row_hash in dirty_hashes
+                       or self.variants.get(product_id) != variants.get(product_id)]
+        removed_ids = sorted(previous.keys() - live.keys())
+
+        operations = [
+            ReplaceOne({'_id': by_hash[live[product_id]]['_id']}, by_hash[live[product_id]], upsert=True)
+            for product_id in changed_ids
+        ]
+        if first_sync:
+            # Anything in the collection that is not in the file goes (including duplicates)
+            operations.append(DeleteMany({'_id': {'$nin': [by_hash[row_hash]['_id'] for row_hash in live.values()]}}))
+        elif removed_ids:
+            operations.append(DeleteMany({'productId': {'$in': removed_ids}}))
+
+        verified = True
+        if not operations:
+            print("   ✅ Already in sync")
+        else:
+            sketch, ok = check_column_drift(self.db, documents, allow_drift=self.allow_drift,
+                                            ingredients=self.ingredients)
+            if not ok:
+                return False
+            self.collection.bulk_write(operations, ordered=False)
+            ingredient_operations = self._save_ingredients()
+            self.product_ids.save(self.db[PRODUCT_IDS_COLLECTION_NAME])
+            generation = record_catalog_generation(self.db, documents, ingredients=self.ingredients)
+            save_column_sketch(self.db, sketch, generation)
+            manifest = write_catalog_bundle(documents, CATALOG_BUNDLE_DIR, generation=generation,
+                                            ingredients=self.ingredients)
+            print(f"   ✅ Pushed {len(changed_ids)} changed and {len(removed_ids)} removed product(s), "
+                  f"{len(ingredient_operations)} ingredient entries, bundle {manifest['file']}")
+            store_facet_index(self.db, manifest)
+            verified = verify_written_products(self.collection, [by_hash[row_hash] for row_hash in live.values()])
+
+        # Commit the new state only once MongoDB has it
+        self.saved_ingredients = {document['_id']: document for document in self.ingredients.to_documents()}
+        self.records = {row_hash: records[row_hash] for row_hash in set(hashes)}
+        self.similar = {hashes[position]: df.at[position, 'similarProducts'] for position in range(len(df))}
+        self.live = live
+        self.variants = variants
+        self.document_ids = {product_id: by_hash[row_hash]['_id'] for product_id, row_hash in live.items()}
+        print(f"   ⏱️  Synced in {time.perf_counter() - started:.2f}s")
+        if not verified:
+            # Push everything on the next sync, as after startup
+            print("   ⚠️  The products collection does not match the file; the next sync pushes every product")
+            self.live = None
+        return verified
+
+
+def watch(csv_path, debounce=WATCH_DEBOUNCE_SECONDS, poll=False, once=False, allow_unknown_columns=False,
+          resolve_variants=True, allow_drift=False):
+    """Sync once, then again after every (debounced) change to the file."""
+    print("🔌 Connecting to MongoDB Atlas...")
+    client = connect_to_mongo()
+    catalog = CatalogSync(client, allow_unknown_columns=allow_unknown_columns, resolve_variants=resolve_variants,
+                          allow_drift=allow_drift)
+    watcher = FileWatcher(csv_path, poll=poll)
+    try:
+        # Start watching before the first sync so saves made during it are not missed
+        mode = watcher.start() if not once else None
+        print(f"👀 Initial sync of '{csv_path}'...")
+        catalog.sync(csv_path)
+        if once:
+            return
+        print(f"👀 Watching '{csv_path}' ({mode}, {debounce:g}s debounce). Press Ctrl+C to stop.")
+        while True:
+            watcher.wait_for_change(debounce)
+            if not os.path.exists(csv_path):
+                continue  # Mid-save (written to a temp file, then renamed); wait for the rename
+            print(f"\n📝 Change detected at {time.strftime('%H:%M:%S')}")
+            try:
+                catalog.sync(csv_path)
+            except Exception as e:
+                # Half-written files and network blips: report and keep watching
+                print(f"❌ Sync failed: {e}")
+                traceback.print_exc()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        watcher.stop()
+        client.close()
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Watch the product CSV and push changes to MongoDB.")
+    parser.add_argument('csv_path', nargs='?', default=None,
+                        help="CSV file path, relative to this script (default: 4-12-25 DB.csv)")
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help=f"Seconds without further saves before syncing (default: {WATCH_DEBOUNCE_SECONDS:g})")
+    parser.add_argument('--poll', action='store_true',
+                        help="Poll the file instead of using filesystem events")
+    parser.add_argument('--once', action='store_true',
+                        help="Run the initial sync and exit")
+    parser.add_argument('--allow-unknown-columns', action='store_true',
+                        help="Skip CSV columns that are not in the product schema instead of refusing to sync")
+    parser.add_argument('--no-shopify', dest='resolve_variants', action='store_false',
+                        help="Do not resolve or embed Shopify variant IDs")
+    parser.add_argument('--allow-drift', action='store_true',
+                        help="Push even if columns drift from the previous upload's sketches")
+    args = parser.parse_args(argv)
+
+    csv_path = os.path.join(SCRIPT_DIR, args.csv_path) if args.csv_path else CSV_FILE_PATH
+    watch(csv_path, debounce=args.debounce, poll=args.poll, once=args.once,
+          allow_unknown_columns=args.allow_unknown_columns, resolve_variants=args.resolve_variants,
+          allow_drift=args.allow_drift)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Tests for find_invalid_values.py (run as a script, like the README does)."""
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'scripts' / 'find_invalid_values.py'
+
+
+def run_report(tmp_path, csv_text):
+    (tmp_path / '4-12-25 DB.csv').write_text(csv_text, encoding='utf-8')
+    subprocess.run([sys.executable, str(SCRIPT)], cwd=tmp_path, check=True, capture_output=True)
+    return (tmp_path / 'invalid_values_report.txt').read_text(encoding='utf-8')
+
+
+def test_aliased_concerns_header_is_validated(tmp_path):
+    report = run_report(tmp_path, (
+        'NAME,CATEGORY,USAGE,CONCERNADDRESSED\n'
+        'Snail Essence,SERUMS & AMPOULES,both,"acne, drynes"\n'
+    ))
+
+    assert 'FIELD: CONCERNSADDRESSED' in report
+    assert "Invalid Value: 'drynes'" in report
+    assert "Did you mean: 'dryness'?" in report
+    assert "Invalid Value: 'acne'" not in report
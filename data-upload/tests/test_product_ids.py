@@ -0,0 +1,38 @@
+"""Tests for the persistent productId registry."""
+from product_ids import ProductIdRegistry, product_id_for_key
+
+KEY = 'cosrx_advanced-snail-96-mucin-power-essence'
+
+
+def test_claim_replaces_generated_id():
+    registry = ProductIdRegistry()
+    generated = registry.resolve(KEY)
+
+    registry.claim(KEY, 'cosrx-snail-essence')
+
+    assert registry.key_to_id[KEY] == 'cosrx-snail-essence'
+    assert registry.id_to_key == {'cosrx-snail-essence': KEY}
+    assert generated not in registry.id_to_key
+
+
+def test_claim_over_loaded_id_frees_it_for_other_keys():
+    generated = product_id_for_key(KEY)
+    registry = ProductIdRegistry([{'_id': KEY, 'productId': generated}])
+
+    registry.claim(KEY, 'cosrx-snail-essence')
+    registry.claim('other-key', generated)
+
+    assert registry.conflicts == []
+    assert registry.key_to_id['other-key'] == generated
+    assert registry.id_to_key[generated] == 'other-key'
+    assert registry.new_keys == {KEY, 'other-key'}
+
+
+def test_claim_owned_id_is_a_conflict():
+    registry = ProductIdRegistry()
+    generated = registry.resolve(KEY)
+
+    registry.claim('other-key', generated)
+
+    assert registry.conflicts == [(generated, KEY, 'other-key')]
+    assert 'other-key' not in registry.key_to_id
@@ -1,20 +1,27 @@
-import csv
+import os
 import sys
 
+# Shared pandas-free CSV scanner (encoding detection, canonical column names)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data-upload', 'scripts'))
+from csv_scan import CatalogScan
+
+csv_path = sys.argv[1] if len(sys.argv) > 1 else 'data-upload/4-12-25 DB.csv'
+
 products_other = []
 
-with open('data-upload/4-12-25 DB.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        category = row.get('CATEGORY', '').strip()
-        # Check if category is empty or is "OTHER"
-        if not category or category.upper() == 'OTHER':
-            products_other.append({
-                'name': row.get('NAME', 'N/A'),
-                'category': category or '(empty)',
-                'brand': row.get('BRAND', 'N/A'),
-                'productId': row.get('PRODUCTID', 'N/A')
-            })
+scan = CatalogScan(csv_path, columns=['CATEGORY', 'NAME', 'BRAND', 'PRODUCTID'])
+category_column, name_column, brand_column, id_column = (
+    scan.find_column(column) for column in ('CATEGORY', 'NAME', 'BRAND', 'PRODUCTID'))
+for _, row in scan:
+    category = (row.get(category_column) or '').strip()
+    # Check if category is empty or is "OTHER"
+    if not category or category.upper() == 'OTHER':
+        products_other.append({
+            'name': row.get(name_column) or 'N/A',
+            'category': category or '(empty)',
+            'brand': row.get(brand_column) or 'N/A',
+            'productId': row.get(id_column) or 'N/A'
+        })
 
 print(f'Found {len(products_other)} products in "other" category:\n')
 for i, p in enumerate(products_other, 1):
@@ -22,4 +29,3 @@ for i, p in enumerate(products_other, 1):
     print(f'   Category: "{p["category"]}"')
     print(f'   Product ID: {p["productId"]}')
     print()
-
@@ -1,17 +1,61 @@
 import connectDB, { Product } from '@/lib/mongodb';
+import { getBundledProducts, getFacetedProducts } from '@/lib/catalogBundle';
+import { FACET_FIELDS, FACET_PARAMS } from '@/lib/facetIndex';
+import { resolveIngredients } from '@/lib/ingredients';
 
 export async function GET(request) {
   try {
-    await connectDB();
-
     const { searchParams } = new URL(request.url);
     const category = searchParams.get('category');
 
+    // Facet filters (?skinType=dry,oily&concern=acne) and counts (?facets=1) use the prebuilt bitsets
+    const filters = {};
+    for (const facet of FACET_PARAMS) {
+      const values = searchParams.get(facet);
+      if (values) {
+        filters[facet] = values.split(',').map((value) => value.trim().toLowerCase()).filter(Boolean);
+      }
+    }
+    const withCounts = searchParams.get('facets') === '1';
+    const filtered = Object.keys(filters).length > 0;
+    if (withCounts || filtered) {
+      const faceted = getFacetedProducts({
+        category: category ? category.toLowerCase() : null,
+        filters,
+        withCounts,
+      });
+      if (faceted) {
+        return Response.json({
+          success: true,
+          products: faceted.products,
+          ...(withCounts ? { facetCounts: faceted.counts } : {}),
+        });
+      }
+    }
+
+    // Serve from the in-memory catalog bundle when one has been exported
+    const bundledProducts = filtered ? null : getBundledProducts({ category: category ? category.toLowerCase() : null });
+    if (bundledProducts) {
+      return Response.json({
+        success: true,
+        products: bundledProducts,
+      });
+    }
+
+    await connectDB();
+
+    // Without a facet index, facet filters become $in conditions
+    const facetQuery = Object.fromEntries(
+      Object.entries(filters).map(([facet, values]) => [FACET_FIELDS[facet], { $in: values }]),
+    );
+
     if (category) {
       const products = await Product.find({ 
         category: category.toLowerCase(),
-        inStock: true 
+        inStock: true,
+        ...facetQuery,
       }).lean();
+      await resolveIngredients(products);
       
       return Response.json({
         success: true,
@@ -20,7 +64,8 @@ export async function GET(request) {
     }
 
     // Get all in-stock products
-    const products = await Product.find({ inStock: true }).lean();
+    const products = await Product.find({ inStock: true, ...facetQuery }).lean();
+    await resolveIngredients(products);
 
     return Response.json({
       success: true,
@@ -54,6 +99,7 @@ export async function POST(request) {
     const products = await Product.find({
       productId: { $in: productIds },
     }).lean();
+    await resolveIngredients(products);
 
     // Log products with missing shopifyProductId for debugging
     products.forEach((product) => {
@@ -1,5 +1,7 @@
 import connectDB, { Consultation, Product } from '@/lib/mongodb';
+import { getBundledProducts, getCatalogGeneration } from '@/lib/catalogBundle';
 import RecommendationEngine from '@/lib/recommendationEngine';
+import { resolveIngredients } from '@/lib/ingredients';
 import { v4 as uuidv4 } from 'uuid';
 
 export async function POST(request) {
@@ -21,9 +23,14 @@ export async function POST(request) {
     const consultationId = uuidv4();
 
     // --- SIMPLIFIED PRODUCT FETCH ---
-    // Get all products from the database that are in stock.
-    console.log("🔍 Querying database for products where { inStock: true }...");
-    const productList = await Product.find({ inStock: true }).lean();
+    // Prefer the in-memory catalog bundle; fall back to the database if none was exported.
+    let productList = getBundledProducts();
+    if (!productList) {
+      console.log("🔍 Querying database for products where { inStock: true }...");
+      productList = await Product.find({ inStock: true }).lean();
+      // Allergy checks need fullIngredientList, which MongoDB stores as packed IDs
+      await resolveIngredients(productList);
+    }
 
     // This is now a strict check. If no products are found, the process stops.
 if (!productList || productList.length === 0) {
@@ -45,6 +52,7 @@ if (!productList || productList.length === 0) {
     // Save consultation to database
     const consultation = new Consultation({
       consultationId,
+      catalogGeneration: getCatalogGeneration(), // Catalog the recommendations were made against
       customerInfo: customerInfo || {},
       responses,
       analysis: {
@@ -0,0 +1,127 @@
+// lib/catalogBundle.js
+// Static catalog bundle written by data-upload/scripts/upload_kbeauty_data.py.
+// Loaded once per server instance (cold start) and kept in memory so consultations
+// don't need a Product.find() round trip to MongoDB. Falls back to MongoDB when
+// no bundle is present.
+import fs from 'fs';
+import path from 'path';
+import zlib from 'zlib';
+import { decodeFacetIndex, selectBits, productIdsOf, countFacets } from './facetIndex';
+
+const CATALOG_BUNDLE_DIR = process.env.CATALOG_BUNDLE_DIR
+  || path.join(process.cwd(), 'src', 'data', 'catalog');
+const MANIFEST_FILE_NAME = 'catalog-manifest.json';
+const SUPPORTED_BUNDLE_VERSION = 1;
+
+let cached = global.catalogBundle;
+
+if (!cached) {
+  cached = global.catalogBundle = { bundle: null, loaded: false };
+}
+
+function readBundle() {
+  const manifestPath = path.join(CATALOG_BUNDLE_DIR, MANIFEST_FILE_NAME);
+  if (!fs.existsSync(manifestPath)) {
+    return null;
+  }
+
+  const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf-8'));
+  if (manifest.version !== SUPPORTED_BUNDLE_VERSION) {
+    console.warn(`⚠️ Catalog bundle version ${manifest.version} is not supported, using MongoDB`);
+    return null;
+  }
+
+  const compressed = fs.readFileSync(path.join(CATALOG_BUNDLE_DIR, manifest.file));
+  const bundle = JSON.parse(zlib.gunzipSync(compressed).toString('utf-8'));
+  if (bundle.hash !== manifest.hash) {
+    console.warn('⚠️ Catalog bundle hash does not match manifest, using MongoDB');
+    return null;
+  }
+
+  const products = Object.values(bundle.categories).flat();
+  console.log(`✅ Catalog bundle loaded: ${manifest.file} (${products.length} products)`);
+  return { ...bundle, products, generation: manifest.generation ?? null, facets: readFacetIndex(manifest) };
+}
+
+// The manifest names the facet index built from the same products, so both switch together
+function readFacetIndex(manifest) {
+  if (!manifest.facetIndex) {
+    return null;
+  }
+  const compressed = fs.readFileSync(path.join(CATALOG_BUNDLE_DIR, manifest.facetIndex));
+  const index = JSON.parse(zlib.gunzipSync(compressed).toString('utf-8'));
+  if (index.catalogHash !== manifest.hash) {
+    console.warn('⚠️ Facet index does not match the catalog bundle, filtering by scanning instead');
+    return null;
+  }
+  return decodeFacetIndex(index);
+}
+
+export function loadCatalogBundle() {
+  if (cached.loaded) {
+    return cached.bundle;
+  }
+
+  try {
+    cached.bundle = readBundle();
+  } catch (error) {
+    console.error('❌ Failed to load catalog bundle, using MongoDB:', error);
+    cached.bundle = null;
+  }
+  cached.loaded = true;
+  return cached.bundle;
+}
+
+/**
+ * Get products from the in-memory catalog bundle.
+ * Returns null when no bundle is available so callers can fall back to MongoDB.
+ */
+export function getBundledProducts({ category = null, inStockOnly = true } = {}) {
+  const bundle = loadCatalogBundle();
+  if (!bundle) {
+    return null;
+  }
+
+  const products = category ? (bundle.categories[category] || []) : bundle.products;
+  return inStockOnly ? products.filter((product) => product.inStock) : products;
+}
+
+/**
+ * Filter products with the prebuilt facet bitsets.
+ * Returns null when no bundle or facet index is available so callers can fall back.
+ *
+ * @param {object} options - { category, inStockOnly, filters: { skinType: ['dry'], concern: ['acne'], ... },
+ *   withCounts } (withCounts adds per-category and per-facet-value counts of the selection)
+ */
+export function getFacetedProducts({ category = null, inStockOnly = true, filters = {}, withCounts = false } = {}) {
+  const bundle = loadCatalogBundle();
+  if (!bundle || !bundle.facets) {
+    return null;
+  }
+
+  if (!bundle.productsById) {
+    bundle.productsById = new Map();
+    for (const product of bundle.products) {
+      if (!bundle.productsById.has(product.productId)) {
+        bundle.productsById.set(product.productId, product);
+      }
+    }
+  }
+  const bits = selectBits(bundle.facets, { category, inStockOnly, filters });
+  const products = productIdsOf(bundle.facets, bits).map((productId) => bundle.productsById.get(productId));
+  return {
+    products,
+    counts: withCounts ? countFacets(bundle.facets, bits) : null,
+  };
+}
+
+/**
+ * Catalog generation ID of the loaded bundle (see data-upload/scripts/catalog_history.py).
+ * Returns null when no bundle is available or it predates generation tracking.
+ */
+export function getCatalogGeneration() {
+  const bundle = loadCatalogBundle();
+  return bundle ? bundle.generation : null;
+}
+
+export default loadCatalogBundle;
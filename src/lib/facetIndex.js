@@ -0,0 +1,115 @@
+// lib/facetIndex.js
+// Facet index written next to the catalog bundle by data-upload/scripts/facet_index.py.
+// Every product has a bit position (its index in `productIds`); every category and
+// facet value has a bitset of its products. Filtering is AND across facets and OR
+// within one facet, counting is a popcount, so neither needs to scan the catalog.
+
+// Query parameter -> product field (same as FACET_FIELDS in facet_index.py)
+export const FACET_FIELDS = {
+  skinType: 'skinTypes',
+  concern: 'concernsAddressed',
+  climate: 'climateSuitability',
+  preference: 'preferences',
+  texture: 'texture',
+  usage: 'usage',
+};
+export const FACET_PARAMS = Object.keys(FACET_FIELDS);
+
+const POPCOUNT = new Uint8Array(256).map((_, byte) => {
+  let count = 0;
+  for (let bits = byte; bits; bits >>= 1) count += bits & 1;
+  return count;
+});
+
+function decodeEntries(entries) {
+  return Object.fromEntries(Object.entries(entries).map(([value, entry]) => [
+    value,
+    { count: entry.count, bits: new Uint8Array(Buffer.from(entry.bits, 'base64')) },
+  ]));
+}
+
+/**
+ * Decode the JSON facet index (base64 bitsets) into Uint8Array bitsets.
+ */
+export function decodeFacetIndex(index) {
+  return {
+    ...index,
+    categories: decodeEntries(index.categories),
+    facets: Object.fromEntries(
+      Object.entries(index.facets).map(([facet, values]) => [facet, decodeEntries(values)]),
+    ),
+  };
+}
+
+function allBits(size) {
+  const bits = new Uint8Array(Math.ceil(size / 8)).fill(0xff);
+  if (size % 8) bits[bits.length - 1] = (1 << (size % 8)) - 1;
+  return bits;
+}
+
+function and(a, b) {
+  return a.map((byte, i) => byte & b[i]);
+}
+
+function or(a, b) {
+  return a.map((byte, i) => byte | b[i]);
+}
+
+export function popcount(bits) {
+  let count = 0;
+  for (const byte of bits) count += POPCOUNT[byte];
+  return count;
+}
+
+/**
+ * Bitset of the products matching a category and facet filters.
+ *
+ * @param {object} index - Decoded facet index
+ * @param {object} options - { category, inStockOnly, filters: { skinType: ['dry', 'oily'], ... } }
+ */
+export function selectBits(index, { category = null, inStockOnly = true, filters = {} } = {}) {
+  const empty = new Uint8Array(Math.ceil(index.productIds.length / 8));
+  let bits = allBits(index.productIds.length);
+  if (category) {
+    bits = and(bits, index.categories[category]?.bits || empty);
+  }
+  if (inStockOnly) {
+    bits = and(bits, index.facets.inStock?.true?.bits || empty);
+  }
+  for (const [facet, values] of Object.entries(filters)) {
+    if (!values || values.length === 0) continue;
+    const entries = index.facets[facet] || {};
+    const matching = values.reduce((union, value) => or(union, entries[value]?.bits || empty), empty);
+    bits = and(bits, matching);
+  }
+  return bits;
+}
+
+/**
+ * productIds of the set bits, in index order.
+ */
+export function productIdsOf(index, bits) {
+  const ids = [];
+  bits.forEach((byte, i) => {
+    for (let bit = 0; byte; bit += 1, byte >>= 1) {
+      if (byte & 1) ids.push(index.productIds[i * 8 + bit]);
+    }
+  });
+  return ids;
+}
+
+/**
+ * Number of selected products per category and per value of every facet.
+ */
+export function countFacets(index, bits) {
+  const count = (entries) => Object.fromEntries(
+    Object.entries(entries).map(([value, entry]) => [value, popcount(and(bits, entry.bits))]),
+  );
+  return {
+    total: popcount(bits),
+    categories: count(index.categories),
+    facets: Object.fromEntries(
+      FACET_PARAMS.map((facet) => [facet, count(index.facets[facet] || {})]),
+    ),
+  };
+}
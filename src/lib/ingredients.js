@@ -0,0 +1,96 @@
+// lib/ingredients.js
+// Products in MongoDB store ingredients as packed little-endian uint16 IDs
+// (keyIngredientIds / fullIngredientIds, see data-upload/scripts/ingredient_dictionary.py);
+// the names live once in the ingredients collection. The dictionary is loaded once per
+// server instance and reloaded when a product references an ID it does not know yet.
+import { Ingredient } from './mongodb';
+
+// Product field holding the names -> field holding the packed IDs
+export const INGREDIENT_ID_FIELDS = {
+  keyIngredients: 'keyIngredientIds',
+  fullIngredientList: 'fullIngredientIds',
+};
+
+let cached = global.ingredientNames;
+
+if (!cached) {
+  cached = global.ingredientNames = { names: null, promise: null };
+}
+
+function toBytes(packed) {
+  if (packed instanceof Uint8Array) {
+    return packed;
+  }
+  // BSON Binary from a .lean() query
+  if (packed?.buffer instanceof Uint8Array) {
+    return packed.buffer.subarray(0, packed.position ?? packed.buffer.length);
+  }
+  return new Uint8Array(0);
+}
+
+/**
+ * Unpack a packed ingredient ID field into an array of IDs.
+ */
+export function unpackIngredientIds(packed) {
+  const bytes = toBytes(packed);
+  const ids = new Array(bytes.length >> 1);
+  for (let i = 0; i < ids.length; i += 1) {
+    ids[i] = bytes[2 * i] | (bytes[2 * i + 1] << 8);
+  }
+  return ids;
+}
+
+async function loadIngredientNames(reload = false) {
+  if (cached.names && !reload) {
+    return cached.names;
+  }
+  if (!cached.promise) {
+    cached.promise = Ingredient.find({}, { name: 1 }).lean()
+      .then((entries) => {
+        cached.names = new Map(entries.map((entry) => [entry._id, entry.name]));
+        return cached.names;
+      })
+      .finally(() => {
+        cached.promise = null;
+      });
+  }
+  return cached.promise;
+}
+
+/**
+ * Replace the packed ingredient IDs of products read from MongoDB with name arrays
+ * (keyIngredients / fullIngredientList), in place. Products that already have the
+ * name arrays are left as they are. Call after connectDB().
+ */
+export async function resolveIngredients(products) {
+  const unpacked = products.map((product) => Object.fromEntries(
+    Object.entries(INGREDIENT_ID_FIELDS)
+      .filter(([, idField]) => product[idField] != null)
+      .map(([nameField, idField]) => [nameField, unpackIngredientIds(product[idField])]),
+  ));
+
+  let names = await loadIngredientNames();
+  const unknown = unpacked.some((fields) => Object.values(fields).some((ids) => ids.some((id) => !names.has(id))));
+  if (unknown) {
+    // IDs only grow, so an unknown ID means an upload happened after the dictionary was loaded
+    names = await loadIngredientNames(true);
+  }
+
+  products.forEach((product, i) => {
+    for (const [nameField, ids] of Object.entries(unpacked[i])) {
+      delete product[INGREDIENT_ID_FIELDS[nameField]];
+      if (Array.isArray(product[nameField])) {
+        continue;
+      }
+      if (ids.some((id) => !names.has(id))) {
+        // A partial list could hide an allergen; leave it missing so the product is treated as unknown
+        console.warn(`⚠️ Unknown ingredient IDs in ${nameField} of ${product.productId}`);
+        continue;
+      }
+      product[nameField] = ids.map((id) => names.get(id));
+    }
+  });
+  return products;
+}
+
+export default resolveIngredients;
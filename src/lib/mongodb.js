@@ -81,6 +81,10 @@ const ConsultationSchema = new mongoose.Schema({
     unique: true,
     index: true,
   },
+  catalogGeneration: {
+    type: Number,
+    default: null,
+  }, // Catalog generation used for recommendations (null when read from MongoDB)
   customerInfo: {
     name: String,
     email: {
@@ -162,11 +166,21 @@ const ProductSchema = new mongoose.Schema({
     enum: ['cleanser', 'toner', 'serum', 'moisturizer', 'spf', 'mask', 'eye_cream', 'treatment'],
   },
   subCategory: String,
+  mrp: Number,
+  weight: String,
+  sizeValue: Number, // WEIGHT parsed by the uploader, in sizeUnit
+  sizeUnit: String, // 'ml', 'g' or 'pcs'
+  pricePerUnit: Number, // mrp / sizeValue
+  budgetTier: Number, // 1: under ₹1,000, 2: ₹1,000-₹2,500, 3: over ₹2,500
   skinTypes: [String],
   concernsAddressed: [String],
   sensitivitySafe: Boolean,
   keyIngredients: [String],
   fullIngredientList: [String], // Complete ingredient list for allergy checking
+  // Packed little-endian uint16 ingredient IDs written by the uploader in place of the
+  // two lists above; resolved to names with lib/ingredients.js
+  keyIngredientIds: Buffer,
+  fullIngredientIds: Buffer,
   gender: {
     type: String,
     enum: ['male', 'female', 'neutral'],
@@ -213,7 +227,18 @@ const ProductSchema = new mongoose.Schema({
   // Keep variantId for backward compatibility, but prefer productId
 });
 
+// Ingredient dictionary written by data-upload/scripts/ingredient_dictionary.py (IDs are stable)
+const IngredientSchema = new mongoose.Schema({
+  _id: Number,
+  name: {
+    type: String,
+    required: true,
+  },
+  docFrequency: Number,
+});
+
 export const Consultation = mongoose.models.Consultation || mongoose.model('Consultation', ConsultationSchema);
 export const Product = mongoose.models.Product || mongoose.model('Product', ProductSchema);
+export const Ingredient = mongoose.models.Ingredient || mongoose.model('Ingredient', IngredientSchema);
 
 export default connectDB;
\ No newline at end of file
@@ -1128,6 +1128,8 @@ export class RecommendationEngine {
     if (userBudget) {
       // Get product price (handle both 'price' and 'mrp' fields)
       const productPrice = product.mrp || product.price || 0;
+      // Budget tier is precomputed by the uploader (1: under ₹1,000, 2: ₹1,000-₹2,500, 3: over ₹2,500)
+      const budgetTier = product.budgetTier || (productPrice < 1000 ? 1 : productPrice <= 2500 ? 2 : 3);
       
       const normalizedBudget = this.normalizeString(userBudget);
       
@@ -1136,7 +1138,7 @@ export class RecommendationEngine {
         if (productPrice > 2000) {
           score -= 10; // Moderate penalty, don't kill the match
           reasoning.push('Above your preferred price range.');
-        } else if (productPrice < 1000) {
+        } else if (budgetTier === 1) {
           score += 10; // Bonus for budget-friendly products
           reasoning.push('Fits your budget perfectly.');
         }
@@ -1145,13 +1147,13 @@ export class RecommendationEngine {
         if (productPrice > 3000) {
           score -= 5; // Slight penalty for very expensive products
           reasoning.push('Above your preferred price range.');
-        } else if (productPrice >= 1000 && productPrice <= 2500) {
+        } else if (budgetTier === 2) {
           score += 5; // Bonus for products in preferred range
           reasoning.push('Fits your budget range well.');
         }
       } else if (normalizedBudget === 'high') {
         // High budget: slight preference for premium products (₹2,500+), but don't penalize cheap products
-        if (productPrice > 2500) {
+        if (budgetTier === 3) {
           score += 5; // Slight preference for premium formulations
           reasoning.push('Premium product within your budget.');
         }